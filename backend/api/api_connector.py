@@ -33,7 +33,8 @@ class APIConnector:
         exchange: str,
         api_key: str = "",
         api_secret: str = "",
-        passphrase: str = ""  # OKX 专用 
+        passphrase: str = "",  # OKX 专用 
+        api_base: str = ""
     ) -> Union[BinanceAPI, OKXAPI]:
         """
         初始化交易所连接 
@@ -41,6 +42,7 @@ class APIConnector:
         :param api_key: 用户输入的API Key 
         :param api_secret: 用户输入的API Secret
         :param passphrase: OKX 专用API密码
+        :param api_base: 替换交易所接口域名的服务地址（如离线回放服务 ReplayServer.url）
         :return: 交易所API实例
         """
         try:
@@ -48,7 +50,8 @@ class APIConnector:
                 self.exchanges["binance"]  = BinanceAPI(
                     api_key=api_key,
                     api_secret=api_secret,
-                    testnet=self.testnet_mode 
+                    testnet=self.testnet_mode,
+                    api_base=api_base
                 )
                 logger.info(f"Binance  API 初始化成功（{'测试网' if self.testnet_mode  else '实盘'}模式）")
                 return self.exchanges["binance"] 
@@ -58,7 +61,8 @@ class APIConnector:
                     api_key=api_key,
                     api_secret=api_secret,
                     passphrase=passphrase,
-                    testnet=self.testnet_mode  
+                    testnet=self.testnet_mode,
+                    api_base=api_base
                 )
                 logger.info(f"OKX  API 初始化成功（{'测试网' if self.testnet_mode  else '实盘'}模式）")
                 return self.exchanges["okx"] 
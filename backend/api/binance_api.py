@@ -8,16 +8,18 @@ import yaml
 class BinanceAPI:
     """Binance 合约交易API封装（支持实盘/测试网切换）"""
     
-    def __init__(self, api_key: str = "", api_secret: str = "", testnet: bool = False):
+    def __init__(self, api_key: str = "", api_secret: str = "", testnet: bool = False, api_base: str = ""):
         """
         初始化Binance连接 
         :param api_key: 用户输入的API Key 
         :param api_secret: 用户输入的API Secret
         :param testnet: 是否使用测试网 
+        :param api_base: 替换全部接口域名的服务地址（如离线回放服务 http://127.0.0.1:8765）
         """
         self.api_key  = api_key 
         self.api_secret  = api_secret 
         self.testnet  = testnet 
+        self.api_base  = api_base
         self.exchange  = self._init_exchange()
         self.load_config() 
         
@@ -32,10 +34,14 @@ class BinanceAPI:
             }
         }
         
-        if self.testnet: 
+        if self.testnet and not self.api_base: 
             config['urls'] = {'api': 'https://testnet.binancefuture.com'} 
             
-        return ccxt.binance(config) 
+        exchange = ccxt.binance(config) 
+        if self.api_base:
+            from .replay_server import redirect_urls
+            exchange.urls['api'] = redirect_urls(exchange.urls['api'], self.api_base)
+        return exchange
     
     def load_config(self):
         """从configs/exchanges.yaml 加载端点配置"""
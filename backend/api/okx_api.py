@@ -8,18 +8,27 @@ import yaml
 class OKXAPI:
     """OKX 合约交易API封装（支持实盘/测试网切换和双线持仓）"""
  
-    def __init__(self, api_key: str = "", api_secret: str = "", passphrase: str = "", testnet: bool = False):
+    def __init__(
+        self,
+        api_key: str = "",
+        api_secret: str = "",
+        passphrase: str = "",
+        testnet: bool = False,
+        api_base: str = ""
+    ):
         """
         初始化OKX连接
         :param api_key: 用户输入的API Key 
         :param api_secret: 用户输入的API Secret
         :param passphrase: OKX专属API密码
         :param testnet: 是否使用测试网
+        :param api_base: 替换接口域名的服务地址（如离线回放服务 http://127.0.0.1:8765）
         """
         self.api_key  = api_key
         self.api_secret  = api_secret
         self.passphrase  = passphrase 
         self.testnet  = testnet 
+        self.api_base  = api_base
         self.exchange  = self._init_exchange()
         self.load_config() 
  
@@ -35,10 +44,14 @@ class OKXAPI:
             }
         }
         
-        if self.testnet: 
+        if self.testnet and not self.api_base: 
             config['urls'] = {'api': 'https://www.okx.com'}   # OKX测试网与实盘域名相同，需通过API Key区分
             
-        return ccxt.okx(config) 
+        exchange = ccxt.okx(config) 
+        if self.api_base:
+            from .replay_server import redirect_urls
+            exchange.urls['api'] = redirect_urls(exchange.urls['api'], self.api_base)
+        return exchange
  
     def load_config(self):
         """从configs/exchanges.yaml 加载端点配置"""
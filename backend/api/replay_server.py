@@ -0,0 +1,1002 @@
+import os
+import time
+import json
+import random
+import asyncio
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from aiohttp import web, WSMsgType
+from itertools import count
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Tuple
+from ..utils.logger  import logger
+from ..utils.data_processor  import resample_klines
+from ..backtest.streaming import iter_parquet_frames
+
+# 从目录名（如 BTCUSDT）推断交易对时识别的计价币种
+QUOTE_ASSETS = ('USDT', 'USDC', 'BUSD', 'USD', 'BTC', 'ETH')
+# 静态时钟（未指定回放起点）：全部K线可见
+STATIC = np.iinfo(np.int64).max
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """K线周期 → 毫秒（1m/5m/1h/4h/1d/1w，OKX 的 1H/4H/1D 同样适用）"""
+    units = {'m': 60, 'h': 3600, 'H': 3600, 'd': 86400, 'D': 86400, 'w': 7 * 86400, 'W': 7 * 86400}
+    unit = timeframe[-1:]
+    if unit not in units or not timeframe[:-1].isdigit():
+        raise ValueError(f"不支持的时间框架: {timeframe}")
+    return int(timeframe[:-1]) * units[unit] * 1000
+
+
+def okx_timeframe(bar: str) -> str:
+    """OKX K线周期（1m/1H/4H/1D）→ 本地周期（1m/1h/4h/1d）"""
+    return bar[:-1] + bar[-1].lower() if bar[-1:] in ('H', 'D', 'W') else bar
+
+
+def redirect_urls(urls, base: str):
+    """
+    将 ccxt 交易所实例的 urls['api'] 中所有地址的 协议+域名 替换为 base（路径保持不变），用于连接回放服务
+    :param urls: ccxt exchange.urls['api']（字符串或嵌套字典）
+    :param base: 回放服务地址，如 http://127.0.0.1:8765
+    """
+    if isinstance(urls, dict):
+        return {key: redirect_urls(value, base) for key, value in urls.items()}
+    if isinstance(urls, str) and '://' in urls:
+        parts = urlsplit(urls)
+        return base.rstrip('/') + urls[len(f"{parts.scheme}://{parts.netloc}"):]
+    return urls
+
+
+class ReplayClock:
+    """回放时钟：从数据时间 start_ms 开始，按 speed 倍速随真实时间推进"""
+
+    def __init__(self, start_ms: Optional[int] = None, speed: float = 1.0):
+        """
+        :param start_ms: 回放起点（数据时间，毫秒）；None 表示静态时钟，全部数据可见
+        :param speed: 回放倍速（60 表示真实 1 秒 = 数据 1 分钟）
+        """
+        self.start_ms  = start_ms
+        self.speed  = speed
+        self._started  = time.monotonic()
+
+    def now(self) -> int:
+        if self.start_ms is None:
+            return STATIC
+        return self.start_ms + int((time.monotonic() - self._started) * 1000 * self.speed)
+
+    def stamp(self) -> int:
+        """响应中使用的时间戳（静态时钟返回真实时间）"""
+        now = self.now()
+        return int(time.time() * 1000) if now == STATIC else now
+
+
+class KlineTape:
+    """单个币种单个周期的K线（按时间排序的 numpy 列，按时间查询为二分查找）"""
+
+    def __init__(self, df: pd.DataFrame, timeframe: str):
+        self.timeframe  = timeframe
+        self.step  = timeframe_ms(timeframe)
+        self.time  = df.index.asi8 // 10 ** 6
+        self.open  = df['open'].to_numpy(dtype=np.float64)
+        self.high  = df['high'].to_numpy(dtype=np.float64)
+        self.low  = df['low'].to_numpy(dtype=np.float64)
+        self.close  = df['close'].to_numpy(dtype=np.float64)
+        self.volume  = df['volume'].to_numpy(dtype=np.float64)
+
+    def visible(self, now: int) -> int:
+        """now 时刻已收盘的K线数（只回放已收盘的K线，避免未来数据）"""
+        if now == STATIC:
+            return len(self.time)
+        return int(np.searchsorted(self.time, now - self.step, side='right'))
+
+    def window(self, now: int, start: Optional[int], end: Optional[int], limit: int) -> slice:
+        """
+        Binance 语义：给定 start 时返回 start 之后最早的 limit 根，否则返回 end（默认当前）之前最近的 limit 根
+        """
+        hi = self.visible(now)
+        if end is not None:
+            hi = min(hi, int(np.searchsorted(self.time, end, side='right')))
+        if start is not None:
+            lo = int(np.searchsorted(self.time, start, side='left'))
+            return slice(lo, max(lo, min(hi, lo + limit)))
+        return slice(max(0, hi - limit), hi)
+
+
+class ReplayAccount:
+    """
+    模拟合约账户（USDT 保证金，全仓）
+    持仓按 (symbol, 持仓方向) 记录带符号数量和开仓均价：单向持仓方向为 net，双向持仓为 long/short
+    """
+
+    def __init__(self, initial_balance: float = 10000.0, taker_fee: float = 0.0004, maker_fee: float = 0.0002):
+        self.wallet  = initial_balance
+        self.taker_fee  = taker_fee
+        self.maker_fee  = maker_fee
+        self.hedge_mode  = False
+        self.leverage  = {}  # {symbol: 杠杆倍数}
+        self.positions  = {}  # {(symbol, 'net'/'long'/'short'): [带符号数量, 开仓均价]}
+        self.orders  = {}  # {订单号: 订单}
+        self.open_orders  = {}  # 挂单中的订单 {订单号: 订单}
+        self.client_ids  = {}  # {客户端订单号: 订单}
+        self.match_cursor  = {}  # 挂单撮合游标 {订单号: 下一根待检查的K线下标}
+        self._ids  = count(1)
+
+    def position_key(self, side: str, reduce_only: bool, pos_side: Optional[str]) -> str:
+        """订单对应的持仓方向（双向持仓未指定 posSide 时按 开仓买=多、开仓卖=空、平仓反之 推断）"""
+        if not self.hedge_mode:
+            return 'net'
+        if pos_side in ('long', 'short'):
+            return pos_side
+        return ('short' if side == 'buy' else 'long') if reduce_only else ('long' if side == 'buy' else 'short')
+
+    def submit(
+        self,
+        symbol: str,
+        side: str,
+        order_type: str,
+        amount: float,
+        price: Optional[float],
+        mark: float,
+        now: int,
+        reduce_only: bool = False,
+        pos_side: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> Dict:
+        """
+        提交订单：市价单和可立即成交的限价单按标记价格全部成交，其余限价单挂单等待后续K线成交
+        :raises ValueError: 数量无效或只减仓订单无可减持仓
+        """
+        if amount <= 0:
+            raise ValueError(f"无效的下单数量: {amount}")
+        key = self.position_key(side, reduce_only, pos_side)
+        if reduce_only:
+            held = self.positions.get((symbol, key), [0.0, 0.0])[0]
+            closable = max(-held, 0.0) if side == 'buy' else max(held, 0.0)
+            if closable <= 0:
+                raise ValueError("只减仓订单无可减持仓")
+            amount = min(amount, closable)
+        order_id = next(self._ids)
+        order = {
+            'id': order_id,
+            'client_id': client_id or f"replay{order_id}",
+            'symbol': symbol,
+            'side': side,
+            'type': order_type,
+            'amount': amount,
+            'price': price,
+            'filled': 0.0,
+            'average': 0.0,
+            'fee': 0.0,
+            'status': 'open',
+            'reduce_only': reduce_only,
+            'position': key,
+            'time': now,
+            'updated': now
+        }
+        self.orders[order_id] = order
+        self.client_ids[order['client_id']] = order
+        marketable = order_type == 'market' or price is None or (price >= mark if side == 'buy' else price <= mark)
+        if marketable:
+            self.fill(order, mark, now, taker=True)
+        else:
+            self.open_orders[order_id] = order
+        return order
+
+    def fill(self, order: Dict, price: float, now: int, taker: bool):
+        """订单全部成交，更新持仓、已实现盈亏和手续费"""
+        amount = order['amount']
+        fee = amount * price * (self.taker_fee if taker else self.maker_fee)
+        position = self.positions.setdefault((order['symbol'], order['position']), [0.0, 0.0])
+        delta = amount if order['side'] == 'buy' else -amount
+        held, entry = position
+        if held == 0 or np.sign(held) == np.sign(delta):
+            position[1] = (abs(held) * entry + amount * price) / (abs(held) + amount)
+        else:
+            closed = min(amount, abs(held))
+            self.wallet += closed * (price - entry) * np.sign(held)
+            if amount > abs(held):
+                position[1] = price  # 反手：剩余部分按成交价开仓
+        position[0] = held + delta
+        if abs(position[0]) < 1e-12:
+            del self.positions[(order['symbol'], order['position'])]
+        self.wallet -= fee
+        order.update(filled=amount, average=price, fee=fee, status='closed', updated=now)
+        self._close(order)
+
+    def cancel(self, order_id: int, now: int) -> Dict:
+        order = self.orders.get(order_id)
+        if order is None:
+            raise KeyError(order_id)
+        if order['status'] == 'open':
+            order.update(status='canceled', updated=now)
+            self._close(order)
+        return order
+
+    def _close(self, order: Dict):
+        """订单成交或撤销后移出挂单索引"""
+        self.open_orders.pop(order['id'], None)
+        self.match_cursor.pop(order['id'], None)
+
+    def snapshot(self, marks: Dict[str, float]) -> Dict[str, float]:
+        """账户权益：{'wallet', 'unrealized', 'total', 'used', 'free'}（used 为持仓初始保证金）"""
+        unrealized = used = 0.0
+        for (symbol, _), (held, entry) in self.positions.items():
+            mark = marks.get(symbol, entry)
+            unrealized += held * (mark - entry)
+            used += abs(held) * mark / self.leverage.get(symbol, 1)
+        total = self.wallet + unrealized
+        return {'wallet': self.wallet, 'unrealized': unrealized, 'total': total, 'used': used, 'free': total - used}
+
+
+class ReplayServer:
+    """
+    离线交易所回放服务（替代 Binance 合约 / OKX 永续的 REST 和 WebSocket 接口，供 ccxt 连接）
+    功能：
+    - 回放 HistoricalDataManager 分区存储（或传入的 DataFrame）中的K线，只返回回放时钟下已收盘的K线
+    - 回放倍速可配置；未指定起点时为静态时钟（全部数据可见，用于压测）
+    - 模拟账户：余额、杠杆、持仓（单向/双向）、市价/限价下单、查询和撤单
+    - 可注入请求延迟和错误（限频/服务不可用），按接口统计请求次数
+    - WebSocket 推送新收盘的K线（Binance /ws/<symbol>@kline_<interval>，OKX /ws/v5/public 和 /ws/v5/business）
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data/historical",
+        exchange: str = "binance",
+        frames: Optional[Dict[Tuple[str, str], pd.DataFrame]] = None,
+        speed: float = 1.0,
+        start: Optional[str] = None,
+        latency: Tuple[float, float] = (0.0, 0.0),
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        initial_balance: float = 10000.0,
+        taker_fee: float = 0.0004,
+        maker_fee: float = 0.0002,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        :param data_dir: HistoricalDataManager 的数据目录
+        :param exchange: 回放哪个交易所录制的数据（两种接口共用同一份数据）
+        :param frames: 直接提供的K线 {(symbol, timeframe): DataFrame}，优先于 data_dir
+        :param speed: 回放倍速
+        :param start: 回放起点（数据时间），None 表示静态时钟
+        :param latency: 每个请求的随机延迟范围（秒）
+        :param error_rate: 请求返回错误的概率
+        :param error_status: 注入错误的 HTTP 状态码（429 限频 / 5xx 服务不可用）
+        :param seed: 延迟和错误注入的随机种子
+        :param port: 监听端口（0 表示随机可用端口）
+        """
+        self.data_dir  = data_dir
+        self.exchange  = exchange
+        self.frames  = dict(frames or {})
+        self.clock  = ReplayClock(None if start is None else int(pd.Timestamp(start).value // 10 ** 6), speed)
+        self.latency  = latency
+        self.error_rate  = error_rate
+        self.error_status  = error_status
+        self.host  = host
+        self.port  = port
+        self.accounts  = {
+            name: ReplayAccount(initial_balance, taker_fee, maker_fee) for name in ('binance', 'okx')
+        }
+        self.stats  = {}  # 各接口请求次数 {'GET /fapi/v1/klines': n}
+        self.ws_interval  = 0.05  # WebSocket 检查新K线的间隔（秒）
+        self._rng  = random.Random(seed)
+        self._tapes  = {}  # {(symbol, timeframe): KlineTape}
+        self._base_timeframes  = {}  # 各币种存储的最小周期（标记价格和挂单撮合使用）{symbol: timeframe}
+        self._symbols  = self._discover_symbols()
+        self._runner  = None
+        self._loop  = None
+        self._thread  = None
+
+    # ----------- 数据 -----------
+    def _discover_symbols(self) -> List[str]:
+        """可回放的交易对（frames 中的交易对 + 数据目录下的币种目录）"""
+        symbols = {symbol for symbol, _ in self.frames}
+        root = os.path.join(self.data_dir, self.exchange)
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                quote = next((q for q in QUOTE_ASSETS if name.endswith(q) and len(name) > len(q)), None)
+                if quote and os.path.isdir(os.path.join(root, name)):
+                    symbols.add(f"{name[:-len(quote)]}/{quote}")
+        return sorted(symbols)
+
+    def _stored_timeframes(self, symbol: str) -> List[str]:
+        stored = {tf for sym, tf in self.frames if sym == symbol}
+        root = os.path.join(self.data_dir, self.exchange, symbol.replace('/', ''))
+        if os.path.isdir(root):
+            stored.update(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+        return sorted(stored, key=timeframe_ms)
+
+    def tape(self, symbol: str, timeframe: str) -> KlineTape:
+        """
+        K线数据（首次访问时加载；未存储该周期时由可整除的较小周期聚合）
+        :raises KeyError: 无可用数据
+        """
+        key = (symbol, timeframe)
+        if symbol not in self._symbols:
+            raise KeyError(key)
+        if key not in self._tapes:
+            target = timeframe_ms(timeframe)
+            source = next(
+                (tf for tf in reversed(self._stored_timeframes(symbol)) if target % timeframe_ms(tf) == 0), None
+            )
+            if source is None:
+                raise KeyError(key)
+            df = self.frames.get((symbol, source))
+            if df is None:
+                path = os.path.join(self.data_dir, self.exchange, symbol.replace('/', ''), source)
+                df = pd.concat(list(iter_parquet_frames(path))).sort_index()
+            df = df[~df.index.duplicated(keep='last')]
+            if source != timeframe:
+                df = resample_klines(df, timeframe)
+            self._tapes[key] = KlineTape(df, timeframe)
+        return self._tapes[key]
+
+    def base_tape(self, symbol: str) -> KlineTape:
+        """
+        币种存储的最小周期K线
+        :raises KeyError: 无可用数据
+        """
+        if symbol not in self._base_timeframes:
+            stored = self._stored_timeframes(symbol)
+            if not stored:
+                raise KeyError(symbol)
+            self._base_timeframes[symbol] = stored[0]
+        return self.tape(symbol, self._base_timeframes[symbol])
+
+    def mark_price(self, symbol: str) -> float:
+        """标记价格：最小周期上最近一根已收盘K线的收盘价"""
+        tape = self.base_tape(symbol)
+        n = tape.visible(self.clock.now())
+        if n == 0:
+            raise KeyError(symbol)
+        return float(tape.close[n - 1])
+
+    def _marks(self, account: ReplayAccount) -> Dict[str, float]:
+        return {symbol: self.mark_price(symbol) for symbol, _ in account.positions}
+
+    def _match_orders(self, account: ReplayAccount):
+        """
+        挂单撮合：挂单之后收盘的K线中价格触及限价即按限价成交（maker）
+        只遍历挂单中的订单，每个订单从上次检查到的K线继续，每根K线只检查一次
+        """
+        now = self.clock.now()
+        for order in list(account.open_orders.values()):
+            tape = self.base_tape(order['symbol'])
+            lo = account.match_cursor.get(order['id'])
+            if lo is None:
+                lo = int(np.searchsorted(tape.time, order['time'], side='right'))
+            hi = tape.visible(now)
+            if hi <= lo:
+                continue
+            if order['side'] == 'buy':
+                hits = np.flatnonzero(tape.low[lo:hi] <= order['price'])
+            else:
+                hits = np.flatnonzero(tape.high[lo:hi] >= order['price'])
+            if len(hits):
+                bar = lo + int(hits[0])
+                account.fill(order, order['price'], int(tape.time[bar] + tape.step), taker=False)
+            else:
+                account.match_cursor[order['id']] = hi
+
+    # ----------- 服务生命周期 -----------
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        binance = [
+            ('GET', '/fapi/v1/ping', self._binance_ping),
+            ('GET', '/fapi/v1/time', self._binance_time),
+            ('GET', '/api/v3/time', self._binance_time),
+            ('GET', '/fapi/v1/exchangeInfo', self._binance_futures_info),
+            ('GET', '/api/v3/exchangeInfo', self._binance_spot_info),
+            ('GET', '/dapi/v1/exchangeInfo', self._binance_empty_info),
+            ('GET', '/sapi/v1/capital/config/getall', self._binance_currencies),
+            ('GET', '/fapi/v1/klines', self._binance_klines),
+            ('GET', '/api/v3/klines', self._binance_klines),
+            ('GET', '/fapi/v2/account', self._binance_account),
+            ('GET', '/fapi/v2/balance', self._binance_balance),
+            ('GET', '/fapi/v2/positionRisk', self._binance_position_risk),
+            ('POST', '/fapi/v1/leverage', self._binance_leverage),
+            ('POST', '/fapi/v1/order', self._binance_create_order),
+            ('GET', '/fapi/v1/order', self._binance_fetch_order),
+            ('DELETE', '/fapi/v1/order', self._binance_cancel_order),
+            ('GET', '/fapi/v1/openOrders', self._binance_open_orders),
+            ('GET', '/ws/{streams:.+}', self._binance_ws),
+            ('GET', '/stream', self._binance_ws),
+        ]
+        okx = [
+            ('GET', '/api/v5/public/time', self._okx_time),
+            ('GET', '/api/v5/public/instruments', self._okx_instruments),
+            ('GET', '/api/v5/public/underlying', self._okx_underlying),
+            ('GET', '/api/v5/market/candles', self._okx_candles),
+            ('GET', '/api/v5/market/history-candles', self._okx_candles),
+            ('GET', '/api/v5/account/balance', self._okx_balance),
+            ('GET', '/api/v5/account/positions', self._okx_positions),
+            ('POST', '/api/v5/account/set-leverage', self._okx_set_leverage),
+            ('POST', '/api/v5/account/set-position-mode', self._okx_set_position_mode),
+            ('POST', '/api/v5/trade/order', self._okx_create_order),
+            ('GET', '/api/v5/trade/order', self._okx_fetch_order),
+            ('POST', '/api/v5/trade/cancel-order', self._okx_cancel_order),
+            ('GET', '/ws/v5/public', self._okx_ws),
+            ('GET', '/ws/v5/business', self._okx_ws),
+        ]
+        for method, path, handler in binance + okx:
+            app.router.add_route(method, path, handler)
+        return app
+
+    async def start(self) -> str:
+        """在当前事件循环中启动服务，返回服务地址"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f" 回放服务已启动: {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start_in_thread(self) -> str:
+        """在后台线程中运行服务（供同步的 ccxt 客户端使用），返回服务地址"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="replay-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.url
+
+    def stop_thread(self):
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        """统计请求、注入延迟和错误（WebSocket 连接不注入）"""
+        name = f"{request.method} {request.match_info.route.resource.canonical if request.match_info.route.resource else request.path}"
+        self.stats[name] = self.stats.get(name, 0) + 1
+        if request.headers.get('Upgrade', '').lower() == 'websocket':
+            return await handler(request)
+        low, high = self.latency
+        if high > 0:
+            await asyncio.sleep(self._rng.uniform(low, high))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            if request.path.startswith('/api/v5'):
+                body = {'code': '50011' if self.error_status == 429 else '50001', 'msg': 'Injected error', 'data': []}
+            else:
+                body = {'code': -1003 if self.error_status == 429 else -1001, 'msg': 'Injected error'}
+            return web.json_response(body, status=self.error_status)
+        return await handler(request)
+
+    # ----------- Binance 合约接口 -----------
+    def _binance_symbol(self, market_id: str) -> Optional[str]:
+        return next((s for s in self._symbols if s.replace('/', '') == market_id.upper()), None)
+
+    @staticmethod
+    def _binance_error(code: int, msg: str, status: int = 400) -> web.Response:
+        return web.json_response({'code': code, 'msg': msg}, status=status)
+
+    @staticmethod
+    async def _binance_params(request: web.Request) -> Dict[str, str]:
+        """查询参数和表单参数（ccxt 的签名 POST 请求以表单提交）"""
+        params = dict(request.query)
+        if request.method != 'GET' and request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    async def _binance_ping(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def _binance_time(self, request: web.Request) -> web.Response:
+        return web.json_response({'serverTime': self.clock.stamp()})
+
+    def _binance_filters(self) -> List[Dict]:
+        return [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001', 'maxPrice': '10000000', 'tickSize': '0.00000001'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00000001', 'maxQty': '10000000', 'stepSize': '0.00000001'},
+            {'filterType': 'MARKET_LOT_SIZE', 'minQty': '0.00000001', 'maxQty': '10000000', 'stepSize': '0.00000001'},
+            {'filterType': 'MIN_NOTIONAL', 'notional': '0'}
+        ]
+
+    async def _binance_futures_info(self, request: web.Request) -> web.Response:
+        symbols = []
+        for symbol in self._symbols:
+            base, quote = symbol.split('/')
+            symbols.append({
+                'symbol': base + quote, 'pair': base + quote, 'contractType': 'PERPETUAL',
+                'deliveryDate': 4133404800000, 'onboardDate': 1569398400000, 'status': 'TRADING',
+                'baseAsset': base, 'quoteAsset': quote, 'marginAsset': quote,
+                'pricePrecision': 8, 'quantityPrecision': 8, 'baseAssetPrecision': 8, 'quotePrecision': 8,
+                'underlyingType': 'COIN', 'underlyingSubType': [], 'settlePlan': 0, 'triggerProtect': '0.0500',
+                'liquidationFee': '0.012500', 'marketTakeBound': '0.05',
+                'filters': self._binance_filters(),
+                'orderTypes': ['LIMIT', 'MARKET'], 'timeInForce': ['GTC', 'IOC', 'FOK']
+            })
+        return web.json_response({
+            'timezone': 'UTC', 'serverTime': self.clock.stamp(), 'rateLimits': [], 'exchangeFilters': [],
+            'assets': [], 'symbols': symbols
+        })
+
+    async def _binance_spot_info(self, request: web.Request) -> web.Response:
+        symbols = []
+        for symbol in self._symbols:
+            base, quote = symbol.split('/')
+            symbols.append({
+                'symbol': base + quote, 'status': 'TRADING', 'baseAsset': base, 'baseAssetPrecision': 8,
+                'quoteAsset': quote, 'quotePrecision': 8, 'quoteAssetPrecision': 8,
+                'orderTypes': ['LIMIT', 'MARKET'], 'icebergAllowed': False, 'ocoAllowed': False,
+                'isSpotTradingAllowed': True, 'isMarginTradingAllowed': False,
+                'filters': self._binance_filters(), 'permissions': ['SPOT']
+            })
+        return web.json_response({'timezone': 'UTC', 'serverTime': self.clock.stamp(), 'symbols': symbols})
+
+    async def _binance_empty_info(self, request: web.Request) -> web.Response:
+        return web.json_response({'timezone': 'UTC', 'serverTime': self.clock.stamp(), 'symbols': []})
+
+    async def _binance_currencies(self, request: web.Request) -> web.Response:
+        return web.json_response([])
+
+    async def _binance_klines(self, request: web.Request) -> web.Response:
+        params = request.query
+        symbol = self._binance_symbol(params.get('symbol', ''))
+        interval = params.get('interval', '1m')
+        try:
+            tape = self.tape(symbol, interval)
+        except (KeyError, ValueError):
+            return self._binance_error(-1121, 'Invalid symbol.')
+        start = int(params['startTime']) if 'startTime' in params else None
+        end = int(params['endTime']) if 'endTime' in params else None
+        bars = tape.window(self.clock.now(), start, end, min(int(params.get('limit', 500)), 1500))
+        return web.json_response([
+            [int(t), repr(o), repr(h), repr(l), repr(c), repr(v), int(t + tape.step - 1), repr(v * c), 0, '0', '0', '0']
+            for t, o, h, l, c, v in zip(
+                tape.time[bars], tape.open[bars], tape.high[bars], tape.low[bars], tape.close[bars], tape.volume[bars]
+            )
+        ])
+
+    def _binance_assets(self, account: ReplayAccount) -> Dict:
+        snap = account.snapshot(self._marks(account))
+        return {
+            'accountAlias': 'replay', 'asset': 'USDT', 'walletBalance': str(snap['wallet']),
+            'unrealizedProfit': str(snap['unrealized']), 'marginBalance': str(snap['total']),
+            'maintMargin': '0', 'initialMargin': str(snap['used']), 'positionInitialMargin': str(snap['used']),
+            'openOrderInitialMargin': '0', 'crossWalletBalance': str(snap['wallet']),
+            'crossUnPnl': str(snap['unrealized']), 'balance': str(snap['wallet']),
+            'availableBalance': str(snap['free']), 'maxWithdrawAmount': str(snap['free']),
+            'marginAvailable': True, 'updateTime': self.clock.stamp()
+        }
+
+    def _binance_positions(self, account: ReplayAccount, symbol: Optional[str] = None) -> List[Dict]:
+        positions = []
+        symbols = [symbol] if symbol else self._symbols
+        for sym in symbols:
+            held, entry = account.positions.get((sym, 'net'), [0.0, 0.0])
+            mark = self.mark_price(sym) if held else entry
+            positions.append({
+                'symbol': sym.replace('/', ''), 'positionAmt': str(held), 'entryPrice': str(entry),
+                'markPrice': str(mark), 'unRealizedProfit': str(held * (mark - entry)),
+                'unrealizedProfit': str(held * (mark - entry)), 'liquidationPrice': '0',
+                'leverage': str(account.leverage.get(sym, 1)), 'maxNotionalValue': '1000000000',
+                'maxNotional': '1000000000', 'marginType': 'cross', 'isolated': False,
+                'isolatedMargin': '0', 'isolatedWallet': '0', 'isAutoAddMargin': 'false',
+                'positionSide': 'BOTH', 'notional': str(held * mark),
+                'initialMargin': str(abs(held) * mark / account.leverage.get(sym, 1)), 'maintMargin': '0',
+                'positionInitialMargin': str(abs(held) * mark / account.leverage.get(sym, 1)),
+                'openOrderInitialMargin': '0', 'updateTime': self.clock.stamp()
+            })
+        return positions
+
+    async def _binance_account(self, request: web.Request) -> web.Response:
+        account = self.accounts['binance']
+        self._match_orders(account)
+        asset = self._binance_assets(account)
+        return web.json_response({
+            'feeTier': 0, 'canTrade': True, 'canDeposit': True, 'canWithdraw': True, 'updateTime': 0,
+            'totalInitialMargin': asset['initialMargin'], 'totalMaintMargin': '0',
+            'totalWalletBalance': asset['walletBalance'], 'totalUnrealizedProfit': asset['unrealizedProfit'],
+            'totalMarginBalance': asset['marginBalance'], 'totalPositionInitialMargin': asset['initialMargin'],
+            'totalOpenOrderInitialMargin': '0', 'totalCrossWalletBalance': asset['crossWalletBalance'],
+            'totalCrossUnPnl': asset['crossUnPnl'], 'availableBalance': asset['availableBalance'],
+            'maxWithdrawAmount': asset['maxWithdrawAmount'],
+            'assets': [asset], 'positions': self._binance_positions(account)
+        })
+
+    async def _binance_balance(self, request: web.Request) -> web.Response:
+        account = self.accounts['binance']
+        self._match_orders(account)
+        return web.json_response([self._binance_assets(account)])
+
+    async def _binance_position_risk(self, request: web.Request) -> web.Response:
+        account = self.accounts['binance']
+        self._match_orders(account)
+        params = request.query
+        symbol = self._binance_symbol(params['symbol']) if 'symbol' in params else None
+        return web.json_response(self._binance_positions(account, symbol))
+
+    async def _binance_leverage(self, request: web.Request) -> web.Response:
+        params = await self._binance_params(request)
+        symbol = self._binance_symbol(params.get('symbol', ''))
+        if symbol is None:
+            return self._binance_error(-1121, 'Invalid symbol.')
+        leverage = int(params.get('leverage', 1))
+        self.accounts['binance'].leverage[symbol] = leverage
+        return web.json_response({'leverage': leverage, 'maxNotionalValue': '1000000000', 'symbol': params['symbol']})
+
+    def _binance_order(self, order: Dict) -> Dict:
+        status = {'open': 'NEW', 'closed': 'FILLED', 'canceled': 'CANCELED'}[order['status']]
+        return {
+            'orderId': order['id'], 'symbol': order['symbol'].replace('/', ''), 'status': status,
+            'clientOrderId': order['client_id'], 'price': str(order['price'] or 0),
+            'avgPrice': str(order['average']), 'origQty': str(order['amount']),
+            'executedQty': str(order['filled']), 'cumQty': str(order['filled']),
+            'cumQuote': str(order['filled'] * order['average']), 'timeInForce': 'GTC',
+            'type': order['type'].upper(), 'origType': order['type'].upper(), 'reduceOnly': order['reduce_only'],
+            'closePosition': False, 'side': order['side'].upper(), 'positionSide': 'BOTH', 'stopPrice': '0',
+            'workingType': 'CONTRACT_PRICE', 'priceProtect': False, 'time': order['time'],
+            'updateTime': order['updated']
+        }
+
+    async def _binance_create_order(self, request: web.Request) -> web.Response:
+        params = await self._binance_params(request)
+        symbol = self._binance_symbol(params.get('symbol', ''))
+        if symbol is None:
+            return self._binance_error(-1121, 'Invalid symbol.')
+        account = self.accounts['binance']
+        self._match_orders(account)
+        try:
+            order = account.submit(
+                symbol=symbol,
+                side=params.get('side', '').lower(),
+                order_type=params.get('type', 'MARKET').lower(),
+                amount=float(params.get('quantity', 0)),
+                price=float(params['price']) if 'price' in params else None,
+                mark=self.mark_price(symbol),
+                now=self.clock.stamp(),
+                reduce_only=str(params.get('reduceOnly', 'false')).lower() == 'true',
+                client_id=params.get('newClientOrderId')
+            )
+        except KeyError:
+            return self._binance_error(-1121, 'Invalid symbol.')
+        except ValueError as e:
+            return self._binance_error(-2022 if 'reduce' in str(e) or '减仓' in str(e) else -4003, str(e))
+        return web.json_response(self._binance_order(order))
+
+    def _binance_find_order(self, params: Dict) -> Optional[Dict]:
+        orders = self.accounts['binance'].orders
+        if 'orderId' in params:
+            return orders.get(int(params['orderId']))
+        return self.accounts['binance'].client_ids.get(params.get('origClientOrderId'))
+
+    async def _binance_fetch_order(self, request: web.Request) -> web.Response:
+        self._match_orders(self.accounts['binance'])
+        order = self._binance_find_order(request.query)
+        if order is None:
+            return self._binance_error(-2013, 'Order does not exist.')
+        return web.json_response(self._binance_order(order))
+
+    async def _binance_cancel_order(self, request: web.Request) -> web.Response:
+        account = self.accounts['binance']
+        self._match_orders(account)
+        order = self._binance_find_order(await self._binance_params(request))
+        if order is None or order['status'] != 'open':
+            return self._binance_error(-2011, 'Unknown order sent.')
+        return web.json_response(self._binance_order(account.cancel(order['id'], self.clock.stamp())))
+
+    async def _binance_open_orders(self, request: web.Request) -> web.Response:
+        account = self.accounts['binance']
+        self._match_orders(account)
+        symbol = self._binance_symbol(request.query['symbol']) if 'symbol' in request.query else None
+        return web.json_response([
+            self._binance_order(o) for o in account.open_orders.values() if symbol is None or o['symbol'] == symbol
+        ])
+
+    async def _binance_ws(self, request: web.Request) -> web.WebSocketResponse:
+        """K线推送：/ws/btcusdt@kline_1m（原始格式）或 /stream?streams=a/b（组合格式）"""
+        combined = 'streams' not in request.match_info
+        names = (request.query.get('streams', '') if combined else request.match_info['streams']).split('/')
+        subs = {}
+        for name in filter(None, names):
+            market_id, _, interval = name.partition('@kline_')
+            symbol = self._binance_symbol(market_id)
+            if symbol is not None and interval:
+                subs[name] = (symbol, interval)
+
+        def message(name: str, tape: KlineTape, k: int) -> Dict:
+            t = int(tape.time[k])
+            event = {
+                'e': 'kline', 'E': self.clock.stamp(), 's': name.split('@')[0].upper(),
+                'k': {
+                    't': t, 'T': t + tape.step - 1, 's': name.split('@')[0].upper(), 'i': tape.timeframe,
+                    'f': -1, 'L': -1, 'o': repr(tape.open[k]), 'c': repr(tape.close[k]),
+                    'h': repr(tape.high[k]), 'l': repr(tape.low[k]), 'v': repr(tape.volume[k]), 'n': 0,
+                    'x': True, 'q': repr(tape.volume[k] * tape.close[k]), 'V': '0', 'Q': '0', 'B': '0'
+                }
+            }
+            return {'stream': name, 'data': event} if combined else event
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await self._serve_ws(ws, subs, message)
+        return ws
+
+    # ----------- OKX 永续接口 -----------
+    def _okx_symbol(self, inst_id: str) -> Optional[str]:
+        parts = inst_id.split('-')
+        return f"{parts[0]}/{parts[1]}" if len(parts) >= 2 and f"{parts[0]}/{parts[1]}" in self._symbols else None
+
+    @staticmethod
+    def _okx_response(data: List, code: str = '0', msg: str = '') -> web.Response:
+        return web.json_response({'code': code, 'msg': msg, 'data': data})
+
+    async def _okx_time(self, request: web.Request) -> web.Response:
+        return self._okx_response([{'ts': str(self.clock.stamp())}])
+
+    async def _okx_instruments(self, request: web.Request) -> web.Response:
+        inst_type = request.query.get('instType', 'SWAP')
+        data = []
+        if inst_type in ('SPOT', 'SWAP'):
+            for symbol in self._symbols:
+                base, quote = symbol.split('/')
+                swap = inst_type == 'SWAP'
+                data.append({
+                    'instType': inst_type, 'instId': f"{base}-{quote}-SWAP" if swap else f"{base}-{quote}",
+                    'uly': f"{base}-{quote}" if swap else '', 'instFamily': f"{base}-{quote}" if swap else '',
+                    'baseCcy': '' if swap else base, 'quoteCcy': '' if swap else quote,
+                    'settleCcy': quote if swap else '', 'ctValCcy': base if swap else '',
+                    'ctVal': '1' if swap else '', 'ctMult': '1' if swap else '', 'ctType': 'linear' if swap else '',
+                    'optType': '', 'stk': '', 'listTime': '1569398400000', 'expTime': '', 'lever': '125' if swap else '',
+                    'tickSz': '0.00000001', 'lotSz': '0.00000001', 'minSz': '0.00000001', 'alias': '',
+                    'state': 'live', 'maxLmtSz': '100000000', 'maxMktSz': '100000000'
+                })
+        return self._okx_response(data)
+
+    async def _okx_underlying(self, request: web.Request) -> web.Response:
+        return self._okx_response([[]])
+
+    async def _okx_candles(self, request: web.Request) -> web.Response:
+        """OKX 语义：返回 after 之前（更早）、before 之后（更晚）最近的 limit 根，按时间倒序"""
+        params = request.query
+        symbol = self._okx_symbol(params.get('instId', ''))
+        try:
+            tape = self.tape(symbol, okx_timeframe(params.get('bar', '1m')))
+        except (KeyError, ValueError):
+            return self._okx_response([], '51001', 'Instrument ID does not exist')
+        limit = min(int(params.get('limit', 100)), 300)
+        hi = tape.visible(self.clock.now())
+        if params.get('after'):
+            hi = min(hi, int(np.searchsorted(tape.time, int(params['after']), side='left')))
+        lo = int(np.searchsorted(tape.time, int(params['before']), side='right')) if params.get('before') else 0
+        bars = slice(max(lo, hi - limit), max(lo, hi))
+        rows = [
+            [str(int(t)), repr(o), repr(h), repr(l), repr(c), repr(v), repr(v), repr(v * c), '1']
+            for t, o, h, l, c, v in zip(
+                tape.time[bars], tape.open[bars], tape.high[bars], tape.low[bars], tape.close[bars], tape.volume[bars]
+            )
+        ]
+        return self._okx_response(rows[::-1])
+
+    async def _okx_balance(self, request: web.Request) -> web.Response:
+        account = self.accounts['okx']
+        self._match_orders(account)
+        snap = account.snapshot(self._marks(account))
+        now = str(self.clock.stamp())
+        return self._okx_response([{
+            'totalEq': str(snap['total']), 'adjEq': str(snap['total']), 'imr': str(snap['used']), 'mmr': '0',
+            'uTime': now,
+            'details': [{
+                'ccy': 'USDT', 'eq': str(snap['total']), 'cashBal': str(snap['wallet']),
+                'availBal': str(snap['free']), 'availEq': str(snap['free']), 'frozenBal': str(snap['used']),
+                'ordFrozen': '0', 'upl': str(snap['unrealized']), 'eqUsd': str(snap['total']), 'uTime': now
+            }]
+        }])
+
+    async def _okx_positions(self, request: web.Request) -> web.Response:
+        account = self.accounts['okx']
+        self._match_orders(account)
+        inst_ids = set(filter(None, request.query.get('instId', '').split(',')))
+        data = []
+        for (symbol, key), (held, entry) in account.positions.items():
+            base, quote = symbol.split('/')
+            inst_id = f"{base}-{quote}-SWAP"
+            if inst_ids and inst_id not in inst_ids:
+                continue
+            mark = self.mark_price(symbol)
+            lever = account.leverage.get(symbol, 1)
+            data.append({
+                'instType': 'SWAP', 'instId': inst_id, 'mgnMode': 'cross', 'posId': f"{inst_id}-{key}",
+                'posSide': key, 'pos': str(held if key == 'net' else abs(held)), 'availPos': str(abs(held)),
+                'posCcy': '', 'ccy': quote, 'avgPx': str(entry), 'markPx': str(mark), 'last': str(mark),
+                'upl': str(held * (mark - entry)), 'uplRatio': str(held * (mark - entry) / (abs(held) * entry / lever)),
+                'lever': str(lever), 'liqPx': '', 'imr': str(abs(held) * mark / lever), 'margin': '', 'mmr': '0',
+                'notionalUsd': str(abs(held) * mark), 'adl': '1', 'cTime': str(self.clock.stamp()),
+                'uTime': str(self.clock.stamp())
+            })
+        return self._okx_response(data)
+
+    async def _okx_set_leverage(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        symbol = self._okx_symbol(body.get('instId', ''))
+        if symbol is None:
+            return self._okx_response([], '51001', 'Instrument ID does not exist')
+        self.accounts['okx'].leverage[symbol] = int(float(body.get('lever', 1)))
+        return self._okx_response([{
+            'instId': body['instId'], 'lever': body.get('lever'), 'mgnMode': body.get('mgnMode', 'cross'), 'posSide': ''
+        }])
+
+    async def _okx_set_position_mode(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        account = self.accounts['okx']
+        if any(held for held, _ in account.positions.values()):
+            return self._okx_response([], '59000', 'Setting failed. Cancel any open orders, close positions first')
+        account.hedge_mode = body.get('posMode') == 'long_short_mode'
+        return self._okx_response([{'posMode': body.get('posMode')}])
+
+    def _okx_order(self, order: Dict) -> Dict:
+        base, quote = order['symbol'].split('/')
+        state = {'open': 'live', 'closed': 'filled', 'canceled': 'canceled'}[order['status']]
+        return {
+            'instType': 'SWAP', 'instId': f"{base}-{quote}-SWAP", 'ordId': str(order['id']),
+            'clOrdId': order['client_id'], 'tag': '', 'px': str(order['price'] or ''), 'sz': str(order['amount']),
+            'ordType': order['type'], 'side': order['side'], 'posSide': order['position'], 'tdMode': 'cross',
+            'accFillSz': str(order['filled']), 'fillPx': str(order['average'] or ''),
+            'avgPx': str(order['average'] or ''), 'state': state, 'lever': '', 'fee': str(-order['fee']),
+            'feeCcy': quote, 'reduceOnly': str(order['reduce_only']).lower(), 'cTime': str(order['time']),
+            'uTime': str(order['updated'])
+        }
+
+    async def _okx_create_order(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        symbol = self._okx_symbol(body.get('instId', ''))
+        if symbol is None:
+            return self._okx_response([{'sCode': '51001', 'sMsg': 'Instrument ID does not exist'}], '1', 'Operation failed')
+        account = self.accounts['okx']
+        self._match_orders(account)
+        try:
+            order = account.submit(
+                symbol=symbol,
+                side=body.get('side', ''),
+                order_type='limit' if body.get('ordType') in ('limit', 'post_only') else 'market',
+                amount=float(body.get('sz', 0)),
+                price=float(body['px']) if body.get('px') else None,
+                mark=self.mark_price(symbol),
+                now=self.clock.stamp(),
+                reduce_only=str(body.get('reduceOnly', 'false')).lower() == 'true',
+                pos_side=body.get('posSide'),
+                client_id=body.get('clOrdId')
+            )
+        except (KeyError, ValueError) as e:
+            return self._okx_response([{'sCode': '51000', 'sMsg': str(e)}], '1', 'Operation failed')
+        return self._okx_response([{
+            'ordId': str(order['id']), 'clOrdId': order['client_id'], 'tag': '', 'sCode': '0', 'sMsg': ''
+        }])
+
+    def _okx_find_order(self, params: Dict) -> Optional[Dict]:
+        orders = self.accounts['okx'].orders
+        if params.get('ordId'):
+            return orders.get(int(params['ordId']))
+        return self.accounts['okx'].client_ids.get(params.get('clOrdId'))
+
+    async def _okx_fetch_order(self, request: web.Request) -> web.Response:
+        self._match_orders(self.accounts['okx'])
+        order = self._okx_find_order(request.query)
+        if order is None:
+            return self._okx_response([], '51603', 'Order does not exist')
+        return self._okx_response([self._okx_order(order)])
+
+    async def _okx_cancel_order(self, request: web.Request) -> web.Response:
+        account = self.accounts['okx']
+        self._match_orders(account)
+        order = self._okx_find_order(await request.json())
+        if order is None or order['status'] != 'open':
+            return self._okx_response([{'sCode': '51400', 'sMsg': 'Cancellation failed'}], '1', 'Operation failed')
+        account.cancel(order['id'], self.clock.stamp())
+        return self._okx_response([{'ordId': str(order['id']), 'clOrdId': order['client_id'], 'sCode': '0', 'sMsg': ''}])
+
+    async def _okx_ws(self, request: web.Request) -> web.WebSocketResponse:
+        """K线推送：{"op": "subscribe", "args": [{"channel": "candle1m", "instId": "BTC-USDT-SWAP"}]}，支持 ping/pong"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subs = {}
+
+        def message(name: str, tape: KlineTape, k: int) -> Dict:
+            channel, inst_id = name.split('|')
+            v, c = tape.volume[k], tape.close[k]
+            row = [str(int(tape.time[k])), repr(tape.open[k]), repr(tape.high[k]), repr(tape.low[k]), repr(c),
+                   repr(v), repr(v), repr(v * c), '1']
+            return {'arg': {'channel': channel, 'instId': inst_id}, 'data': [row]}
+
+        async def on_message(data: str):
+            if data == 'ping':
+                await ws.send_str('pong')
+                return
+            request_msg = json.loads(data)
+            for arg in request_msg.get('args', []):
+                channel, symbol = arg.get('channel', ''), self._okx_symbol(arg.get('instId', ''))
+                name = f"{channel}|{arg.get('instId')}"
+                if request_msg.get('op') == 'unsubscribe':
+                    subs.pop(name, None)
+                elif channel.startswith('candle') and symbol is not None:
+                    subs[name] = (symbol, okx_timeframe(channel[len('candle'):]))
+                else:
+                    await ws.send_json({'event': 'error', 'code': '60018', 'msg': f"Wrong URL or channel: {arg}"})
+                    continue
+                await ws.send_json({'event': request_msg.get('op'), 'arg': arg, 'connId': 'replay'})
+
+        await self._serve_ws(ws, subs, message, on_message)
+        return ws
+
+    # ----------- WebSocket 推送 -----------
+    async def _serve_ws(self, ws: web.WebSocketResponse, subs: Dict, message, on_message=None):
+        """
+        推送订阅K线中新收盘的K线，直到连接关闭
+        :param subs: {订阅名: (symbol, timeframe)}（on_message 可动态增删）
+        :param message: message(订阅名, tape, K线下标) → 推送的 JSON
+        """
+        sent = {}  # {订阅名: 已推送到的K线下标}
+
+        async def push():
+            while not ws.closed:
+                now = self.clock.now()
+                for name, (symbol, timeframe) in list(subs.items()):
+                    try:
+                        tape = self.tape(symbol, timeframe)
+                    except (KeyError, ValueError):
+                        continue
+                    n = tape.visible(now)
+                    for k in range(sent.setdefault(name, n), n):
+                        await ws.send_json(message(name, tape, k))
+                    sent[name] = n
+                await asyncio.sleep(self.ws_interval)
+
+        pusher = asyncio.ensure_future(push())
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT and on_message is not None:
+                    await on_message(msg.data)
+        finally:
+            pusher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线交易所回放服务（Binance 合约 / OKX 永续）")
+    parser.add_argument('--data-dir', default="data/historical")
+    parser.add_argument('--exchange', default="binance", help="回放哪个交易所录制的数据")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放倍速")
+    parser.add_argument('--start', default=None, help="回放起点（数据时间），不指定时全部数据可见")
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.0, 0.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        data_dir=args.data_dir, exchange=args.exchange, speed=args.speed, start=args.start,
+        latency=tuple(args.latency), error_rate=args.error_rate, error_status=args.error_status,
+        host=args.host, port=args.port
+    )
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,66 @@
+import os
+import time
+import pickle
 import numpy as np 
 import pandas as pd
-from typing import Dict, List, Optional, Tuple 
+from typing import Callable, Dict, Iterable, List, Optional 
 from collections import defaultdict
+from ..utils.logger  import logger
+from ..utils.data_processor  import resample_klines
 from ..utils.portfolio  import PortfolioAllocator  # 新增资产组合管理工具
- 
+from .market_data import AlignedMarketData
+from .metrics import StreamingMetrics
+from .indicator_cache import IndicatorCache
+from .order_simulator import OrderSimulator
+from .trade_store import ColumnBuffer, TradeStore, EQUITY_SCHEMA
+from .result_cache import ResultCache, describe_object
+from .vectorized import run_vectorized
+from .compact import compact_frame, memory_report
+
+# 信号动作 → 成交方向（1=买入, -1=卖出）
+ACTION_SIDES = {'buy': 1, 'open_long': 1, 'sell': -1, 'open_short': -1}
+
+# 回测引擎版本（成交、费用或绩效计算逻辑变化时递增，使旧的缓存结果失效）
+ENGINE_VERSION = '1'
+
+class BacktestEngine:
+    """
+    回测引擎基类
+    功能：
+    - 管理初始资金和交易记录
+    - 将K线数据交给策略生成信号
+    """
+
+    def __init__(self, initial_balance: float = 10000, strategy=None, seed: Optional[int] = None):
+        """
+        :param initial_balance: 初始资金（USDT）
+        :param strategy: BaseStrategy 实例（提供 calculate_signals）
+        :param seed: 滑点随机数种子（相同种子的回测结果可复现）
+        """
+        self.initial_balance  = initial_balance
+        self.strategy  = strategy
+        self.seed  = seed
+        self.rng  = np.random.default_rng(seed)
+        self.history  = TradeStore()  # 列式交易记录（兼容 history[symbol] 读取交易字典列表）
+        self.equity  = ColumnBuffer(EQUITY_SCHEMA)  # 列式资金曲线（最近一次回测）
+        self.record_history  = True  # False 时不保存交易记录和资金曲线，仅流式统计
+        self.metrics  = None  # 流式绩效统计（StreamingMetrics），回测中途可读取
+
+    def _reset_results(self, symbols: Optional[List[str]] = None, capacity: int = 1024):
+        """每次回测开始时新建交易记录、资金曲线和绩效统计（同一引擎的多次回测互不累加）"""
+        self.history  = TradeStore(symbols)
+        self.equity  = ColumnBuffer(EQUITY_SCHEMA, capacity=capacity)
+        self.metrics  = None
+
+    def _generate_signal(self, symbol: str, klines: Dict) -> Optional[Dict]:
+        """
+        调用策略生成信号
+        :param klines: 截至当前K线的历史数据 {'open': [...], 'close': [...], ...}
+        """
+        if self.strategy is None:
+            return None
+        return self.strategy.calculate_signals(symbol, klines)
+
 class MultiBacktestEngine(BacktestEngine):
     """
     多币种回测引擎（继承自BacktestEngine）
@@ -11,12 +68,25 @@ class MultiBacktestEngine(BacktestEngine):
     - 支持多交易对并行回测 
     - 资产组合权重动态调整
     - 跨币种风险暴露控制 
+    - 向量化执行模式（mode='vectorized'）
+    - 事件驱动撮合模式（run_event_driven，支持限价/止损等订单类型）
+    - 流式绩效统计（逐K线 O(1) 更新，可选不保存交易记录和资金曲线）
+    - 定期保存检查点，中断后可从最近的检查点恢复（仅逐K线模式）
+    - 分块流式回测（run_streaming，逐块读取 parquet 行情，内存占用与数据量无关）
+    - 回测结果缓存（result_cache，输入完全相同的回测直接返回已保存的结果）
+    - 紧凑行情（compact=True）：int64 毫秒时间戳索引，价格/成交量在精度允许时以 float32 存储，内存约减半
     """
  
-    def __init__(self, initial_balance: float = 10000):
-        super().__init__(initial_balance)
+    def __init__(self, initial_balance: float = 10000, strategy=None, seed: Optional[int] = None):
+        super().__init__(initial_balance, strategy, seed)
         self.symbol_data  = {}  # 存储各交易对历史数据 {symbol: klines}
+        self.market  = None     # 对齐后的行情矩阵（AlignedMarketData）
         self.allocator  = PortfolioAllocator(method="risk_parity")  # 资产分配器
+        self.vol_window  = pd.Timedelta(days=30)  # 资产分配使用的波动率回看窗口
+        self.data_spec  = None     # 最近一次 load_data 的数据范围 {'symbols', 'timeframe', 'start', 'end'}
+        self.result_cache: Optional[ResultCache] = None  # 回测结果缓存（None 表示不缓存）
+        self.compact  = False   # load_data 是否转换为紧凑列类型（见 compact_frame）
+        self._checkpoint_rows  = (0, 0)  # 已写入检查点的 (成交记录行数, 资金曲线行数)
  
     def load_data(
         self,
@@ -29,6 +99,8 @@ class MultiBacktestEngine(BacktestEngine):
         """
         加载多币种历史数据
         :param klines_map: {symbol: klines} 格式的数据字典 
+        compact 为 True 时各币种K线转换为紧凑列类型，对齐矩阵随之为 float32（精度不足的列保持 float64）；
+        策略和成交价格随之以 float32 计算，结果与默认模式相差 float32 舍入误差（恰好相等的比较可能翻转）
         """
         for symbol, klines in klines_map.items(): 
             df = pd.DataFrame(klines)
@@ -40,59 +112,359 @@ class MultiBacktestEngine(BacktestEngine):
             if end:
                 df = df[df.index <= pd.to_datetime(end)] 
             
-            self.symbol_data[symbol]  = resample_klines(df, timeframe)
+            df = resample_klines(df, timeframe)
+            self.symbol_data[symbol]  = compact_frame(df) if self.compact else df
+
+        # 一次性对齐为 (symbols, bars) 矩阵，回测中按整数下标读取
+        self.market  = AlignedMarketData.from_frames(self.symbol_data)
+        self.data_spec  = {'symbols': list(symbols), 'timeframe': timeframe, 'start': start, 'end': end}
         logger.info(f" 加载 {len(symbols)} 个交易对数据 | 时间范围: {start} 至 {end}")
  
     def run(
         self,
         commission: float = 0.0005,
         slippage: float = 0.0001,
-        rebalance_freq: str = 'W'  # 资产再平衡频率（周/月/季度）
+        rebalance_freq: str = 'W',  # 资产再平衡频率（周/月/季度）
+        mode: str = 'loop',
+        record: bool = True,
+        progress: Optional[Callable[[int, Dict], None]] = None,
+        progress_every: int = 1000,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: float = 300.0,
+        resume: bool = False
     ) -> Dict[str, Dict]:
         """
         执行多币种回测 
+        信号在K线收盘时生成，于该币种下一根K线开盘价成交（避免前视偏差）
+        :param mode: 'loop'（逐K线执行）或 'vectorized'（NumPy数组一次性计算，结果与逐K线一致）
+        :param record: 是否保存交易记录和资金曲线（False 时报告中资金曲线为 None；逐K线模式内存占用与回测长度无关，
+                       向量化模式的计算数组仍与回测长度成正比，只省去交易记录和资金曲线）
+        :param progress: 进度回调 progress(bar_index, metrics_snapshot)，每 progress_every 根K线调用一次（仅逐K线模式）
+        :param checkpoint_path: 检查点文件路径（None 表示不保存；回测正常结束后删除；仅逐K线模式）
+        :param checkpoint_interval: 两次保存检查点的最短间隔（秒）
+        :param resume: 若检查点存在，从中恢复并继续回测（仅逐K线模式）
         :return: {
             'portfolio': {总资金曲线和绩效},
             'symbols': {各币种详细交易记录}
         }
+        :raises ValueError: 尚未加载行情、回测模式无效，或向量化模式指定了 progress / checkpoint_path / resume
+        设置 result_cache 且指定 seed 时，输入完全相同的回测直接返回缓存结果（不调用 progress）
         """
+        if self.market is None:
+            raise ValueError("尚未加载行情数据，请先调用 load_data()")
+        if mode not in ('loop', 'vectorized'):
+            raise ValueError(f"不支持的回测模式: {mode}")
+        if mode == 'vectorized' and (progress is not None or checkpoint_path or resume):
+            raise ValueError("向量化模式不支持 progress / checkpoint_path / resume，请使用 mode='loop'")
+        # 先清空上一次回测的结果，缓存的交易记录只包含本次回测的成交
+        self._reset_results(self.market.symbols, self.market.n_bars if record else 1024)
+        cache_key = None
+        if self.result_cache is not None and self.seed is not None:  # 未指定种子时滑点不可复现，不缓存
+            cache_key = self._result_cache_key(commission, slippage, rebalance_freq, mode, record)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                self.history, self.equity, self.metrics = cached['history'], cached['equity'], cached['metrics']
+                logger.info(f" 命中回测结果缓存: {cache_key[:12]}")
+                return cached['report']
+
+        # 每次运行重置随机数生成器，保证同一种子下结果可复现
+        self.rng = np.random.default_rng(self.seed)
+        self.metrics  = self._new_metrics()
+        self.record_history  = record
+        if mode == 'vectorized':
+            return self._store_result(cache_key, self._run_vectorized(commission, slippage, rebalance_freq, record=record))
+        self._reset_allocator()
+
         # 初始化资产组合 
         portfolio = defaultdict(float)
         portfolio['USDT'] = self.initial_balance  
         results = {sym: {'trades': []} for sym in self.symbol_data.keys()} 
+        pending = {}      # 待成交信号 {symbol: signal}
+        last_close = {}   # 各币种最新收盘价（用于资金曲线）
+        cursor = 0        # 下一根待处理K线的下标
+        config = {
+            'symbols': list(self.market.symbols),
+            'n_bars': self.market.n_bars,
+            'data': self.market.fingerprint(),  # 形状相同但内容不同的行情不能续跑
+            'commission': commission,
+            'slippage': slippage,
+            'rebalance_freq': rebalance_freq,
+            'record': record
+        }
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            state = self._load_checkpoint(checkpoint_path, config)
+            portfolio.update(state['portfolio'])
+            pending, last_close, cursor = state['pending'], state['last_close'], state['cursor']
+        elif checkpoint_path:
+            self._remove_checkpoint(checkpoint_path)  # 之前未完成回测的检查点不再有效
+            self._checkpoint_rows  = (0, 0)
+        last_checkpoint = time.monotonic()
         
         # 获取统一时间轴
         timestamps = self._get_aligned_timestamps()
         
-        for i, ts in enumerate(timestamps):
-            # 每日/每周再平衡
-            if self._need_rebalance(ts, rebalance_freq):
-                weights = self.allocator.calculate_weights( 
-                    symbols=list(self.symbol_data.keys()), 
-                    volatilities={sym: self._get_recent_volatility(sym, ts) for sym in self.symbol_data} 
+        for i in range(cursor, len(timestamps)):
+            equity = self._step(
+                i, timestamps[i], portfolio, pending, last_close, commission, slippage, rebalance_freq
+            )
+            if record:
+                self.equity.append(time=self.market.timestamps[i], equity=equity)
+            if checkpoint_path and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                self._save_checkpoint(checkpoint_path, {
+                    'config': config,
+                    'cursor': i + 1,
+                    'portfolio': dict(portfolio),
+                    'pending': pending,
+                    'last_close': last_close
+                })
+                last_checkpoint = time.monotonic()
+            if progress and (i + 1) % progress_every == 0:
+                progress(i, self.metrics.snapshot())
+        
+        if checkpoint_path:
+            self._remove_checkpoint(checkpoint_path)
+        report = self._generate_multi_report(results, portfolio, self._equity_series() if record else None)
+        return self._store_result(cache_key, report)
+
+    def run_streaming(
+        self,
+        feed: Iterable[Dict[str, pd.DataFrame]],
+        commission: float = 0.0005,
+        slippage: float = 0.0001,
+        rebalance_freq: str = 'W',
+        lookback: int = 500,
+        record: bool = False,
+        progress: Optional[Callable[[int, Dict], None]] = None,
+        progress_every: int = 1000
+    ) -> Dict[str, Dict]:
+        """
+        分块流式回测（数据量超过内存时使用，峰值内存由分块大小决定）
+        逐块对齐行情并按逐K线模式执行；资产组合、待成交信号和绩效统计跨块延续，
+        每个币种保留最近 lookback 根K线（及波动率窗口内的K线）拼接到下一块之前，供策略指标预热
+        :param feed: 按时间排序的分块迭代器，每块为 {symbol: DataFrame}（如 ParquetChunkFeed），K线已是回测周期
+        :param lookback: 跨块保留的历史K线数（应不少于策略指标所需的最长周期）
+        :param record: 是否保存交易记录和资金曲线（默认不保存，内存占用与数据量无关）
+        """
+        self.rng = np.random.default_rng(self.seed)
+        self._reset_results()
+        self.record_history  = record
+        self._reset_allocator()
+
+        portfolio = defaultdict(float)
+        portfolio['USDT'] = self.initial_balance
+        pending, last_close = {}, {}
+        tails = {}  # 各币种跨块保留的历史K线
+        n_done = 0
+
+        for chunk in feed:
+            frames = {
+                sym: pd.concat([tails[sym], df]) if sym in tails else df
+                for sym, df in chunk.items()
+            }
+            self.market  = AlignedMarketData.from_frames(frames)
+            if self.metrics is None:
+                self.metrics  = self._new_metrics()
+            # 只处理本块新增的K线（保留的历史K线仅用于指标计算）
+            new_times = [df.index.values.astype('datetime64[ms]').astype(np.int64) for df in chunk.values() if len(df)]
+            if not new_times:
+                continue
+            start = int(np.searchsorted(self.market.timestamps, min(t[0] for t in new_times)))
+            timestamps = self.market.datetimes
+
+            for i in range(start, self.market.n_bars):
+                equity = self._step(
+                    i, timestamps[i], portfolio, pending, last_close, commission, slippage, rebalance_freq
+                )
+                if record:
+                    self.equity.append(time=self.market.timestamps[i], equity=equity)
+                n_done += 1
+                if progress and n_done % progress_every == 0:
+                    progress(n_done - 1, self.metrics.snapshot())
+
+            cutoff = timestamps[-1] - self.vol_window
+            tails = {
+                sym: df[(np.arange(len(df)) >= len(df) - lookback) | (df.index > cutoff)]
+                for sym, df in frames.items()
+            }
+
+        if self.market is None:
+            raise ValueError("数据源为空")
+        logger.info(f" 流式回测完成: {n_done} 根K线")
+        return self._generate_multi_report({}, portfolio, self._equity_series() if record else None)
+
+    def _step(
+        self,
+        i: int,
+        ts: pd.Timestamp,
+        portfolio: Dict[str, float],
+        pending: Dict[str, Dict],
+        last_close: Dict[str, float],
+        commission: float,
+        slippage: float,
+        rebalance_freq: str
+    ) -> float:
+        """
+        处理时间轴下标 i 处的一根K线（再平衡 → 成交上一根信号 → 生成新信号）
+        :return: K线收盘后的组合总价值
+        """
+        # 每日/每周再平衡
+        if self._need_rebalance(ts, rebalance_freq):
+            self._rebalance_portfolio(portfolio, self._calculate_weights(i), ts)
+        
+        # 遍历所有交易对（按整数下标读取，缺失K线跳过）
+        for symbol in self.market.symbols: 
+            kline = self._get_kline_at(symbol, i)
+            if kline is None:
+                continue
+
+            # 上一根K线的信号按本K线开盘价成交
+            if symbol in pending:
+                self._execute_multi_trade(
+                    symbol=symbol,
+                    signal=pending.pop(symbol),
+                    portfolio=portfolio,
+                    commission=commission,
+                    slippage=slippage,
+                    timestamp=ts,
+                    price=kline['open']
                 )
-                self._rebalance_portfolio(portfolio, weights, ts)
+            last_close[symbol] = kline['close']
             
-            # 遍历所有交易对 
-            for symbol in self.symbol_data.keys(): 
-                kline = self._get_kline_at(symbol, ts)
+            # 执行策略逻辑（继承自父类）
+            signal = self._generate_signal(symbol, self._get_history_until(symbol, i))
+            if signal and signal.get('action') in ACTION_SIDES:
+                pending[symbol] = signal
+
+        return self._update_metrics(portfolio, last_close)
+
+    def _run_vectorized(
+        self,
+        commission: float,
+        slippage: float,
+        rebalance_freq: str,
+        signals: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+        record: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        向量化回测：信号、成交、手续费和资金曲线均以 (symbols, bars) 数组整体计算
+        仅再平衡时点调用资产分配器，其余步骤无逐K线Python循环
+        :param signals: 预先生成的信号矩阵（默认由当前策略生成）
+        :param weights: 预先计算的权重矩阵（默认按 rebalance_freq 计算）
+        :param record: 是否保存交易记录和资金曲线（False 时只更新流式绩效统计，报告中资金曲线为 None；
+                       计算用的 (symbols, bars) 数组仍与回测长度成正比）
+        """
+        market = self.market
+        symbols = market.symbols
+        timestamps = market.datetimes
+        if signals is None:
+            signals = self._generate_signal_matrix()
+        if weights is None:
+            weights = self._build_weight_matrix(timestamps, rebalance_freq)
+
+        sim = run_vectorized(
+            market.fields['open'], market.fields['close'], market.valid, signals, weights,
+            initial_balance=self.initial_balance,
+            commission=commission,
+            slippage=slippage,
+            rng=self.rng
+        )
+
+        # 逐笔结算持仓段盈亏，并按列批量写入交易记录（与逐K线模式内容一致）
+        n_trades = len(sim['trade_bar'])
+        pnl = np.empty(n_trades)
+        for k in range(n_trades):
+            pnl[k] = self.metrics.record_fill(
+                symbols[sim['trade_symbol'][k]], sim['trade_side'][k],
+                sim['trade_price'][k], sim['trade_amount'][k], sim['trade_fee'][k]
+            )
+        if record:
+            store_ids = np.array([self.history.symbol_id(sym) for sym in symbols], dtype=np.int32)
+            self.history.extend(
+                time=market.timestamps[sim['trade_bar']],
+                symbol=store_ids[sim['trade_symbol']],
+                side=sim['trade_side'],
+                price=sim['trade_price'],
+                amount=sim['trade_amount'],
+                fee=sim['trade_fee'],
+                pnl=pnl
+            )
+
+        equity = sim['equity']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            exposure = np.where(equity > 0, 1 - sim['cash'] / equity, 0.0)
+        self.metrics.update_batch(equity, exposure)
+        if record:
+            self.equity  = ColumnBuffer(EQUITY_SCHEMA, capacity=len(equity))
+            self.equity.extend(time=market.timestamps, equity=equity)
+
+        portfolio = defaultdict(float)
+        portfolio['USDT'] = sim['cash'][-1] if len(timestamps) else self.initial_balance
+        for s, symbol in enumerate(symbols):
+            portfolio[symbol.split('/')[0]] = sim['positions'][s, -1] if len(timestamps) else 0.0
+        results = {sym: {'trades': []} for sym in symbols}
+        return self._generate_multi_report(results, portfolio, self._equity_series() if record else None)
+ 
+    def run_event_driven(
+        self,
+        on_bar: Callable[[str, Dict, OrderSimulator], None],
+        simulator: Optional[OrderSimulator] = None,
+        record: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        事件驱动回测：策略通过 OrderSimulator 提交 Order（与实盘相同的下单代码），
+        每根K线先撮合已有订单，再回调 on_bar 供策略下单/撤单
+        :param on_bar: 回调 on_bar(symbol, kline, simulator)
+        :param simulator: 撮合模拟器（默认使用 OrderSimulator()）
+        :param record: 是否保存交易记录和资金曲线
+        """
+        simulator = simulator or OrderSimulator()
+        market = self.market
+        self._reset_results(market.symbols, market.n_bars)
+        self.metrics  = self._new_metrics()
+        self.record_history  = record
+        portfolio = defaultdict(float)
+        portfolio['USDT'] = self.initial_balance
+        results = {sym: {'trades': []} for sym in market.symbols}
+        last_close = {}
+
+        for i in range(market.n_bars):
+            for s, symbol in enumerate(market.symbols):
+                kline = market.kline_at(s, i)
                 if kline is None:
                     continue
-                
-                # 执行策略逻辑（继承自父类）
-                signal = self._generate_signal(symbol, kline)
-                if signal:
-                    self._execute_multi_trade(
-                        symbol=symbol,
-                        signal=signal,
-                        portfolio=portfolio,
-                        commission=commission,
-                        slippage=slippage,
-                        timestamp=ts 
-                    )
-        
-        return self._generate_multi_report(results, portfolio)
- 
+                fills = simulator.process_bar(
+                    symbol, int(kline['time']), kline['open'], kline['high'],
+                    kline['low'], kline['close'], kline['volume']
+                )
+                for fill in fills:
+                    self._apply_fill(fill, portfolio)
+                last_close[symbol] = kline['close']
+                on_bar(symbol, kline, simulator)
+            equity = self._update_metrics(portfolio, last_close)
+            if record:
+                self.equity.append(time=market.timestamps[i], equity=equity)
+
+        return self._generate_multi_report(results, portfolio, self._equity_series() if record else None)
+
+    def _apply_fill(self, fill: Dict, portfolio: Dict[str, float]):
+        """将撮合成交记入资产组合和交易记录"""
+        base, quote = fill['symbol'].split('/')
+        notional = fill['amount'] * fill['price']
+        if fill['action'] == 'buy':
+            portfolio[quote] -= notional
+            portfolio[base] += fill['amount']
+        else:
+            portfolio[base] -= fill['amount']
+            portfolio[quote] += notional
+        portfolio[quote] -= fill['commission']
+        side = ACTION_SIDES[fill['action']]
+        pnl = self.metrics.record_fill(fill['symbol'], side, fill['price'], fill['amount'], fill['commission'])
+        if self.record_history:
+            self.history.record(
+                fill['symbol'], fill['time'], side, fill['price'], fill['amount'], fill['commission'], pnl
+            )
+
     def _execute_multi_trade(
         self,
         symbol: str,
@@ -100,93 +472,219 @@ class MultiBacktestEngine(BacktestEngine):
         portfolio: Dict[str, float],
         commission: float,
         slippage: float,
-        timestamp: str 
+        timestamp: pd.Timestamp,
+        price: float = None
     ):
-        """多币种交易执行（考虑资产组合）"""
+        """
+        多币种交易执行（考虑资产组合）
+        :param price: 成交基准价（默认使用信号价格）
+        """
         base, quote = symbol.split('/')   # 如BTC/USDT → base=BTC, quote=USDT 
-        price = signal['price'] * (1 + np.random.normal(0,  slippage))
+        price = (signal['price'] if price is None else price) * (1 + self.rng.normal(0,  slippage))
         
         # 计算可分配资金 
         allocated = portfolio[quote] * self.allocator.weights.get(symbol,  0)
         amount = allocated / price 
+        side = ACTION_SIDES[signal['action']]
         
-        # 记录交易 
-        trade = {
-            'time': timestamp,
-            'symbol': symbol,
-            'action': signal['action'],
-            'price': price,
-            'amount': amount,
-            'commission': amount * price * commission 
-        }
+        fee = amount * price * commission 
         
-        # 更新资产组合 
-        if signal['action'] == 'buy':
+        # 更新资产组合（手续费以计价货币扣除）
+        if side > 0:
             portfolio[quote] -= amount * price 
             portfolio[base] += amount 
         else:
             portfolio[base] -= amount 
             portfolio[quote] += amount * price 
+        portfolio[quote] -= fee
         
-        self.history[symbol].append(trade) 
+        # 记录交易 
+        pnl = self.metrics.record_fill(symbol, side, price, amount, fee)
+        if self.record_history:
+            self.history.record(symbol, pd.Timestamp(timestamp).value // 1000000, side, price, amount, fee, pnl)
  
-    def _generate_multi_report(self, results: Dict, portfolio: Dict) -> Dict:
+    def _generate_multi_report(self, results: Dict, portfolio: Dict, equity_curve: pd.Series = None) -> Dict:
         """生成多币种报告"""
         # 计算总资金曲线（按最终价格折算为USDT）
         total_value = portfolio['USDT']
-        for sym, klines in self.symbol_data.items(): 
+        for s, sym in enumerate(self.market.symbols): 
             base = sym.split('/')[0] 
-            if base in portfolio:
-                total_value += portfolio[base] * klines[-1]['close']
-        
-        # 各币种绩效分析 
-        symbol_metrics = {}
-        for sym, trades in self.history.items(): 
-            df = pd.DataFrame(trades)
-            if len(df) == 0:
-                continue
-                
-            df['pnl'] = df['price'].diff() * df['amount']  # 简化计算 
-            symbol_metrics[sym] = {
-                'total_return': df['pnl'].sum() / self.initial_balance, 
-                'win_rate': len(df[df['pnl'] > 0]) / len(df)
-            }
+            closes = self.market.columns[s]['close']
+            if base in portfolio and len(closes):
+                total_value += portfolio[base] * closes[-1]
         
+        # 绩效指标直接读取流式统计，不再由交易记录重建 DataFrame
+        metrics = self.metrics.snapshot()
         return {
             'portfolio': {
                 'final_value': total_value,
                 'return': total_value / self.initial_balance  - 1,
-                'symbol_weights': self.allocator.weights 
+                'symbol_weights': self.allocator.weights,
+                'equity_curve': equity_curve,
+                **{k: metrics[k] for k in ('max_drawdown', 'sharpe', 'sortino', 'win_rate', 'profit_factor', 'exposure')}
             },
-            'symbols': symbol_metrics
+            'symbols': self.metrics.symbol_snapshot()
         }
  
+    # ----------- 检查点 -----------
+    def _save_checkpoint(self, path: str, state: Dict):
+        """
+        保存检查点：循环状态 + 资产分配器、流式绩效统计和随机数生成器
+        交易记录和资金曲线只把上次保存之后新增的行追加到 {path}.rows，每次保存的开销与已回测长度无关
+        先追加新增行，再写临时文件并原子替换主文件，写入中途崩溃不会破坏上一个检查点
+        """
+        saved_trades, saved_equity = self._checkpoint_rows
+        with open(f"{path}.rows", 'ab') as f:
+            pickle.dump({
+                'history': {name: values[saved_trades:] for name, values in self.history.columns().items()},
+                'equity': {name: values[saved_equity:] for name, values in self.equity.columns().items()}
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            rows_offset = f.tell()
+        state = dict(
+            state,
+            allocator=self.allocator,
+            metrics=self.metrics,
+            rng_state=self.rng.bit_generator.state,
+            trade_symbols=list(self.history.symbols),
+            rows_offset=rows_offset
+        )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._checkpoint_rows  = (len(self.history), len(self.equity))
+        logger.debug(f" 保存回测检查点: {path} | 进度 {state['cursor']}/{state['config']['n_bars']}")
+
+    def _load_checkpoint(self, path: str, config: Dict) -> Dict:
+        """
+        读取检查点并恢复引擎状态
+        :param config: 本次回测的配置（与检查点不一致时拒绝恢复）
+        :return: 检查点中的循环状态
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state['config'] != config:
+            raise ValueError(f"检查点与当前回测配置不一致: {path}")
+        self.allocator  = state['allocator']
+        self.metrics  = state['metrics']
+        self.rng.bit_generator.state = state['rng_state']
+        self.history  = TradeStore(state['trade_symbols'])
+        self.equity  = ColumnBuffer(EQUITY_SCHEMA, capacity=config['n_bars'])
+        with open(f"{path}.rows", 'r+b') as f:
+            while f.tell() < state['rows_offset']:
+                rows = pickle.load(f)
+                self.history.extend(**rows['history'])
+                self.equity.extend(**rows['equity'])
+            f.truncate(state['rows_offset'])  # 丢弃主文件替换前崩溃时多追加的行
+        self._checkpoint_rows  = (len(self.history), len(self.equity))
+        logger.info(f" 从检查点恢复回测: {path} | 进度 {state['cursor']}/{config['n_bars']}")
+        return state
+
+    @staticmethod
+    def _remove_checkpoint(path: str):
+        """删除检查点主文件和追加的交易记录文件"""
+        for file in (path, f"{path}.rows"):
+            if os.path.exists(file):
+                os.remove(file)
+
+    # ----------- 结果缓存 -----------
+    def _result_cache_key(self, commission: float, slippage: float, rebalance_freq: str, mode: str, record: bool) -> str:
+        """由回测全部输入计算结果缓存键"""
+        return ResultCache.make_key({
+            'engine_version': ENGINE_VERSION,
+            'data': {'spec': self.data_spec, 'fingerprint': self.market.fingerprint()},
+            'strategy': describe_object(self.strategy),
+            'allocator': describe_object(self.allocator, ('method', 'halflife', 'min_periods', 'max_weight', 'gross')),
+            'initial_balance': self.initial_balance,
+            'seed': self.seed,
+            'vol_window': str(self.vol_window),
+            'commission': commission,
+            'slippage': slippage,
+            'rebalance_freq': rebalance_freq,
+            'mode': mode,
+            'record': record
+        })
+
+    def _store_result(self, key: Optional[str], report: Dict) -> Dict:
+        """保存回测结果及交易记录、资金曲线和绩效统计（key 为 None 时不保存）"""
+        if key is not None:
+            self.result_cache.put(key, {
+                'report': report,
+                'history': self.history,
+                'equity': self.equity,
+                'metrics': self.metrics
+            })
+        return report
+
+    def memory_usage(self) -> Dict:
+        """
+        已加载行情的内存占用
+        :return: {
+            'symbols': {symbol: memory_report(K线)},
+            'market': 对齐矩阵各部分字节数（AlignedMarketData.memory_usage，未加载时为 None），
+            'bytes': 合计（各币种紧凑K线数组与K线共享内存时只计一次）
+        }
+        """
+        symbols = {sym: memory_report(df) for sym, df in self.symbol_data.items()}
+        total = sum(report['bytes'] for report in symbols.values())
+        if self.market is None:
+            return {'symbols': symbols, 'market': None, 'bytes': total}
+        market = self.market.memory_usage()
+        shared = 0  # 与K线共享内存的紧凑K线数组
+        for sym, col in zip(self.market.symbols, self.market.columns):
+            df = self.symbol_data.get(sym)
+            for name, values in col.items():
+                if df is not None and name in df.columns and np.shares_memory(values, df[name].to_numpy()):
+                    shared += values.nbytes
+        return {'symbols': symbols, 'market': market, 'bytes': total + market['bytes'] - shared}
+
     # ----------- 工具方法 -----------
-    def _get_aligned_timestamps(self) -> List[str]:
-        """获取所有交易对齐的时间轴（按最低频率）"""
-        timestamps = set()
-        for sym, data in self.symbol_data.items(): 
-            timestamps.update(data['time'].astype(str)) 
-        return sorted(timestamps)
- 
-    def _get_kline_at(self, symbol: str, timestamp: str) -> Optional[Dict]:
-        """获取指定时间点的K线"""
-        df = self.symbol_data[symbol] 
-        return df[df['time'] == timestamp].iloc[0].to_dict() if not df.empty  else None
- 
-    def _get_recent_volatility(self, symbol: str, timestamp: str) -> float:
-        """计算最近波动率（用于资产分配）"""
-        window = self.symbol_data[symbol][ 
-            (self.symbol_data[symbol]['time']  <= timestamp) & 
-            (self.symbol_data[symbol]['time']  >= pd.to_datetime(timestamp)  - pd.Timedelta(days=30))
-        ]
-        return window['close'].pct_change().std()
+    def _get_aligned_timestamps(self) -> pd.DatetimeIndex:
+        """获取所有交易对齐的时间轴（各币种K线时间的并集）"""
+        return self.market.datetimes
+
+    def _get_kline_at(self, symbol: str, index: int) -> Optional[Dict]:
+        """获取指定时间轴下标处的K线（O(1)，缺失返回 None）"""
+        return self.market.kline_at(self.market.symbol_index[symbol], index)
+
+    def _get_history_until(self, symbol: str, index: int) -> Dict[str, np.ndarray]:
+        """获取截至指定时间轴下标（含）的历史K线，供策略计算指标"""
+        return self.market.history(self.market.symbol_index[symbol], index)
+
+    def _get_recent_volatility(self, index: int) -> Dict[str, float]:
+        """
+        读取指定时间轴下标处各币种的最近波动率（用于资产分配）
+        波动率面板在首次调用时一次性计算，之后每次再平衡只读取一列
+        """
+        column = self.market.rolling_volatility(self.vol_window)[:, index]
+        return dict(zip(self.market.symbols, column))
  
-    def _need_rebalance(self, timestamp: str, freq: str) -> bool:
+    def _calculate_weights(self, index: int) -> Dict[str, float]:
+        """
+        计算再平衡权重：先把截至当前K线的收益率增量纳入分配器的协方差，再按最近波动率分配
+        （分配器未实现 observe 时只使用波动率）
+        """
+        if hasattr(self.allocator, 'observe'):
+            self.allocator.observe(
+                self.market.symbols, self.market.timestamps[:index + 1], self.market.returns()[:, :index + 1]
+            )
+        return self.allocator.calculate_weights(
+            symbols=list(self.market.symbols),
+            volatilities=self._get_recent_volatility(index)
+        )
+
+    def _reset_allocator(self):
+        """回测开始时清空分配器的协方差状态和上一次回测留下的权重"""
+        if hasattr(self.allocator, 'reset'):
+            self.allocator.reset()
+        elif hasattr(self.allocator, 'weights'):
+            self.allocator.weights = {}
+
+    def _need_rebalance(self, timestamp: pd.Timestamp, freq: str) -> bool:
         """检查是否需要再平衡"""
         dt = pd.to_datetime(timestamp) 
         if freq == 'W':
-            return dt.weekday  == 0  # 每周一
+            return dt.weekday() == 0  # 每周一
         elif freq == 'M':
             return dt.day  == 1  # 每月第一天 
         return False 
@@ -194,4 +692,77 @@ class MultiBacktestEngine(BacktestEngine):
     def _rebalance_portfolio(self, portfolio: Dict, weights: Dict, timestamp: str):
         """执行资产再平衡"""
         # 实现逻辑需根据交易所API调整 
-        logger.info(f"{timestamp}  资产再平衡 | 新权重: {weights}")
\ No newline at end of file
+        logger.info(f"{timestamp}  资产再平衡 | 新权重: {weights}")
+
+    def _mark_to_market(self, portfolio: Dict[str, float], last_close: Dict[str, float]) -> float:
+        """按最新收盘价计算组合总价值（USDT）"""
+        return portfolio['USDT'] + sum(
+            portfolio[sym.split('/')[0]] * price for sym, price in last_close.items()
+        )
+
+    def _equity_series(self) -> pd.Series:
+        """列式资金曲线 → pd.Series（以时间为索引）"""
+        return pd.Series(
+            self.equity.column('equity'), index=pd.to_datetime(self.equity.column('time'), unit='ms')
+        )
+
+    def _new_metrics(self) -> StreamingMetrics:
+        """按行情K线间隔创建流式绩效统计"""
+        timestamps = self.market.timestamps if self.market is not None else []
+        bar_ms = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else None
+        return StreamingMetrics(self.initial_balance, bar_ms)
+
+    def _update_metrics(self, portfolio: Dict[str, float], last_close: Dict[str, float]) -> float:
+        """K线收盘后按最新价格更新流式绩效统计，返回组合总价值"""
+        equity = self._mark_to_market(portfolio, last_close)
+        exposure = (equity - portfolio['USDT']) / equity if equity > 0 else 0.0
+        self.metrics.update(equity, exposure)
+        return equity
+
+    # ----------- 向量化模式工具方法 -----------
+    def _generate_signal_matrix(self, cache: Optional[IndicatorCache] = None) -> np.ndarray:
+        """
+        生成 (symbols, bars) 信号矩阵（1=买入, -1=卖出, 0=无）
+        策略实现 calculate_signals_batch 时整段计算，否则按K线依次调用 calculate_signals
+        :param cache: 共享指标缓存（传给 calculate_signals_batch，多策略间复用指标序列）
+        """
+        market = self.market
+        signals = np.zeros(market.valid.shape, dtype=np.int8)
+        if self.strategy is None:
+            return signals
+        for s, symbol in enumerate(market.symbols):
+            arrays = market.columns[s]
+            n = len(arrays['close'])
+            if hasattr(self.strategy, 'calculate_signals_batch'):
+                batch = (
+                    self.strategy.calculate_signals_batch(symbol, arrays, cache=cache) if cache is not None
+                    else self.strategy.calculate_signals_batch(symbol, arrays)
+                )
+                actions = np.asarray(batch['action'], dtype=np.int8)
+            else:
+                actions = np.zeros(n, dtype=np.int8)
+                for k in range(n):
+                    signal = self._generate_signal(symbol, {col: arr[:k + 1] for col, arr in arrays.items()})
+                    if signal:
+                        actions[k] = ACTION_SIDES.get(signal.get('action'), 0)
+            signals[s, market.valid[s]] = actions
+        return signals
+
+    def _build_weight_matrix(self, timestamps: pd.DatetimeIndex, rebalance_freq: str) -> np.ndarray:
+        """按再平衡时点计算权重，并沿时间轴向前填充为 (symbols, bars) 矩阵"""
+        symbols = self.market.symbols
+        weights = np.zeros((len(symbols), len(timestamps)))
+        if rebalance_freq == 'W':
+            points = np.flatnonzero(timestamps.weekday == 0)
+        elif rebalance_freq == 'M':
+            points = np.flatnonzero(timestamps.day == 1)
+        else:
+            points = np.array([], dtype=np.int64)
+
+        self._reset_allocator()
+        for k, i in enumerate(points):
+            ts = timestamps[i]
+            self._rebalance_portfolio(None, self._calculate_weights(i), ts)
+            end = points[k + 1] if k + 1 < len(points) else len(timestamps)
+            weights[:, i:end] = np.array([self.allocator.weights.get(sym, 0) for sym in symbols])[:, None]
+        return weights
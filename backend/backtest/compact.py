@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# 检测价格/成交量小数位数的上限（超过该位数的列保持 float64）
+MAX_DECIMALS = 8
+
+
+def price_decimals(values: np.ndarray, max_decimals: int = MAX_DECIMALS) -> Optional[int]:
+    """
+    数值列的小数位数（交易所价格/数量都是定点小数，忽略 NaN）
+    :return: 使全部数值取整后不变的最小小数位数，超过 max_decimals 位返回 None
+    """
+    values = values[np.isfinite(values)]
+    tolerance = np.maximum(np.abs(values), 1.0) * 1e-12  # 十进制小数的二进制表示误差
+    for decimals in range(max_decimals + 1):
+        if (np.abs(np.round(values, decimals) - values) <= tolerance).all():
+            return decimals
+    return None
+
+
+def fits_float32(values: np.ndarray, decimals: Optional[int]) -> bool:
+    """float32 是否足以表示该列：转为 float32 再按原小数位数取整后与原值一致（NaN 位置不变）"""
+    if decimals is None:
+        return False
+    restored = values.astype(np.float32).astype(np.float64)
+    finite = np.isfinite(values)
+    if not np.array_equal(finite, np.isfinite(restored)):
+        return False  # 超出 float32 范围
+    return np.array_equal(np.round(restored[finite], decimals), np.round(values[finite], decimals))
+
+
+def timestamp_ms(index: pd.Index) -> np.ndarray:
+    """时间索引 → int64 毫秒时间戳（已是整数索引时原样返回）"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8 // 10 ** 6
+    return np.asarray(index, dtype=np.int64)
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    """是否为紧凑格式（int64 毫秒时间戳索引）"""
+    return not isinstance(df.index, pd.DatetimeIndex) and df.index.dtype == np.int64
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    K线 DataFrame → 紧凑列类型（约为默认格式的一半内存）
+    - 时间索引 → int64 毫秒时间戳（索引名不变）
+    - float64 列 → float32（仅当 float32 按该列小数位数取整后与原值完全一致）
+    - object/字符串列（如 symbol）→ 分类类型（每行只存整数编号）
+    已是紧凑类型的列不转换；返回新的 DataFrame，attrs['decimals'] 记录降为 float32 的列的小数位数
+    """
+    decimals = dict(df.attrs.get('decimals', {}))
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if values.dtype == np.float64:
+            array = values.to_numpy()
+            places = price_decimals(array)
+            if fits_float32(array, places):
+                columns[name] = array.astype(np.float32)
+                decimals[name] = places
+                continue
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            columns[name] = pd.Categorical(values)
+            continue
+        columns[name] = values.array
+    out = pd.DataFrame(columns, index=pd.Index(timestamp_ms(df.index), name=df.index.name), copy=False)
+    out.attrs['decimals'] = decimals
+    return out
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    紧凑格式 → 默认格式（DatetimeIndex、float64、object 列）
+    float32 列按 attrs['decimals'] 记录的小数位数取整，还原原始数值
+    """
+    decimals = df.attrs.get('decimals', {})
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if values.dtype == np.float32:
+            array = values.to_numpy(dtype=np.float64)
+            columns[name] = np.round(array, decimals[name]) if name in decimals else array
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            columns[name] = values.to_numpy(dtype=object)
+        else:
+            columns[name] = values.array
+    index = df.index
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(timestamp_ms(index).astype('datetime64[ms]'), name=index.name)
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def stack_frames(frames: Dict[str, pd.DataFrame], compact: bool = True) -> pd.DataFrame:
+    """
+    {symbol: K线} → 单个长表（按币种顺序拼接，symbol 列为分类类型，币种名称只存一份）
+    :param compact: 同时转换为紧凑列类型
+    """
+    symbols = list(frames)
+    parts = list(frames.values())
+    stacked = pd.concat(parts) if parts else pd.DataFrame()
+    codes = np.repeat(np.arange(len(symbols), dtype=np.int32), [len(df) for df in parts])
+    stacked.insert(0, 'symbol', pd.Categorical.from_codes(codes, categories=symbols))
+    return compact_frame(stacked) if compact else stacked
+
+
+def memory_report(df: pd.DataFrame) -> Dict:
+    """
+    DataFrame 内存占用明细（含索引和 object 列内容）
+    :return: {
+        'rows': 行数,
+        'bytes': 总字节数,
+        'index': {'dtype', 'bytes'},
+        'columns': {列名: {'dtype', 'bytes'}}
+    }
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    return {
+        'rows': len(df),
+        'bytes': int(usage.sum()),
+        'index': {'dtype': str(df.index.dtype), 'bytes': int(usage['Index'])},
+        'columns': {name: {'dtype': str(df[name].dtype), 'bytes': int(usage[name])} for name in df.columns}
+    }
@@ -0,0 +1,252 @@
+import time
+import random
+import asyncio
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from ..utils.logger  import logger
+
+# 各交易所K线请求的权重预算：(每分钟权重上限, 每次K线请求的权重)
+# Binance 合约 limit=1000 的K线请求权重为 5；OKX 按请求次数计（20 次/2 秒）
+EXCHANGE_BUDGETS = {
+    'binance': (2400, 5),
+    'okx': (600, 1)
+}
+DEFAULT_BUDGET = (1200, 1)
+
+
+def is_transient(error: Exception) -> bool:
+    """网络类临时错误（超时、连接失败、限频、交易所暂不可用），可退避后重试"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # ccxt.NetworkError 及其子类（RequestTimeout / DDoSProtection / RateLimitExceeded / ExchangeNotAvailable）
+    return any(cls.__name__ == 'NetworkError' for cls in type(error).__mro__)
+
+
+def month_start(ms: int) -> int:
+    """毫秒时间戳所在月份的起点（毫秒）"""
+    return int(pd.Timestamp(ms, unit='ms').to_period('M').start_time.value // 10**6)
+
+
+class RequestBudget:
+    """
+    请求权重令牌桶（同一交易所的全部下载任务共享）
+    按每分钟权重上限匀速补充，桶满时最多允许 burst 权重的突发请求
+    令牌数跨多次下载保留；排队用的 asyncio.Lock 绑定事件循环，按当前运行的事件循环创建
+    """
+
+    def __init__(self, weight_per_minute: float, burst: Optional[float] = None):
+        """
+        :param weight_per_minute: 每分钟权重上限
+        :param burst: 桶容量（默认为每分钟上限的 1/10）
+        """
+        self.rate  = weight_per_minute / 60.0
+        self.capacity  = burst if burst is not None else weight_per_minute / 10.0
+        self.tokens  = self.capacity
+        self.updated  = time.monotonic()
+        self._lock  = None
+        self._loop  = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """当前事件循环的排队锁（每次 run() 都在新的事件循环中执行）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        return self._lock
+
+    async def acquire(self, weight: float = 1.0):
+        """等待直到可以发出权重为 weight 的请求（按到达顺序排队）"""
+        async with self._loop_lock():
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+
+class AsyncHistoryDownloader:
+    """
+    多币种历史K线并发下载
+    功能：
+    - 多个币种的分页请求并发执行（阻塞的 ccxt 调用放入线程池）
+    - 同一交易所的全部请求共享请求权重预算（令牌桶），不触发交易所限频
+    - 网络类临时错误按指数退避重试，其他错误只影响该币种
+    - 下载的分页按月缓冲，每个月份分区只写入一次；写入由单独的写入线程串行执行
+    - 中断时先写入已下载的分页并登记已覆盖区间，之后只需重新下载未完成的分页
+    """
+
+    def __init__(
+        self,
+        manager,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        page_limit: int = 1000,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
+        """
+        :param manager: HistoricalDataManager（提供交易所连接、分区存储和已覆盖区间）
+        :param max_concurrency: 同时下载的币种数
+        :param max_retries: 单个请求的最大重试次数
+        :param backoff: 首次重试等待秒数（之后每次翻倍，并加随机抖动）
+        :param page_limit: 每页K线数
+        :param budgets: 覆盖 EXCHANGE_BUDGETS 的权重预算 {exchange: (每分钟权重上限, 每次请求权重)}
+        """
+        self.manager  = manager
+        self.max_concurrency  = max_concurrency
+        self.max_retries  = max_retries
+        self.backoff  = backoff
+        self.page_limit  = page_limit
+        self.budgets  = {**EXCHANGE_BUDGETS, **(budgets or {})}
+        self.errors  = {}  # 最近一次下载失败的币种 {symbol: Exception}
+        self._buckets  = {}  # {exchange: RequestBudget}
+
+    def run(
+        self,
+        symbols: List[str],
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start_date: str = "2020-01-01",
+        end_date: str = None
+    ) -> Dict[str, int]:
+        """同步入口（在已运行的事件循环中请直接 await download()）"""
+        return asyncio.run(self.download(symbols, exchange, timeframe, start_date, end_date))
+
+    async def download(
+        self,
+        symbols: List[str],
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start_date: str = "2020-01-01",
+        end_date: str = None
+    ) -> Dict[str, int]:
+        """
+        并发下载各币种 [start_date, end_date] 内尚未覆盖的K线（聚合周期改为下载 1m 基础数据）
+        :return: {symbol: 写入的K线数}（失败的币种不在其中，异常见 self.errors）
+        """
+        end_date = end_date or pd.Timestamp.now().strftime("%Y-%m-%d")
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        if timeframe in self.manager.rollup_timeframes:
+            # 聚合周期只下载 1m 基础数据（写入时自动更新聚合序列）
+            end += self.manager._get_timedelta(timeframe) - self.manager._get_timedelta(self.manager.base_timeframe)
+            timeframe = self.manager.base_timeframe
+        if exchange not in self._buckets:
+            self._buckets[exchange] = RequestBudget(self.budgets.get(exchange, DEFAULT_BUDGET)[0])
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.errors  = {}
+
+        async def worker(symbol: str) -> int:
+            async with semaphore:
+                return await self._download_symbol(executor, writer, symbol, exchange, timeframe, start, end)
+
+        # 请求在线程池中并发执行；分区、质量索引和聚合序列的写入只在一个写入线程中串行执行
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor, ThreadPoolExecutor(max_workers=1) as writer:
+            results = await asyncio.gather(*(worker(sym) for sym in symbols), return_exceptions=True)
+
+        written = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, BaseException):
+                self.errors[symbol] = result
+                logger.error(f" 下载失败: {exchange} {symbol} {timeframe} | {result}")
+            else:
+                written[symbol] = result
+        logger.info(
+            f" 并发下载完成: {exchange} {timeframe} | 成功 {len(written)} 个, 失败 {len(self.errors)} 个, "
+            f"共 {sum(written.values())} 根K线"
+        )
+        return written
+
+    async def _download_symbol(
+        self,
+        executor: ThreadPoolExecutor,
+        writer: ThreadPoolExecutor,
+        symbol: str,
+        exchange: str,
+        timeframe: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp
+    ) -> int:
+        """按页下载单个币种的全部缺失区间，每个月的分页下载完成后合并写入并登记为已覆盖"""
+        manager = self.manager
+        loop = asyncio.get_running_loop()
+        api = manager.connector.get_exchange(exchange)
+        cache_key = f"{exchange}_{symbol}_{timeframe}"
+        delta_ms = int(manager._get_timedelta(timeframe).total_seconds() * 1000)
+        pages, spans = [], []  # 已下载、尚未写入的分页及其下载区间
+        n_written = 0
+
+        async def flush(cut: Optional[int] = None):
+            """写入缓冲中 cut（毫秒）之前的分页并登记已覆盖区间（默认全部写入）"""
+            nonlocal n_written, pages, spans
+            head = [[a, b if cut is None else min(b, cut)] for a, b in spans if cut is None or a < cut]
+            if not head:
+                return
+            frame = pd.concat(pages) if pages else pd.DataFrame(
+                columns=['open', 'high', 'low', 'close', 'volume'], index=pd.DatetimeIndex([], name='timestamp')
+            )
+            if cut is None:
+                pages, spans = [], []
+            else:
+                boundary = pd.to_datetime(cut, unit='ms')
+                frame, rest = frame[frame.index < boundary], frame[frame.index >= boundary]
+                pages, spans = [rest] if len(rest) else [], [[max(a, cut), b] for a, b in spans if b > cut]
+            count, covered = await loop.run_in_executor(
+                writer, partial(manager._store_klines, symbol, exchange, timeframe, frame, head)
+            )
+            manager.add_coverage(cache_key, covered)
+            if count:
+                manager.invalidate(cache_key)
+            n_written += count
+
+        try:
+            for a, b in manager.missing_ranges(symbol, exchange, timeframe, start, end):
+                current = a
+                while current < b:
+                    page = await self._fetch_page(loop, executor, api, exchange, symbol, timeframe, current)
+                    if not page:
+                        spans.append([current, b])  # 之后没有数据
+                        break
+                    df = pd.DataFrame(page, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+                    df = df.drop_duplicates('timestamp', keep='last')
+                    reached = min(int(df['timestamp'].iloc[-1]) + delta_ms, b)
+                    df = df[(df['timestamp'] >= current) & (df['timestamp'] < b)]
+                    if len(df):
+                        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                        pages.append(df.set_index('timestamp'))
+                    spans.append([current, reached])
+                    await flush(month_start(reached))  # 写入已下载完的月份
+                    if reached <= current:
+                        break  # 交易所未返回更新的K线，避免死循环
+                    current = reached
+        finally:
+            await flush()  # 中断时也写入已下载的分页
+        return n_written
+
+    async def _fetch_page(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        executor: ThreadPoolExecutor,
+        api,
+        exchange: str,
+        symbol: str,
+        timeframe: str,
+        since: int
+    ) -> List[List]:
+        """在权重预算内请求一页K线，临时错误按指数退避重试"""
+        weight = self.budgets.get(exchange, DEFAULT_BUDGET)[1]
+        for attempt in range(self.max_retries + 1):
+            await self._buckets[exchange].acquire(weight)
+            try:
+                return await loop.run_in_executor(executor, partial(
+                    api.fetch_ohlcv, symbol=symbol, timeframe=timeframe, since=since, limit=self.page_limit
+                ))
+            except Exception as e:
+                if not is_transient(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                logger.warning(f" 请求失败，{delay:.1f} 秒后重试 ({attempt + 1}/{self.max_retries}): {symbol} {since} | {e}")
+                await asyncio.sleep(delay)
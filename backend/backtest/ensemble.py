@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Union
+from ..utils.logger  import logger
+from .backtest_engine import MultiBacktestEngine
+from .indicator_cache import IndicatorCache
+from .trade_store import TradeStore
+
+# 汇总表中每个策略输出的绩效指标
+ENSEMBLE_METRICS = (
+    'final_value', 'return', 'max_drawdown', 'sharpe', 'sortino',
+    'win_rate', 'profit_factor', 'exposure', 'n_trades'
+)
+
+
+class EnsembleBacktester:
+    """
+    多策略集成回测
+    功能：
+    - N 个策略实例共用一份对齐行情和指标缓存（相同指标、相同参数只计算一次）
+    - 再平衡权重与策略无关，只计算一次
+    - 每个策略独立的资产组合、交易记录和绩效统计（向量化执行内核）
+    """
+
+    def __init__(self, strategies: Union[Dict[str, object], List[object]]):
+        """
+        :param strategies: {名称: 策略实例} 或策略实例列表（以 类名#序号 命名）
+        """
+        if not isinstance(strategies, dict):
+            strategies = {f"{type(s).__name__}#{k}": s for k, s in enumerate(strategies)}
+        self.strategies  = dict(strategies)
+        self.cache  = None    # 最近一次运行的指标缓存
+        self.reports  = {}    # {名称: 与 engine.run() 格式相同的报告}
+        self.trades  = {}     # {名称: TradeStore}
+
+    def run(
+        self,
+        engine: MultiBacktestEngine,
+        commission: float = 0.0005,
+        slippage: float = 0.0001,
+        rebalance_freq: str = 'W'
+    ) -> pd.DataFrame:
+        """
+        单次遍历回测全部策略
+        :param engine: 已调用 load_data 的回测引擎（提供行情、资产分配器和随机数种子）
+        :return: 每行一个策略的绩效汇总表（列为 ENSEMBLE_METRICS）
+        """
+        market = engine.market
+        self.cache  = IndicatorCache.from_market(market)
+        weights = engine._build_weight_matrix(market.datetimes, rebalance_freq)
+        saved = engine.strategy, engine.history, engine.metrics, engine.equity
+        logger.info(f" 集成回测开始: {len(self.strategies)} 个策略")
+
+        rows = {}
+        try:
+            for name, strategy in self.strategies.items():
+                engine.strategy  = strategy
+                signals = engine._generate_signal_matrix(cache=self.cache)
+                # 每个策略使用相同的滑点随机序列，保证策略间可比
+                engine.rng = np.random.default_rng(engine.seed)
+                engine.history  = TradeStore(market.symbols)
+                engine.metrics  = engine._new_metrics()
+                report = engine._run_vectorized(
+                    commission, slippage, rebalance_freq, signals=signals, weights=weights
+                )
+                self.reports[name] = report
+                self.trades[name] = engine.history
+                snapshot = engine.metrics.snapshot()
+                rows[name] = {
+                    **{k: report['portfolio'][k] for k in ('final_value', 'return')},
+                    **{k: snapshot[k] for k in ENSEMBLE_METRICS[2:]}
+                }
+        finally:
+            engine.strategy, engine.history, engine.metrics, engine.equity = saved
+
+        logger.info(
+            f" 集成回测完成: {len(self.strategies)} 个策略 | 指标缓存命中 {self.cache.hits} 次, 计算 {self.cache.misses} 次"
+        )
+        return pd.DataFrame.from_dict(rows, orient='index', columns=list(ENSEMBLE_METRICS))
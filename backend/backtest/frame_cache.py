@@ -0,0 +1,108 @@
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+from ..utils.logger  import logger
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame 实际内存占用（含索引和 object 列内容）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """将 DataFrame 的底层数组设为只读（原地修改数值会抛出 ValueError），返回原对象"""
+    for block in df._mgr.blocks:
+        values = getattr(block, 'values', None)
+        if hasattr(values, 'flags'):  # 扩展类型（如分类列）没有 numpy 数组
+            values.flags.writeable = False
+    return df
+
+
+class FrameCache:
+    """
+    按内存上限淘汰的 LRU DataFrame 缓存
+    功能：
+    - 总占用超过 max_bytes 时淘汰最久未使用的数据
+    - 缓存的数据为只读，命中时返回共享底层数组的浅视图（不复制数据）
+    - 统计命中/未命中/淘汰次数
+    """
+
+    def __init__(self, max_bytes: int = 1024 ** 3):
+        """
+        :param max_bytes: 缓存总内存上限（字节）
+        """
+        self.max_bytes  = max_bytes
+        self.nbytes  = 0
+        self.hits  = 0
+        self.misses  = 0
+        self.evictions  = 0
+        self._entries  = OrderedDict()  # {key: (DataFrame, 字节数)}，按访问时间从旧到新
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """读取缓存（未命中返回 None），命中时标记为最近使用"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0].copy(deep=False)
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        缓存 DataFrame（底层数组设为只读，调用方不应再原地修改），并按 LRU 淘汰超出上限的数据
+        单个数据超过上限时不缓存
+        :return: 只读浅视图
+        """
+        freeze_frame(df)
+        self.pop(key)
+        size = frame_nbytes(df)
+        if size <= self.max_bytes:
+            self._entries[key] = (df, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                old_key, (_, old_size) = self._entries.popitem(last=False)
+                self.nbytes -= old_size
+                self.evictions += 1
+                logger.debug(f" 淘汰内存缓存: {old_key} ({old_size / 1024 ** 2:.1f} MB)")
+        return df.copy(deep=False)
+
+    def pop(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """移除缓存（不计入淘汰次数）"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.nbytes -= entry[1]
+        return entry[0]
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def items(self) -> List[Tuple[Hashable, pd.DataFrame]]:
+        """全部缓存项 [(key, 只读浅视图)]，按最近使用从旧到新（不改变访问顺序和命中统计）"""
+        return [(key, df.copy(deep=False)) for key, (df, _) in self._entries.items()]
+
+    def stats(self) -> Dict[str, int]:
+        """{'entries', 'bytes', 'max_bytes', 'hits', 'misses', 'evictions'}"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._entries))
+
+    def __delitem__(self, key: Hashable):
+        if self.pop(key) is None:
+            raise KeyError(key)
@@ -1,11 +1,69 @@
 import os 
+import glob
+import json
 import pandas as pd
 import numpy as np 
-from typing import Dict, List, Optional
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from ..api.api_connector  import APIConnector 
 from ..utils.logger  import logger 
 from ..utils.data_processor  import resample_klines, fill_missing_data 
+from .downloader import AsyncHistoryDownloader
+from .frame_cache import FrameCache
+from .tick_store import TickStore
+from .quality_index import QualityIndex
+from .compact import compact_frame, expand_frame, memory_report, stack_frames
+
+# 聚合序列：启用 rollups 时由 1m 基础序列聚合生成，不再单独下载
+BASE_TIMEFRAME = '1m'
+ROLLUP_TIMEFRAMES = ('5m', '15m', '1h', '4h', '1d')
+
+# 分区字段：每个序列按月分区（目录 month=YYYY-MM）
+PARTITIONING = ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+
+# 异常值过滤：估计收益率标准差所需的最少样本数，及从分区存储补充的前后相邻K线数
+OUTLIER_MIN_RETURNS = 30
+OUTLIER_CONTEXT = 200
+
+
+def column_view(column: pa.ChunkedArray) -> np.ndarray:
+    """Arrow 列 → numpy 数组（单块且无空值的数值列直接引用 Arrow 内存，不复制）"""
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
+
+
+def merge_intervals(intervals: List[List[int]]) -> List[List[int]]:
+    """合并重叠或相邻的半开区间 [start, end)"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_intervals(start: int, end: int, covered: List[List[int]]) -> List[List[int]]:
+    """区间 [start, end) 中未被 covered（已合并、升序）覆盖的部分"""
+    missing = []
+    cursor = start
+    for a, b in covered:
+        if b <= cursor:
+            continue
+        if a >= end:
+            break
+        if a > cursor:
+            missing.append([cursor, a])
+        cursor = max(cursor, b)
+    if cursor < end:
+        missing.append([cursor, end])
+    return missing
+
  
 class HistoricalDataManager:
     """
@@ -14,13 +72,46 @@ class HistoricalDataManager:
     - 多交易所历史数据统一采集与缓存 
     - 自动处理数据缺失和异常值 
     - 支持TICK/分钟/小时/日线数据
+    - 按区间增量下载：记录每个 exchange_symbol_tf 已覆盖的时间区间，只下载缺失的头部、尾部和中间缺口
+    - 分区存储：exchange/symbol/timeframe/month=YYYY-MM/data.parquet，
+      按时间范围读取时只打开涉及的月份分区，并下推时间过滤和列投影
+    - 多币种并发下载（AsyncHistoryDownloader，共享交易所请求权重预算）
+    - 内存缓存按字节上限 LRU 淘汰，命中时返回只读视图（不复制数据）
+    - 热数据：常用序列可另存为未压缩 Arrow IPC 文件，以内存映射方式读取（多进程共享页缓存，无反序列化）
+    - 多周期聚合（rollups=True）：只下载 1m 基础序列，5m/15m/1h/4h/1d 在写入 1m 数据时增量聚合并落盘
+    - 逐笔成交：self.ticks（TickStore）按币种/日期列式存储 aggTrades
+    - 数据质量索引：写入分区时同步记录缺口、缺失值、价格异常和成交量统计，质量检查和补齐缺口无需全量扫描
+    - 紧凑模式（compact=True）：返回和缓存的K线为 int64 毫秒时间戳索引，价格/成交量在精度允许时为 float32，
+      同样的缓存上限可容纳约两倍的数据；memory_usage() 报告每个缓存数据集的内存占用
     """
  
-    def __init__(self, connector: APIConnector, data_dir: str = "data/historical"):
+    def __init__(
+        self,
+        connector: APIConnector,
+        data_dir: str = "data/historical",
+        cache_bytes: int = 1024 ** 3,
+        rollups: bool = False,
+        compact: bool = False
+    ):
+        """
+        :param data_dir: 本地分区存储根目录
+        :param cache_bytes: 内存缓存上限（字节）
+        :param rollups: 以 1m 数据为唯一数据源，ROLLUP_TIMEFRAMES 中的周期由其聚合生成
+        :param compact: 返回紧凑列类型的K线（见 compact_frame；分区存储格式不变）
+        """
         self.connector  = connector
         self.data_dir  = data_dir
         os.makedirs(data_dir,  exist_ok=True)
-        self.cache  = {}  # 内存缓存 {exchange_symbol_tf: pd.DataFrame}
+        self.cache  = FrameCache(cache_bytes)  # 内存缓存 {(exchange_symbol_tf, start_ms, end_ms, columns): 只读 DataFrame}
+        self.coverage_path  = os.path.join(data_dir, "coverage.json")
+        self.coverage  = self._load_coverage()  # 已下载区间 {exchange_symbol_tf: [[start_ms, end_ms), ...]}
+        self._hot_tables  = {}  # 已映射的热数据 {文件路径: (文件修改时间, pa.Table)}
+        self.quality_dir  = os.path.join(data_dir, "quality")
+        self._quality  = {}  # 已加载的数据质量索引 {索引文件路径: QualityIndex}
+        self.base_timeframe  = BASE_TIMEFRAME
+        self.rollup_timeframes  = ROLLUP_TIMEFRAMES if rollups else ()
+        self.ticks  = TickStore(os.path.join(data_dir, "ticks"))  # 逐笔成交存储
+        self.compact  = compact
  
     def fetch_historical_data(
         self,
@@ -29,45 +120,451 @@ class HistoricalDataManager:
         timeframe: str = "1h",
         start_date: str = "2020-01-01",
         end_date: str = None,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        columns: Optional[List[str]] = None
     ) -> pd.DataFrame:
         """
-        获取历史数据（优先使用本地缓存）
+        获取历史数据（优先使用本地缓存，只下载请求区间内尚未覆盖的部分）
         :param timeframe: 时间框架（1m/5m/1h/1d）
         :param start_date: 起始日期（YYYY-MM-DD）
         :param end_date: 结束日期（默认当前时间）
         :param force_refresh: 是否强制重新下载 
+        :param columns: 只读取的列（默认全部 OHLCV 列）
         :return: DataFrame with columns [timestamp, open, high, low, close, volume]
+                 （与内存缓存共享数据的只读视图，需要修改数值时请先 copy()；紧凑模式下 timestamp 为 int64 毫秒）
         """
         # 生成唯一缓存键 
         cache_key = f"{exchange}_{symbol}_{timeframe}"
         end_date = end_date or datetime.now().strftime("%Y-%m-%d") 
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        if timeframe in self.rollup_timeframes:
+            # 聚合周期：补齐覆盖最后一根聚合K线的 1m 数据（写入时同步更新聚合序列）
+            last = end + self._get_timedelta(timeframe) - self._get_timedelta(self.base_timeframe)
+            self._download_missing(symbol, exchange, self.base_timeframe, start, last, force_refresh)
+            if not os.path.isdir(self.series_dir(symbol, exchange, timeframe)):
+                self.materialize_rollups(symbol, exchange, [timeframe])
+        else:
+            self._download_missing(symbol, exchange, timeframe, start, end, force_refresh)
+        if self.is_hot(symbol, exchange, timeframe):
+            return self.read_hot(symbol, exchange, timeframe, start, end, columns)
+
+        memory_key = (cache_key, self._to_ms(start), self._to_ms(end), tuple(columns) if columns else None)
+        df = self.cache.get(memory_key)
+        if df is None:
+            if not os.path.isdir(self.series_dir(symbol, exchange, timeframe)):
+                raise ValueError(f"未获取到数据: {symbol} {timeframe}")
+            df = self.read_range(symbol, exchange, timeframe, start, end, columns)
+            df = self.cache.put(memory_key, compact_frame(df) if self.compact else df)
+        return df
+
+    def _download_missing(
+        self,
+        symbol: str,
+        exchange: str,
+        timeframe: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        force_refresh: bool = False
+    ):
+        """下载 [start, end] 中尚未覆盖的区间并写入分区存储"""
+        cache_key = f"{exchange}_{symbol}_{timeframe}"
+        missing = self.missing_ranges(symbol, exchange, timeframe, start, end, force_refresh)
+
+        downloaded = []
+        written = False
+        for a, b in missing:
+            logger.info(
+                f" 开始下载数据: {exchange} {symbol} {timeframe} "
+                f"[{pd.to_datetime(a, unit='ms')} to {pd.to_datetime(b, unit='ms')})"
+            )
+            piece, reached = self._fetch_from_exchange(
+                symbol, exchange, timeframe, pd.to_datetime(a, unit='ms'), pd.to_datetime(b, unit='ms')
+            )
+            piece = piece[(piece.index >= pd.to_datetime(a, unit='ms')) & (piece.index < pd.to_datetime(b, unit='ms'))]
+            # 下载中途失败时只记录已完成的部分
+            count, covered = self._store_klines(symbol, exchange, timeframe, piece, [[a, reached]] if reached > a else [])
+            downloaded += covered
+            written = written or count > 0
+
+        if downloaded:
+            self.add_coverage(cache_key, downloaded)
+        if written:
+            self.invalidate(cache_key)
+
+    def _store_klines(
+        self,
+        symbol: str,
+        exchange: str,
+        timeframe: str,
+        df: pd.DataFrame,
+        intervals: List[List[int]]
+    ) -> Tuple[int, List[List[int]]]:
+        """
+        预处理一批下载的K线并写入对应月份分区（重叠的K线以新下载的为准）
+        只写存储，不登记已覆盖区间、不动内存缓存（由调用方处理，并发下载时在单独的写入线程中调用）
+        异常值阈值结合已存储的相邻K线估计；被剔除的K线不算已覆盖，下次请求时重新下载
+        :param df: 以 timestamp 为索引的原始K线
+        :param intervals: 这批K线的下载区间 [[start_ms, end_ms), ...]
+        :return: (写入的K线数, 可登记为已覆盖的区间)
+        """
+        if not len(df):
+            return 0, intervals
+        delta = self._get_timedelta(timeframe)
+        context = self.read_range(
+            symbol, exchange, timeframe,
+            df.index.min() - OUTLIER_CONTEXT * delta, df.index.max() + OUTLIER_CONTEXT * delta, ['close']
+        )['close']
+        clean = self._preprocess_data(df, timeframe, context)
+        dropped = df.index.difference(clean.index)
+        if len(dropped):
+            delta_ms = int(delta.total_seconds() * 1000)
+            holes = merge_intervals([[t, t + delta_ms] for t in (dropped.asi8 // 10**6).tolist()])
+            intervals = [gap for a, b in intervals for gap in missing_intervals(a, b, holes)]
+            logger.warning(f" 剔除异常K线 {len(dropped)} 根（不登记为已覆盖）: {exchange} {symbol} {timeframe}")
+        self._write_partitions(symbol, exchange, timeframe, clean)
+        return len(clean), intervals
+
+    def missing_ranges(
+        self,
+        symbol: str,
+        exchange: str,
+        timeframe: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        force_refresh: bool = False
+    ) -> List[List[int]]:
+        """
+        请求区间 [start, end] 中尚未下载的部分（毫秒半开区间，旧版单文件缓存先迁移为分区存储）
+        不超过最新一根已收盘K线，未收盘的K线下次刷新时重新下载
+        :param force_refresh: 忽略已覆盖区间，整个请求区间重新下载
+        """
+        self._migrate_legacy_file(symbol, exchange, timeframe)
+        delta = self._get_timedelta(timeframe)
+        covered = [] if force_refresh else self._covered_intervals(
+            f"{exchange}_{symbol}_{timeframe}", symbol, exchange, timeframe, delta
+        )
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        limit = min(pd.Timestamp(end) + delta, now - delta)
+        return missing_intervals(self._to_ms(start), self._to_ms(limit), covered)
+
+    def add_coverage(self, cache_key: str, intervals: List[List[int]]):
+        """登记新下载的区间并保存区间索引"""
+        self.coverage[cache_key] = merge_intervals(self.coverage.get(cache_key, []) + [list(i) for i in intervals])
+        self._save_coverage()
+
+    def invalidate(self, cache_key: str):
+        """序列有新数据写入后，丢弃其内存缓存"""
+        for key in [key for key in self.cache if key[0] == cache_key]:
+            del self.cache[key]
+
+    def read_range(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        从分区存储读取 [start, end] 内的K线（不访问交易所）
+        月份过滤裁剪分区目录，时间过滤下推到 parquet 行组统计信息，只解码需要的列
+        :param columns: 只读取的列（默认全部）
+        :return: 以 timestamp 为索引的 DataFrame（无数据时为空）
+        """
+        dataset = self._dataset(symbol, exchange, timeframe)
+        if dataset is None:
+            return pd.DataFrame(
+                columns=columns or ['open', 'high', 'low', 'close', 'volume'],
+                index=pd.DatetimeIndex([], name='timestamp')
+            )
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name not in ('timestamp', 'month')]
+
+        condition = None
+        if start is not None:
+            start = pd.Timestamp(start)
+            condition = (ds.field('month') >= start.strftime('%Y-%m')) & (ds.field('timestamp') >= pa.scalar(start))
+        if end is not None:
+            end = pd.Timestamp(end)
+            upper = (ds.field('month') <= end.strftime('%Y-%m')) & (ds.field('timestamp') <= pa.scalar(end))
+            condition = upper if condition is None else condition & upper
+        table = dataset.to_table(columns=['timestamp'] + list(columns), filter=condition)
+        return table.to_pandas().set_index('timestamp').sort_index()
  
-        # 检查内存缓存
-        if not force_refresh and cache_key in self.cache: 
-            df = self.cache[cache_key] 
-            mask = (df.index  >= pd.to_datetime(start_date))  & (df.index  <= pd.to_datetime(end_date)) 
-            return df[mask].copy()
- 
-        # 检查本地文件缓存 
-        file_path = os.path.join(self.data_dir,  f"{cache_key}.parquet")
-        if not force_refresh and os.path.exists(file_path): 
-            df = pd.read_parquet(file_path) 
-            self.cache[cache_key]  = df
-            mask = (df.index  >= pd.to_datetime(start_date))  & (df.index  <= pd.to_datetime(end_date)) 
-            return df[mask].copy()
- 
-        # 从交易所API获取数据
-        logger.info(f" 开始下载数据: {exchange} {symbol} {timeframe} [{start_date} to {end_date}]")
-        df = self._fetch_from_exchange(symbol, exchange, timeframe, start_date, end_date)
-        
-        # 数据预处理 
-        df = self._preprocess_data(df, timeframe)
-        
-        # 更新缓存 
-        df.to_parquet(file_path) 
-        self.cache[cache_key]  = df
-        return df 
+    # ----------- 分区存储 -----------
+    def series_dir(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> str:
+        """序列分区存储目录（交易对中的 / 去掉，如 BTC/USDT → BTCUSDT）"""
+        return os.path.join(self.data_dir, exchange, symbol.replace('/', ''), timeframe)
+
+    def file_path(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> str:
+        """旧版单文件 parquet 缓存路径（仅用于迁移）"""
+        return os.path.join(self.data_dir,  f"{exchange}_{symbol.replace('/', '')}_{timeframe}.parquet")
+
+    def _dataset(self, symbol: str, exchange: str, timeframe: str) -> Optional[ds.Dataset]:
+        """序列的 pyarrow 分区数据集（无数据时返回 None）"""
+        path = self.series_dir(symbol, exchange, timeframe)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+
+    def _write_partitions(self, symbol: str, exchange: str, timeframe: str, df: pd.DataFrame):
+        """
+        将新数据合并写入所属月份的分区（只重写涉及的月份，其余分区不动）
+        每个分区先写临时文件再原子替换
+        """
+        root = self.series_dir(symbol, exchange, timeframe)
+        quality = self.quality_index(symbol, exchange, timeframe)
+        df = df.rename_axis('timestamp')
+        for month, part in df.groupby(df.index.strftime('%Y-%m')):
+            path = os.path.join(root, f"month={month}", "data.parquet")
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path).set_index('timestamp'), part])
+                part = part[~part.index.duplicated(keep='last')].sort_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part.reset_index().to_parquet(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+            quality.update(month, part)
+        quality.save()
+        if timeframe == self.base_timeframe and self.rollup_timeframes and len(df):
+            self.materialize_rollups(symbol, exchange, start=df.index.min(), end=df.index.max())
+
+    # ----------- 数据质量索引 -----------
+    def quality_index(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> QualityIndex:
+        """序列的数据质量索引（索引文件缺失时由已有分区重建）"""
+        root = self.series_dir(symbol, exchange, timeframe)
+        path = os.path.join(self.quality_dir, f"{exchange}_{symbol.replace('/', '')}_{timeframe}.json")
+        index = self._quality.get(path)
+        if index is None:
+            delta_ms = int(self._get_timedelta(timeframe).total_seconds() * 1000)
+            index = self._quality[path] = QualityIndex(path, delta_ms)
+            if not os.path.exists(path) and os.path.isdir(root):
+                for partition in sorted(glob.glob(os.path.join(root, "month=*", "*.parquet"))):
+                    month = os.path.basename(os.path.dirname(partition))[len('month='):]
+                    index.update(month, pd.read_parquet(partition).set_index('timestamp'))
+                index.save()
+        return index
+
+    def quality_report(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None
+    ) -> Dict:
+        """
+        [start, end] 内已存储数据的质量报告（由质量索引合并得到，只读取范围截断的首尾分区和可能含异常成交量的分区）
+        :return: 与 validate_data_quality 相同的 {'is_valid', 'issues'}，另附 gaps/nan_bars/spikes/abnormal_volume 明细和 stats
+        """
+        def read(lo: int, hi: int, columns: Optional[List[str]]) -> pd.DataFrame:
+            return self.read_range(
+                symbol, exchange, timeframe, pd.Timestamp(lo, unit='ms'), pd.Timestamp(hi, unit='ms'), columns
+            )
+
+        start_ms = None if start is None else self._to_ms(pd.Timestamp(start))
+        end_ms = None if end is None else self._to_ms(pd.Timestamp(end))
+        return self.quality_index(symbol, exchange, timeframe).report(start_ms, end_ms, read)
+
+    def fill_gaps(
+        self,
+        df: pd.DataFrame,
+        symbol: str,
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        method: str = 'linear'
+    ) -> pd.DataFrame:
+        """按质量索引记录的缺口补齐 df（只在缺口处插入K线，不重建完整时间索引）"""
+        if df.empty:
+            return df
+        gaps = self.quality_index(symbol, exchange, timeframe).gaps(self._to_ms(df.index[0]), self._to_ms(df.index[-1]))
+        return fill_missing_data(df, timeframe, method, gaps=gaps)
+
+    # ----------- 多周期聚合 -----------
+    def materialize_rollups(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        timeframes: Optional[List[str]] = None,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None
+    ):
+        """
+        由 1m 基础序列生成/更新聚合序列
+        只重新聚合 [start, end] 内的1m K线所在的聚合K线（从存储中读取这些聚合K线的全部 1m 数据）
+        :param timeframes: 聚合周期（默认 rollup_timeframes）
+        :param start: 新写入 1m 数据的起点（默认全部历史）
+        :param end: 新写入 1m 数据的终点（默认全部历史）
+        """
+        for timeframe in timeframes or self.rollup_timeframes:
+            delta = pd.Timedelta(self._get_timedelta(timeframe))
+            lo = None if start is None else pd.Timestamp(start).floor(delta)
+            hi = None if end is None else pd.Timestamp(end).floor(delta) + delta - pd.Timedelta(1, 'ns')
+            base = self.read_range(symbol, exchange, self.base_timeframe, lo, hi)
+            if base.empty:
+                continue
+            self._write_partitions(symbol, exchange, timeframe, resample_klines(base, timeframe))
+            self.invalidate(f"{exchange}_{symbol}_{timeframe}")
+
+    # ----------- 热数据（Arrow IPC 内存映射） -----------
+    def hot_path(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> str:
+        """热数据文件路径"""
+        return os.path.join(self.data_dir, "hot", f"{exchange}_{symbol.replace('/', '')}_{timeframe}.arrow")
+
+    def is_hot(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> bool:
+        return os.path.exists(self.hot_path(symbol, exchange, timeframe))
+
+    def promote_hot(self, symbol: str, exchange: str = "binance", timeframe: str = "1h") -> str:
+        """
+        将序列的全部本地数据另存为未压缩的 Arrow IPC（Feather v2）文件，之后 fetch_historical_data 改为内存映射读取
+        整个文件只有一个 record batch，读取时各列可直接引用映射内存
+        紧凑模式下按紧凑列类型保存（int64 毫秒时间戳、float32 价格），文件和映射内存同样减半
+        :return: 热数据文件路径
+        """
+        df = self.read_range(symbol, exchange, timeframe)
+        if df.empty:
+            raise ValueError(f"本地无数据: {symbol} {timeframe}")
+        if self.compact:
+            df = compact_frame(df)
+        table = pa.Table.from_pandas(df.rename_axis('timestamp').reset_index(), preserve_index=False).combine_chunks()
+        if self.compact:
+            # 降为 float32 的列的小数位数（还原为 float64 时取整用）
+            table = table.replace_schema_metadata({b'decimals': json.dumps(df.attrs['decimals']).encode()})
+        path = self.hot_path(symbol, exchange, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        feather.write_feather(table, f"{path}.tmp", compression='uncompressed', chunksize=len(table))
+        os.replace(f"{path}.tmp", path)  # 其他进程已映射的旧文件不受影响
+        logger.info(f" 热数据已更新: {path} ({len(table)} 行)")
+        return path
+
+    def demote_hot(self, symbol: str, exchange: str = "binance", timeframe: str = "1h"):
+        """删除热数据文件（之后从分区存储读取）"""
+        path = self.hot_path(symbol, exchange, timeframe)
+        self._hot_tables.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def read_hot(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        以内存映射方式读取热数据 [start, end] 内的K线（零拷贝，返回的数组只读）
+        分区存储有更新（分区文件比热数据文件新）时先重新生成热数据
+        热数据文件格式（紧凑/默认）与当前模式不一致时转换后返回（此时需要复制）
+        """
+        path = self.hot_path(symbol, exchange, timeframe)
+        partitions = glob.glob(os.path.join(self.series_dir(symbol, exchange, timeframe), 'month=*', '*.parquet'))
+        if any(os.path.getmtime(file) > os.path.getmtime(path) for file in partitions):
+            self.promote_hot(symbol, exchange, timeframe)
+
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._hot_tables.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = self._hot_tables[path] = (mtime, ipc.open_file(pa.memory_map(path, 'r')).read_all())
+        table = cached[1]
+
+        times = column_view(table.column('timestamp'))
+        compact = pa.types.is_integer(table.schema.field('timestamp').type)  # 紧凑格式：int64 毫秒时间戳
+        bound = self._to_ms if compact else (lambda t: np.datetime64(pd.Timestamp(t)))
+        lo = 0 if start is None else int(np.searchsorted(times, bound(start), side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, bound(end), side='right'))
+        table = table.slice(lo, hi - lo)
+        names = columns or [name for name in table.column_names if name != 'timestamp']
+        index = column_view(table.column('timestamp'))
+        df = pd.DataFrame(
+            {name: column_view(table.column(name)) for name in names},
+            index=pd.Index(index, name='timestamp') if compact else pd.DatetimeIndex(index, name='timestamp'),
+            copy=False
+        )
+        if compact:
+            df.attrs['decimals'] = json.loads((table.schema.metadata or {}).get(b'decimals', b'{}'))
+        if compact != self.compact:
+            df = compact_frame(df) if self.compact else expand_frame(df)
+        return df
+
+    # ----------- 内存占用 -----------
+    def memory_usage(self) -> Dict:
+        """
+        内存占用报告（每个缓存数据集一项）
+        :return: {
+            'cache': 内存缓存统计（FrameCache.stats），
+            'datasets': [{'series', 'start_ms', 'end_ms', **memory_report(K线)}, ...]（按最近使用从旧到新），
+            'hot': [{'path', 'rows', 'bytes'}, ...]（已映射的热数据，占用共享页缓存而非进程内存）
+        }
+        """
+        datasets = [
+            {'series': key[0], 'start_ms': key[1], 'end_ms': key[2], **memory_report(df)}
+            for key, df in self.cache.items()
+        ]
+        hot = [
+            {'path': path, 'rows': table.num_rows, 'bytes': int(table.nbytes)}
+            for path, (_, table) in self._hot_tables.items()
+        ]
+        return {'cache': self.cache.stats(), 'datasets': datasets, 'hot': hot}
+
+    def _migrate_legacy_file(self, symbol: str, exchange: str, timeframe: str):
+        """旧版单文件缓存 → 按月分区存储（迁移完成后删除旧文件）"""
+        legacy = self.file_path(symbol, exchange, timeframe)
+        if not os.path.exists(legacy):
+            return
+        df = pd.read_parquet(legacy)
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df = df.set_index(pd.to_datetime(df.pop('timestamp')))
+        cache_key = f"{exchange}_{symbol}_{timeframe}"
+        if cache_key not in self.coverage and len(df):
+            delta = self._get_timedelta(timeframe)
+            self.coverage[cache_key] = [[self._to_ms(df.index.min()), self._to_ms(df.index.max() + delta)]]
+            self._save_coverage()
+        self._write_partitions(symbol, exchange, timeframe, df)
+        os.remove(legacy)
+        logger.info(f" 迁移为分区存储: {legacy} → {self.series_dir(symbol, exchange, timeframe)}")
+
+    # ----------- 已覆盖区间 -----------
+    def _load_coverage(self) -> Dict[str, List[List[int]]]:
+        """读取已下载区间索引"""
+        if not os.path.exists(self.coverage_path):
+            return {}
+        with open(self.coverage_path) as f:
+            return json.load(f)
+
+    def _save_coverage(self):
+        """保存已下载区间索引（先写临时文件再原子替换）"""
+        tmp_path = f"{self.coverage_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.coverage, f)
+        os.replace(tmp_path, self.coverage_path)
+
+    def _covered_intervals(
+        self,
+        cache_key: str,
+        symbol: str,
+        exchange: str,
+        timeframe: str,
+        delta: timedelta
+    ) -> List[List[int]]:
+        """
+        已覆盖区间（毫秒，半开区间）
+        无本地数据时为空；没有区间记录的数据视为覆盖其首尾K线之间的全部时间（并登记到区间索引）
+        """
+        if cache_key not in self.coverage:
+            dataset = self._dataset(symbol, exchange, timeframe)
+            if dataset is None:
+                return []
+            times = dataset.to_table(columns=['timestamp']).column('timestamp').to_pandas()
+            if times.empty:
+                return []
+            self.coverage[cache_key] = [[self._to_ms(times.min()), self._to_ms(times.max() + delta)]]
+        return [list(interval) for interval in self.coverage[cache_key]]
+
+    @staticmethod
+    def _to_ms(timestamp) -> int:
+        return int(pd.Timestamp(timestamp).value // 10**6)
  
     def _fetch_from_exchange(
         self,
@@ -76,14 +573,18 @@ class HistoricalDataManager:
         timeframe: str,
         start_date: str,
         end_date: str 
-    ) -> pd.DataFrame:
-        """从交易所API获取原始数据（自动处理分页）"""
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        从交易所API获取原始数据（自动处理分页，相邻分页重叠的K线去重）
+        :return: (数据, 已完整下载到的时间点毫秒数)；请求失败时下载到失败的分页之前
+        """
         api = self.connector.get_exchange(exchange) 
         delta = self._get_timedelta(timeframe)
         current = pd.to_datetime(start_date) 
         end = pd.to_datetime(end_date) 
         all_klines = []
  
+        reached = end
         while current < end:
             try:
                 klines = api.fetch_ohlcv( 
@@ -104,21 +605,33 @@ class HistoricalDataManager:
                 
             except Exception as e:
                 logger.error(f" 获取数据失败: {current} | {e}")
+                reached = current
                 break
  
         if not all_klines:
-            raise ValueError(f"未获取到数据: {symbol} {timeframe}")
-        return pd.concat(all_klines).set_index('timestamp') 
+            df = pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'], index=pd.DatetimeIndex([], name='timestamp'))
+        else:
+            df = pd.concat(all_klines).drop_duplicates('timestamp', keep='last').set_index('timestamp')
+        return df, self._to_ms(reached)
  
-    def _preprocess_data(self, df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
-        """数据清洗和重采样"""
+    def _preprocess_data(self, df: pd.DataFrame, timeframe: str, context: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        数据清洗和重采样
+        :param context: 已存储的相邻K线收盘价（增量下载的数据段较短，与其合并后估计异常值阈值）
+        """
         # 处理缺失值 
         df = fill_missing_data(df, timeframe)
         
         # 去除异常值（价格变动超过3倍标准差）
-        returns = df['close'].pct_change()
-        threshold = 3 * returns.std() 
-        df = df[(returns.abs()  < threshold) | returns.isna()] 
+        closes = df['close']
+        if context is not None and len(context):
+            closes = pd.concat([context, closes])
+            closes = closes[~closes.index.duplicated(keep='last')].sort_index()
+        returns = closes.pct_change()
+        if returns.count() >= OUTLIER_MIN_RETURNS:  # 样本太少时标准差不可靠，不过滤
+            threshold = 3 * returns.std()
+            returns = returns.reindex(df.index)
+            df = df[(returns.abs()  < threshold) | returns.isna()] 
         
         # 统一时区
         df.index  = df.index.tz_localize(None) 
@@ -141,9 +654,17 @@ class HistoricalDataManager:
         exchange: str = "binance",
         timeframe: str = "1h",
         start_date: str = "2020-01-01",
-        end_date: str = None 
+        end_date: str = None,
+        max_concurrency: int = 1
     ) -> Dict[str, pd.DataFrame]:
-        """批量获取多币种数据"""
+        """
+        批量获取多币种数据
+        :param max_concurrency: 大于 1 时先用 AsyncHistoryDownloader 并发下载各币种缺失的数据，再从本地读取
+        """
+        if max_concurrency > 1:
+            AsyncHistoryDownloader(self, max_concurrency=max_concurrency).run(
+                symbols, exchange, timeframe, start_date, end_date
+            )
         return {
             sym: self.fetch_historical_data( 
                 symbol=sym,
@@ -155,11 +676,61 @@ class HistoricalDataManager:
             for sym in symbols 
         }
  
+    def get_stacked_symbols(
+        self,
+        symbols: List[str],
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        start_date: str = "2020-01-01",
+        end_date: str = None,
+        max_concurrency: int = 1
+    ) -> pd.DataFrame:
+        """
+        批量获取多币种数据并拼接为单个长表（symbol 列为分类类型，见 stack_frames）
+        紧凑模式下其余列同样为紧凑列类型
+        """
+        frames = self.get_multiple_symbols(symbols, exchange, timeframe, start_date, end_date, max_concurrency)
+        return stack_frames(frames, compact=self.compact)
+
     def clean_cache(self, max_days: int = 30):
-        """清理过期缓存（保留最近N天的数据）"""
+        """清理过期缓存（删除 max_days 天内未更新的分区文件，并从已覆盖区间中扣除对应月份）"""
         cutoff = datetime.now()  - timedelta(days=max_days)
-        for file in os.listdir(self.data_dir): 
-            file_path = os.path.join(self.data_dir,  file)
-            if os.path.getmtime(file_path)  < cutoff.timestamp(): 
+        for root, _, files in os.walk(self.data_dir):
+            for file in files:
+                file_path = os.path.join(root,  file)
+                if root == self.quality_dir or file_path == self.coverage_path or os.path.getmtime(file_path)  >= cutoff.timestamp():
+                    continue
                 os.remove(file_path) 
-                logger.info(f" 清理过期缓存: {file}")
\ No newline at end of file
+                self._forget(file_path)
+                logger.info(f" 清理过期缓存: {os.path.relpath(file_path, self.data_dir)}")
+
+    def _forget(self, file_path: str):
+        """数据文件已删除：清除对应的内存缓存，并从已覆盖区间中扣除该文件的时间范围"""
+        parts = os.path.relpath(file_path, self.data_dir).split(os.sep)
+        if parts[0] == 'hot':
+            self._hot_tables.pop(file_path, None)  # 热数据只是副本，分区存储和已覆盖区间不变
+            return
+        if parts[0] == 'ticks':
+            return  # 逐笔成交按文件自描述，无缓存和已覆盖区间
+        if len(parts) == 5 and parts[3].startswith('month='):
+            exchange, symbol, timeframe, partition = parts[:4]
+            month = pd.Timestamp(partition[len('month='):])
+            removed = [[self._to_ms(month), self._to_ms(month + pd.offsets.MonthBegin(1))]]
+            stem = f"{exchange}_{symbol}_{timeframe}"
+            quality = self.quality_index(symbol, exchange, timeframe)
+            quality.remove(partition[len('month='):])
+            quality.save()
+        else:
+            removed = None  # 旧版单文件：整个序列失效
+            stem = os.path.splitext(parts[-1])[0]
+
+        for key in [key for key in self.cache if key[0].replace('/', '') == stem]:
+            del self.cache[key]
+        for key in [key for key in self.coverage if key.replace('/', '') == stem]:
+            if removed is None:
+                del self.coverage[key]
+            else:
+                self.coverage[key] = [
+                    gap for a, b in self.coverage[key] for gap in missing_intervals(a, b, removed)
+                ]
+        self._save_coverage()
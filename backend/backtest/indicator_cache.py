@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Tuple
+
+
+def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    滚动均值：第 k 个值为 values[max(0, k-period+1):k+1] 的均值
+    （与逐K线计算 np.mean(closes[-period:]) 一致，数据不足 period 时取全部已有数据）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    csum = np.concatenate([[0.0], np.cumsum(values)])
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - period, 0)
+    return (csum[end] - csum[start]) / (end - start)
+
+
+def simple_rsi(closes: np.ndarray, period: int) -> np.ndarray:
+    """
+    简单 RSI 序列：第 k 个值由截至第 k 根K线的最近 period 个价格变动计算
+    up = 上涨幅度和 / period, down = 下跌幅度和 / period, RSI = 100 - 100 / (1 + up / down)
+    （与策略逐K线计算一致；无下跌时为 100，无变动时为 NaN）
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    deltas = np.diff(closes, prepend=np.nan)
+    deltas[0] = 0.0
+    up = np.concatenate([[0.0], np.cumsum(np.maximum(deltas, 0))])
+    down = np.concatenate([[0.0], np.cumsum(np.maximum(-deltas, 0))])
+    end = np.arange(1, len(closes) + 1)
+    start = np.maximum(end - period, 1)  # 第 0 个值无价格变动
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = (up[end] - up[start]) / (down[end] - down[start])
+        return 100 - 100 / (1 + rs)
+
+
+class IndicatorCache:
+    """
+    指标缓存（多策略/多组参数共享）
+    功能：
+    - 每个币种每种指标、每组参数只计算一次整段历史序列，之后直接读取
+    - 第 k 个值只依赖第 k 根K线及之前的数据，可直接作为逐K线信号的输入
+    - 统计命中/未命中次数，便于确认共享效果
+    """
+
+    def __init__(self, columns: Dict[str, Dict[str, np.ndarray]]):
+        """
+        :param columns: {symbol: {'open': (n,), 'close': (n,), ...}} 各币种紧凑K线数组
+        """
+        self.columns  = columns
+        self._cache  = {}  # {(symbol, name, params): np.ndarray}
+        self.hits  = 0
+        self.misses  = 0
+
+    @classmethod
+    def from_market(cls, market) -> 'IndicatorCache':
+        """由 AlignedMarketData 构建（与回测共享同一份K线数组，不复制）"""
+        return cls({sym: market.columns[s] for s, sym in enumerate(market.symbols)})
+
+    def get(self, symbol: str, name: str, params: Tuple, func: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        读取缓存的指标序列，未命中时调用 func() 计算并缓存
+        :param params: 指标参数（参与缓存键，须可哈希）
+        """
+        key = (symbol, name, params)
+        values = self._cache.get(key)
+        if values is None:
+            self.misses += 1
+            values = self._cache[key] = func()
+        else:
+            self.hits += 1
+        return values
+
+    # ----------- 常用指标 -----------
+    def sma(self, symbol: str, period: int, field: str = 'close') -> np.ndarray:
+        """简单移动平均"""
+        return self.get(symbol, 'SMA', (field, period), lambda: rolling_mean(self.columns[symbol][field], period))
+
+    def ema(self, symbol: str, period: int, field: str = 'close') -> np.ndarray:
+        """指数移动平均（alpha = 2 / (period + 1)）"""
+        return self.get(
+            symbol, 'EMA', (field, period),
+            lambda: pd.Series(self.columns[symbol][field]).ewm(span=period, adjust=False).mean().to_numpy()
+        )
+
+    def rsi(self, symbol: str, period: int, method: str = 'wilder') -> np.ndarray:
+        """
+        RSI 序列
+        :param method: 'wilder'（Wilder 平滑，前 period 根K线为 NaN）或 'simple'（最近 period 个价格变动的均值，见 simple_rsi）
+        """
+        if method == 'simple':
+            return self.get(symbol, 'RSI', (period, method), lambda: simple_rsi(self.columns[symbol]['close'], period))
+
+        def compute() -> np.ndarray:
+            deltas = pd.Series(np.diff(self.columns[symbol]['close'], prepend=np.nan))
+            up = deltas.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+            down = (-deltas.clip(upper=0)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return (100 - 100 / (1 + up / down)).to_numpy()
+        return self.get(symbol, 'RSI', (period, method), compute)
+
+    def macd(self, symbol: str, fast_period: int, slow_period: int) -> np.ndarray:
+        """MACD 柱值（快线均值 - 慢线均值，与策略中的计算方式一致），复用缓存的 SMA"""
+        return self.get(
+            symbol, 'MACD', (fast_period, slow_period),
+            lambda: self.sma(symbol, fast_period) - self.sma(symbol, slow_period)
+        )
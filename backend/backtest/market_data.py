@@ -0,0 +1,258 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+def _field_dtype(frames: Dict[str, pd.DataFrame], name: str) -> np.dtype:
+    """字段矩阵类型：全部输入列为 float32 时取 float32，否则 float64"""
+    dtypes = [df[name].dtype for df in frames.values() if name in df.columns]
+    if dtypes and all(dtype == np.float32 for dtype in dtypes):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+class AlignedMarketData:
+    """
+    多币种对齐行情存储
+    功能：
+    - 统一的 int64 毫秒时间轴（各币种K线时间的并集）
+    - OHLCV 以 (symbols, bars) 浮点矩阵存储，缺失K线由有效掩码标记
+    - 按整数下标 O(1) 读取任意币种任意时间点的K线
+    """
+
+    FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(
+        self,
+        symbols: List[str],
+        timestamps: np.ndarray,
+        fields: Dict[str, np.ndarray],
+        valid: np.ndarray,
+        columns: Optional[List[Dict[str, np.ndarray]]] = None,
+        rows: Optional[np.ndarray] = None
+    ):
+        """
+        :param symbols: 交易对列表（矩阵行顺序）
+        :param timestamps: (bars,) int64 毫秒时间戳，升序
+        :param fields: {'open': (symbols, bars), ...} 价格/成交量矩阵
+        :param valid: (symbols, bars) 有效K线掩码
+        :param columns: 各币种自身的紧凑K线数组 [{'close': (n,), ...}]，默认由矩阵提取
+        :param rows: 预先计算的下标映射（从磁盘加载时传入，避免重复计算）
+        """
+        self.symbols  = list(symbols)
+        self.symbol_index  = {sym: s for s, sym in enumerate(self.symbols)}
+        self.timestamps  = np.asarray(timestamps, dtype=np.int64)
+        self.fields  = fields
+        self.valid  = valid
+        # 对齐时间轴下标 → 该币种自身K线序号（缺失K线取之前最近一根，之前无K线为 -1）
+        self.rows  = rows if rows is not None else np.cumsum(valid, axis=1) - 1
+        if columns is None:
+            columns = [
+                {name: values[s, valid[s]] for name, values in fields.items()}
+                for s in range(len(self.symbols))
+            ]
+        self.columns  = columns
+        self._volatility_cache  = {}  # {窗口毫秒数: (symbols, bars) 波动率面板}
+        self._returns  = None         # (symbols, bars) 收益率面板
+        self._fingerprint  = None     # 行情内容哈希
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> 'AlignedMarketData':
+        """
+        由 {symbol: DataFrame(index=timestamp, columns=OHLCV)} 一次性构建对齐存储
+        索引可为 DatetimeIndex 或 int64 毫秒时间戳；各字段全部为 float32 时（紧凑K线）矩阵也为 float32
+        """
+        symbols = list(frames.keys())
+        times = [
+            df.index.values.astype('datetime64[ms]').astype(np.int64)
+            for df in frames.values()
+        ]
+        timestamps = np.unique(np.concatenate(times)) if times else np.array([], dtype=np.int64)
+
+        shape = (len(symbols), len(timestamps))
+        valid = np.zeros(shape, dtype=bool)
+        fields = {name: np.full(shape, np.nan, dtype=_field_dtype(frames, name)) for name in cls.FIELDS}
+        columns = []
+        for s, (df, t) in enumerate(zip(frames.values(), times)):
+            pos = np.searchsorted(timestamps, t)
+            valid[s, pos] = True
+            columns.append({})
+            for name in cls.FIELDS:
+                if name in df.columns:
+                    values = df[name].to_numpy(dtype=fields[name].dtype)
+                    fields[name][s, pos] = values
+                    columns[s][name] = values
+        return cls(symbols, timestamps, fields, valid, columns)
+
+    def save(self, directory: str):
+        """
+        以 .npy 文件保存到目录（可被多个进程以内存映射方式共享读取）
+        各币种紧凑K线按字段拼接为一维数组，通过 offsets 切分
+        """
+        os.makedirs(directory, exist_ok=True)
+        lengths = [len(col['close']) if 'close' in col else 0 for col in self.columns]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        np.save(os.path.join(directory, 'timestamps.npy'), self.timestamps)
+        np.save(os.path.join(directory, 'valid.npy'), self.valid)
+        np.save(os.path.join(directory, 'rows.npy'), self.rows)
+        np.save(os.path.join(directory, 'offsets.npy'), offsets)
+        for name, values in self.fields.items():
+            np.save(os.path.join(directory, f'{name}.npy'), values)
+            flat = [col[name] for col in self.columns if name in col]
+            np.save(
+                os.path.join(directory, f'{name}_flat.npy'),
+                np.concatenate(flat) if flat else np.array([], dtype=np.float64)
+            )
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'symbols': self.symbols, 'fields': list(self.fields)}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'AlignedMarketData':
+        """
+        从 save() 写出的目录加载
+        :param mmap: 以只读内存映射方式打开（多进程共享同一份页缓存，无反序列化开销）
+        """
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+
+        def _load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode)
+
+        offsets = _load('offsets')
+        fields = {name: _load(name) for name in meta['fields']}
+        flats = {name: _load(f'{name}_flat') for name in meta['fields']}
+        columns = [
+            {name: flat[offsets[s]:offsets[s + 1]] for name, flat in flats.items()}
+            for s in range(len(meta['symbols']))
+        ]
+        return cls(meta['symbols'], _load('timestamps'), fields, _load('valid'), columns, _load('rows'))
+
+    # ----------- 基本属性 -----------
+    @property
+    def n_symbols(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def n_bars(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def datetimes(self) -> pd.DatetimeIndex:
+        """时间轴（DatetimeIndex，用于报告和再平衡判断）"""
+        return pd.to_datetime(self.timestamps, unit='ms')
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        各部分内存占用（字节；内存映射加载时为映射文件大小）
+        :return: {'timestamps', 'valid', 'rows', 'fields', 'columns', 'bytes'}
+                 columns 为各币种紧凑K线数组，可能与输入 DataFrame 共享内存
+        """
+        usage = {
+            'timestamps': int(self.timestamps.nbytes),
+            'valid': int(self.valid.nbytes),
+            'rows': int(self.rows.nbytes),
+            'fields': int(sum(values.nbytes for values in self.fields.values())),
+            'columns': int(sum(values.nbytes for col in self.columns for values in col.values()))
+        }
+        usage['bytes'] = sum(usage.values())
+        return usage
+
+    def fingerprint(self) -> str:
+        """
+        行情内容哈希（币种、时间轴、有效掩码和各字段矩阵），首次调用时计算并缓存
+        内容相同的行情哈希相同，与数据来源（parquet / 交易所 / 内存）无关
+        """
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=20)
+            digest.update(json.dumps([self.symbols, sorted(self.fields)]).encode())
+            for values in (self.timestamps, self.valid, *(self.fields[name] for name in sorted(self.fields))):
+                digest.update(np.ascontiguousarray(values).data)
+            self._fingerprint  = digest.hexdigest()
+        return self._fingerprint
+
+    # ----------- O(1) 查询 -----------
+    def index_of(self, timestamp) -> Optional[int]:
+        """时间点 → 时间轴下标（不存在返回 None）"""
+        ts = pd.Timestamp(timestamp).value // 10**6
+        i = int(np.searchsorted(self.timestamps, ts))
+        return i if i < self.n_bars and self.timestamps[i] == ts else None
+
+    def kline_at(self, s: int, i: int) -> Optional[Dict[str, float]]:
+        """读取第 s 个币种在第 i 根K线的数据（缺失返回 None）"""
+        if not self.valid[s, i]:
+            return None
+        kline = {name: values[s, i] for name, values in self.fields.items()}
+        kline['time'] = self.timestamps[i]
+        return kline
+
+    def history(self, s: int, i: int) -> Dict[str, np.ndarray]:
+        """截至第 i 根K线（含）的该币种历史数据（零拷贝切片）"""
+        end = self.rows[s, i] + 1
+        return {name: values[:end] for name, values in self.columns[s].items()}
+
+    # ----------- 预计算面板 -----------
+    def returns(self) -> np.ndarray:
+        """
+        收益率面板：有效K线相对该币种上一根有效K线的收益率（缺失K线及首根K线为 NaN）
+        首次调用时计算并缓存
+        """
+        if self._returns is None:
+            panel = np.full(self.valid.shape, np.nan)
+            for s, cols in enumerate(self.columns):
+                closes = cols['close']
+                if len(closes) > 1:
+                    panel[s, np.flatnonzero(self.valid[s])[1:]] = closes[1:] / closes[:-1] - 1
+            self._returns  = panel
+        return self._returns
+
+    def rolling_volatility(self, window: pd.Timedelta = pd.Timedelta(days=30)) -> np.ndarray:
+        """
+        滚动收益率波动率面板（与 window 内 close.pct_change().std() 等价）
+        通过收益率及其平方的累计和增量计算，每个窗口 O(1)，全部币种一次完成
+        :param window: 回看时间窗口（按时间而非K线数量）
+        :return: (symbols, bars) 面板，第 i 列为截至第 i 根K线的波动率（样本不足为 NaN）
+        """
+        key = int(window / pd.Timedelta(milliseconds=1))
+        if key in self._volatility_cache:
+            return self._volatility_cache[key]
+
+        n_bars = self.n_bars
+        closes = self.fields['close'].astype(np.float64, copy=False)  # 累计和需要双精度
+        arange = np.arange(n_bars)
+
+        # 收益率定义在有效K线上（相对该币种上一根有效K线）
+        last = np.where(self.valid, arange, -1)
+        np.maximum.accumulate(last, axis=1, out=last)
+        prev = np.full_like(last, -1)
+        prev[:, 1:] = last[:, :-1]
+        has_return = self.valid & (prev >= 0)
+        prev_close = np.take_along_axis(closes, np.maximum(prev, 0), axis=1)
+        returns = np.where(has_return, closes / prev_close - 1, 0.0)
+
+        # 按币种去均值以减小累计和相减的数值误差（方差平移不变）
+        counts = has_return.sum(axis=1, keepdims=True)
+        returns -= np.where(has_return, returns.sum(axis=1, keepdims=True) / np.maximum(counts, 1), 0.0)
+        c1 = np.cumsum(returns, axis=1)
+        c2 = np.cumsum(returns ** 2, axis=1)
+        cn = np.cumsum(has_return, axis=1)
+
+        # 窗口内第一根有效K线 f：只统计 (f, i] 内的收益率（f 的收益率依赖窗口外价格）
+        start = np.searchsorted(self.timestamps, self.timestamps - key, side='left')
+        first = np.where(self.valid, arange, n_bars)
+        first = np.minimum.accumulate(first[:, ::-1], axis=1)[:, ::-1][:, start]
+        inside = first <= arange
+        f = np.minimum(first, n_bars - 1)
+
+        n = np.where(inside, cn - np.take_along_axis(cn, f, axis=1), 0)
+        s1 = np.where(inside, c1 - np.take_along_axis(c1, f, axis=1), 0.0)
+        s2 = np.where(inside, c2 - np.take_along_axis(c2, f, axis=1), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (s2 - s1 ** 2 / n) / (n - 1)
+        panel = np.where(n >= 2, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+        self._volatility_cache[key] = panel
+        return panel
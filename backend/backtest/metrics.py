@@ -0,0 +1,169 @@
+import numpy as np
+from typing import Dict, Optional
+
+
+class SymbolAccumulator:
+    """
+    单币种逐笔绩效累加器
+    每笔成交结算上一段持仓的盈亏：持仓 × (本笔成交价 - 上笔成交价) - 本笔手续费
+    """
+
+    __slots__ = ('position', 'last_price', 'n_trades', 'wins', 'gross_profit', 'gross_loss', 'pnl')
+
+    def __init__(self):
+        self.position  = 0.0
+        self.last_price  = 0.0
+        self.n_trades  = 0        # 已结算的持仓段数
+        self.wins  = 0
+        self.gross_profit  = 0.0
+        self.gross_loss  = 0.0
+        self.pnl  = 0.0           # 已结算盈亏（含全部手续费）
+
+    def record_fill(self, side: int, price: float, amount: float, fee: float) -> float:
+        """
+        :param side: 1=买入, -1=卖出
+        :return: 本笔成交结算的持仓段盈亏
+        """
+        segment = self.position * (price - self.last_price) - fee
+        self.pnl += segment
+        if self.position != 0:
+            self.n_trades += 1
+            if segment > 0:
+                self.wins += 1
+                self.gross_profit += segment
+            else:
+                self.gross_loss -= segment
+        self.position += side * amount
+        self.last_price  = price
+        return segment
+
+    def snapshot(self, initial_balance: float) -> Dict[str, float]:
+        return {
+            'total_return': self.pnl / initial_balance,
+            'win_rate': self.wins / self.n_trades if self.n_trades else 0.0,
+            'profit_factor': _profit_factor(self.gross_profit, self.gross_loss),
+            'n_trades': self.n_trades
+        }
+
+
+class StreamingMetrics:
+    """
+    流式绩效统计（回测过程中逐K线 O(1) 更新）
+    功能：
+    - 资金、最大回撤、Sharpe / Sortino（Welford 在线均值方差）
+    - 胜率、盈亏比、持仓暴露度
+    - 不保存交易和资金曲线，内存占用与回测长度无关，运行中可随时读取阶段性指标
+    """
+
+    def __init__(self, initial_balance: float, bar_ms: Optional[float] = None):
+        """
+        :param initial_balance: 初始资金（USDT）
+        :param bar_ms: K线间隔毫秒数（用于年化 Sharpe / Sortino，None 表示不年化）
+        """
+        self.initial_balance  = initial_balance
+        self.annualize  = np.sqrt(365 * 86400000 / bar_ms) if bar_ms else 1.0
+        self.symbols  = {}  # {symbol: SymbolAccumulator}
+        self.n_bars  = 0
+        self.equity  = float(initial_balance)
+        self.peak  = None
+        self.max_drawdown  = 0.0
+        self.exposure_sum  = 0.0
+        # 逐K线收益率的 Welford 统计量
+        self.n_returns  = 0
+        self.mean  = 0.0
+        self.m2  = 0.0
+        self.downside_sq  = 0.0  # 负收益平方和（Sortino 下行波动）
+
+    def update(self, equity: float, exposure: float = 0.0):
+        """
+        每根K线收盘后更新
+        :param equity: 组合总价值（USDT）
+        :param exposure: 持仓市值占组合价值的比例
+        """
+        if self.n_bars:
+            r = equity / self.equity - 1
+            self.n_returns += 1
+            delta = r - self.mean
+            self.mean += delta / self.n_returns
+            self.m2 += delta * (r - self.mean)
+            if r < 0:
+                self.downside_sq += r * r
+        self.peak = equity if self.peak is None else max(self.peak, equity)
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, 1 - equity / self.peak)
+        self.exposure_sum += exposure
+        self.equity  = float(equity)
+        self.n_bars += 1
+
+    def update_batch(self, equity: np.ndarray, exposure: Optional[np.ndarray] = None):
+        """
+        批量更新一段资金曲线（按 Chan 并行公式合并分段均值方差，结果与逐K线 update 一致）
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) == 0:
+            return
+        previous = equity[:-1] if not self.n_bars else np.concatenate([[self.equity], equity[:-1]])
+        returns = equity[len(equity) - len(previous):] / previous - 1
+        if len(returns):
+            n_b, mean_b = len(returns), returns.mean()
+            n = self.n_returns + n_b
+            delta = mean_b - self.mean
+            self.m2 += ((returns - mean_b) ** 2).sum() + delta * delta * self.n_returns * n_b / n
+            self.mean += delta * n_b / n
+            self.n_returns  = n
+            self.downside_sq += float(np.sum(np.minimum(returns, 0) ** 2))
+
+        running_peak = np.maximum.accumulate(equity)
+        if self.peak is not None:
+            running_peak = np.maximum(running_peak, self.peak)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(running_peak > 0, 1 - equity / running_peak, 0.0)
+        self.max_drawdown = max(self.max_drawdown, float(drawdown.max()))
+        self.peak  = float(running_peak[-1])
+        if exposure is not None:
+            self.exposure_sum += float(np.sum(exposure))
+        self.equity  = float(equity[-1])
+        self.n_bars += len(equity)
+
+    def record_fill(self, symbol: str, side: int, price: float, amount: float, fee: float) -> float:
+        """
+        记录一笔成交（side: 1=买入, -1=卖出）
+        :return: 本笔成交结算的持仓段盈亏
+        """
+        acc = self.symbols.get(symbol)
+        if acc is None:
+            acc = self.symbols[symbol] = SymbolAccumulator()
+        return acc.record_fill(side, price, amount, fee)
+
+    def snapshot(self) -> Dict[str, float]:
+        """当前阶段性绩效（回测中途也可调用）"""
+        std = np.sqrt(self.m2 / self.n_returns) if self.n_returns else 0.0
+        downside = np.sqrt(self.downside_sq / self.n_returns) if self.n_returns else 0.0
+        n_trades = sum(acc.n_trades for acc in self.symbols.values())
+        wins = sum(acc.wins for acc in self.symbols.values())
+        return {
+            'equity': self.equity,
+            'return': self.equity / self.initial_balance - 1,
+            'max_drawdown': self.max_drawdown,
+            'sharpe': float(self.mean / std * self.annualize) if self.n_returns > 1 and std > 0 else 0.0,
+            'sortino': float(self.mean / downside * self.annualize) if self.n_returns > 1 and downside > 0 else 0.0,
+            'win_rate': wins / n_trades if n_trades else 0.0,
+            'profit_factor': _profit_factor(
+                sum(acc.gross_profit for acc in self.symbols.values()),
+                sum(acc.gross_loss for acc in self.symbols.values())
+            ),
+            'exposure': self.exposure_sum / self.n_bars if self.n_bars else 0.0,
+            'n_bars': self.n_bars,
+            'n_trades': n_trades
+        }
+
+    def symbol_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各币种逐笔绩效"""
+        return {sym: acc.snapshot(self.initial_balance) for sym, acc in self.symbols.items()}
+
+
+def _profit_factor(gross_profit: float, gross_loss: float) -> float:
+    """盈亏比 = 总盈利 / 总亏损（无亏损时为 inf，无交易时为 0）"""
+    if gross_loss > 0:
+        return gross_profit / gross_loss
+    return float('inf') if gross_profit > 0 else 0.0
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+from .backtest_engine import MultiBacktestEngine
+
+
+def trade_returns(engine: MultiBacktestEngine, report: Dict) -> Dict[str, np.ndarray]:
+    """
+    将回测成交记录整理为蒙特卡洛重放所需的逐笔数组（按成交时间排序）
+    每笔交易的收益 = 成交后持仓持有至该币种下一笔成交（或回测结束收盘价）的盈亏 - 手续费
+    :return: {
+        'pnl': 逐笔毛盈亏, 'fee': 手续费, 'notional': 成交额, 'side': 方向,
+        'equity': 成交时组合净值
+    }
+    :raises ValueError: 报告中没有资金曲线（回测时 record=False）
+    """
+    equity_curve = report['portfolio']['equity_curve']
+    if equity_curve is None:
+        raise ValueError("报告中没有资金曲线，蒙特卡洛分析需要以 record=True 运行回测")
+    if len(engine.history) == 0:
+        empty = np.array([])
+        return {'pnl': empty, 'fee': empty, 'notional': empty, 'side': empty, 'equity': empty}
+
+    cols = engine.history.columns()
+    order = np.argsort(cols['time'], kind='stable')
+    symbol_ids = cols['symbol'][order]
+    side = cols['side'][order].astype(np.float64)
+    price = cols['price'][order]
+    amount = cols['amount'][order]
+
+    # 逐币种：成交后持仓 × (下一笔成交价 - 本笔成交价)
+    pnl = np.empty(len(order))
+    for sid in np.unique(symbol_ids):
+        idx = np.flatnonzero(symbol_ids == sid)
+        s = engine.market.symbol_index[engine.history.symbols[sid]]
+        position = np.cumsum(side[idx] * amount[idx])
+        exit_price = np.append(price[idx][1:], engine.market.columns[s]['close'][-1])
+        pnl[idx] = position * (exit_price - price[idx])
+
+    equity = equity_curve.asof(pd.to_datetime(cols['time'][order], unit='ms')).to_numpy(dtype=np.float64)
+    return {
+        'pnl': pnl,
+        'fee': cols['fee'][order],
+        'notional': price * amount,
+        'side': side,
+        'equity': np.where(equity > 0, equity, engine.initial_balance)
+    }
+
+
+class MonteCarloSimulator:
+    """
+    批量蒙特卡洛稳健性分析
+    功能：
+    - 在成交记录上重放数千个场景：滑点扰动、手续费倍数、交易顺序重抽样
+    - 所有场景以 (scenarios, trades) 数组批量计算，不重新运行回测
+    - 输出资金曲线与回撤的分位数区间
+    """
+
+    def __init__(
+        self,
+        n_scenarios: int = 1000,
+        slippage: float = 0.0005,
+        fee_range: Tuple[float, float] = (0.5, 2.0),
+        resample: bool = True,
+        seed: Optional[int] = 0,
+        percentiles: Sequence[float] = (5, 25, 50, 75, 95),
+        chunk_size: int = 4096
+    ):
+        """
+        :param slippage: 每笔成交额外滑点的幅度（占成交价比例，滑点幅度服从 |N(0, slippage)|）
+        :param fee_range: 每个场景的手续费倍数均匀分布区间
+        :param resample: 是否对交易顺序做有放回重抽样（bootstrap）
+        :param seed: 随机数种子（相同种子结果可复现）
+        :param chunk_size: 沿交易维度分块计算，内存占用为 scenarios × chunk_size
+        """
+        self.n_scenarios  = n_scenarios
+        self.slippage  = slippage
+        self.fee_range  = fee_range
+        self.resample  = resample
+        self.seed  = seed
+        self.percentiles  = list(percentiles)
+        self.chunk_size  = chunk_size
+
+    def run(self, engine: MultiBacktestEngine, report: Dict) -> Dict:
+        """
+        对一次回测的成交记录执行蒙特卡洛重放
+        :param engine: 已完成回测的引擎（读取 history 和行情）
+        :param report: engine.run() 的返回结果（读取资金曲线）
+        """
+        return self.simulate(trade_returns(engine, report), engine.initial_balance)
+
+    def simulate(self, trades: Dict[str, np.ndarray], initial_balance: float) -> Dict:
+        """
+        :param trades: trade_returns() 的输出
+        :return: {
+            'equity_bands': 每笔交易后资金的分位数（行=交易序号，列=分位数）,
+            'drawdown_bands': 每笔交易后回撤的分位数,
+            'summary': 最终资金、收益率、最大回撤的分位数,
+            'prob_loss': 最终亏损的场景占比
+        }
+        """
+        rng = np.random.default_rng(self.seed)
+        n, n_sim = len(trades['pnl']), self.n_scenarios
+        fee_mult = rng.uniform(*self.fee_range, size=(n_sim, 1))
+
+        equity_bands = np.empty((n, len(self.percentiles)))
+        drawdown_bands = np.empty((n, len(self.percentiles)))
+        level = np.full(n_sim, float(initial_balance))
+        peak = level.copy()
+        max_drawdown = np.zeros(n_sim)
+
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            if self.resample:
+                idx = rng.integers(0, n, size=(n_sim, stop - start))
+            else:
+                idx = np.broadcast_to(np.arange(start, stop), (n_sim, stop - start))
+
+            # 滑点使成交价朝不利方向偏移：买入更贵、卖出更便宜（无论买卖都减少收益）
+            noise = np.abs(rng.normal(0, self.slippage, size=idx.shape))
+            pnl = (
+                trades['pnl'][idx]
+                - trades['notional'][idx] * noise
+                - trades['fee'][idx] * fee_mult
+            )
+            returns = pnl / trades['equity'][idx]
+
+            path = level[:, None] * np.cumprod(1 + returns, axis=1)
+            running_peak = np.maximum(peak[:, None], np.maximum.accumulate(path, axis=1))
+            drawdown = 1 - path / running_peak
+
+            equity_bands[start:stop] = np.percentile(path, self.percentiles, axis=0).T
+            drawdown_bands[start:stop] = np.percentile(drawdown, self.percentiles, axis=0).T
+            max_drawdown = np.maximum(max_drawdown, drawdown.max(axis=1))
+            level, peak = path[:, -1], running_peak[:, -1]
+
+        columns = [f'p{p:g}' for p in self.percentiles]
+        final_return = level / initial_balance - 1
+        summary = pd.DataFrame(
+            np.percentile(np.stack([level, final_return, max_drawdown]), self.percentiles, axis=1).T,
+            index=['final_value', 'return', 'max_drawdown'],
+            columns=columns
+        )
+        return {
+            'equity_bands': pd.DataFrame(equity_bands, columns=columns),
+            'drawdown_bands': pd.DataFrame(drawdown_bands, columns=columns),
+            'summary': summary,
+            'prob_loss': float(np.mean(final_return < 0))
+        }
@@ -0,0 +1,264 @@
+import os
+import copy
+import itertools
+import tempfile
+import yaml
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+from ..utils.logger  import logger
+from .backtest_engine import MultiBacktestEngine
+from .market_data import AlignedMarketData
+from .vectorized import run_vectorized
+
+# 每次试验输出的绩效指标（结果表的列顺序）
+SWEEP_METRICS = ('final_value', 'total_return', 'max_drawdown', 'sharpe', 'n_trades')
+
+PRESET_DIR = os.path.join(os.path.dirname(__file__), '../../configs/strategy_presets')
+
+
+def apply_params(indicators: Dict, params: Dict) -> Dict:
+    """
+    将扫描参数写入指标配置副本
+    :param params: {'RSI.period': 14, 'leverage': 3}，带点号的键表示 指标.参数
+    """
+    indicators = copy.deepcopy(indicators)
+    for key, value in params.items():
+        if '.' in key:
+            name, param = key.split('.', 1)
+            indicators.setdefault(name, {})[param] = value
+        else:
+            indicators[key] = value
+    return indicators
+
+
+def summarize_equity(equity: np.ndarray, timestamps: np.ndarray, n_trades: int, initial_balance: float) -> Tuple[float, ...]:
+    """由资金曲线计算 SWEEP_METRICS 对应的绩效指标"""
+    if len(equity) == 0:
+        return (initial_balance, 0.0, 0.0, 0.0, float(n_trades))
+    peak = np.maximum.accumulate(equity)
+    max_drawdown = float(np.max(1 - equity / peak))
+    returns = np.diff(equity) / equity[:-1]
+    sharpe = 0.0
+    if len(returns) > 1 and returns.std() > 0:
+        bar_ms = float(np.median(np.diff(timestamps)))
+        sharpe = float(returns.mean() / returns.std() * np.sqrt(365 * 86400000 / bar_ms))
+    return (
+        float(equity[-1]),
+        float(equity[-1] / initial_balance - 1),
+        max_drawdown,
+        sharpe,
+        float(n_trades)
+    )
+
+
+def _is_numeric(value) -> bool:
+    """参数值是否为数值（布尔值不算数值）"""
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+class ResultTable:
+    """
+    列式扫描结果表
+    每个参数和指标一列预分配的数组，结果按试验编号写入，避免逐条构造字典
+    数值参数和指标为 float64 列；字符串、布尔等非数值参数（如 MA.type: [SMA, EMA]）为 object 列，原值保留
+    """
+
+    def __init__(self, param_space: Dict[str, List], n_trials: int):
+        """
+        :param param_space: 参数空间 {参数名: 取值列表}（按取值类型决定列类型）
+        :param n_trials: 试验次数
+        """
+        self.param_names  = list(param_space)
+        self.columns  = {
+            name: np.full(n_trials, np.nan) if all(_is_numeric(v) for v in values) else np.full(n_trials, None, dtype=object)
+            for name, values in param_space.items()
+        }
+        self.columns.update({name: np.full(n_trials, np.nan) for name in SWEEP_METRICS})
+
+    def set(self, trial_id: int, params: Dict, metrics: Tuple[float, ...]):
+        for name in self.param_names:
+            self.columns[name][trial_id] = params[name]
+        for name, value in zip(SWEEP_METRICS, metrics):
+            self.columns[name][trial_id] = value
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns, copy=False)
+
+
+# ----------- 工作进程 -----------
+_WORKER = {}  # 每个工作进程加载一次的共享状态
+
+
+def _init_worker(data_dir: str, strategy_cls: Type, settings: Dict):
+    """工作进程初始化：以内存映射方式打开行情和权重，不复制数据"""
+    strategy = strategy_cls(connector=None)
+    _WORKER.update(
+        market=AlignedMarketData.load(os.path.join(data_dir, 'market'), mmap=True),
+        weights=np.load(os.path.join(data_dir, 'weights.npy'), mmap_mode='r'),
+        strategy=strategy,
+        base_indicators=copy.deepcopy(strategy.indicators),
+        settings=settings
+    )
+
+
+def _trial_signals(params: Dict) -> np.ndarray:
+    """按参数配置策略并生成整段历史的信号矩阵"""
+    strategy = _WORKER['strategy']
+    strategy.indicators = apply_params(_WORKER['base_indicators'], params)
+    engine = MultiBacktestEngine(initial_balance=_WORKER['settings']['initial_balance'], strategy=strategy)
+    engine.market = _WORKER['market']
+    return engine._generate_signal_matrix()
+
+
+def _simulate(signals: np.ndarray, start: int = 0, end: Optional[int] = None) -> Tuple[float, ...]:
+    """在 [start, end) 区间上执行向量化内核并汇总绩效（切片均为视图，不复制数据）"""
+    market, settings = _WORKER['market'], _WORKER['settings']
+    window = slice(start, end)
+    sim = run_vectorized(
+        market.fields['open'][:, window], market.fields['close'][:, window], market.valid[:, window],
+        signals[:, window], _WORKER['weights'][:, window],
+        initial_balance=settings['initial_balance'],
+        commission=settings['commission'],
+        slippage=settings['slippage'],
+        rng=np.random.default_rng(settings['seed'])
+    )
+    return summarize_equity(
+        sim['equity'], market.timestamps[window], len(sim['trade_bar']), settings['initial_balance']
+    )
+
+
+def _run_trial(task: Tuple[int, Dict]) -> Tuple[int, Tuple[float, ...]]:
+    """执行单次试验：按参数生成信号后调用向量化执行内核"""
+    trial_id, params = task
+    return trial_id, _simulate(_trial_signals(params))
+
+
+def run_trials(
+    engine: MultiBacktestEngine,
+    strategy_cls: Type,
+    settings: Dict,
+    rebalance_freq: str,
+    func,
+    tasks: List,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None
+):
+    """
+    在进程池中执行试验任务并按提交顺序（tasks 的顺序）产出结果
+    行情与再平衡权重写入临时目录的内存映射文件，工作进程初始化时只打开一次
+    :param func: 模块级任务函数（如 _run_trial），在工作进程中读取 _WORKER 状态
+    :param max_workers: 进程数（默认CPU核数，1 表示在当前进程执行）
+    """
+    # 再平衡权重与策略参数无关，只计算一次
+    weights = engine._build_weight_matrix(engine.market.datetimes, rebalance_freq)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix='sweep_') as data_dir:
+        engine.market.save(os.path.join(data_dir, 'market'))
+        np.save(os.path.join(data_dir, 'weights.npy'), weights)
+        initargs = (data_dir, strategy_cls, settings)
+
+        if max_workers == 1:
+            _init_worker(*initargs)
+            try:
+                for task in tasks:
+                    yield func(task)
+            finally:
+                _WORKER.clear()
+        else:
+            chunksize = chunksize or max(1, len(tasks) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=initargs) as pool:
+                yield from pool.map(func, tasks, chunksize=chunksize)
+
+
+class ParameterSweep:
+    """
+    并行参数扫描器
+    功能：
+    - 网格搜索 / 随机搜索策略参数（如 RSI周期 × MACD快慢线 × 超卖阈值）
+    - 行情与再平衡权重只写一次内存映射文件，所有工作进程共享页缓存
+    - 结果流式写入列式结果表
+    """
+
+    def __init__(
+        self,
+        strategy_cls: Type,
+        param_space: Dict[str, List],
+        initial_balance: float = 10000,
+        commission: float = 0.0005,
+        slippage: float = 0.0001,
+        rebalance_freq: str = 'W',
+        seed: int = 0
+    ):
+        """
+        :param strategy_cls: 策略类（以 strategy_cls(connector=None) 构造并加载预设）
+        :param param_space: {'RSI.period': [7, 14, 21], 'MACD.fast_period': [8, 12]}
+        :param seed: 滑点随机数种子（所有试验相同，保证参数间可比）
+        """
+        self.strategy_cls  = strategy_cls
+        self.param_space  = {k: list(v) for k, v in param_space.items()}
+        self.rebalance_freq  = rebalance_freq
+        self.settings  = {
+            'initial_balance': initial_balance,
+            'commission': commission,
+            'slippage': slippage,
+            'seed': seed
+        }
+
+    @classmethod
+    def from_preset(cls, strategy_cls: Type, preset: str, **kwargs) -> 'ParameterSweep':
+        """从 configs/strategy_presets/{preset}.yaml 的 sweep 段读取参数空间"""
+        with open(os.path.join(PRESET_DIR, f'{preset}.yaml'), 'r') as f:
+            config = yaml.safe_load(f)
+        if not config.get('sweep'):
+            raise ValueError(f"预设 {preset} 未定义 sweep 参数空间")
+        return cls(strategy_cls, config['sweep'], **kwargs)
+
+    def grid(self) -> List[Dict]:
+        """网格搜索：参数空间笛卡尔积"""
+        names = list(self.param_space)
+        return [dict(zip(names, values)) for values in itertools.product(*self.param_space.values())]
+
+    def sample(self, n_trials: int, seed: int = 0) -> List[Dict]:
+        """随机搜索：从参数空间中不重复抽样 n_trials 组"""
+        grid = self.grid()
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(grid), size=min(n_trials, len(grid)), replace=False)
+        return [grid[k] for k in picks]
+
+    def run(
+        self,
+        engine: MultiBacktestEngine,
+        method: str = 'grid',
+        n_trials: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        执行参数扫描
+        :param engine: 已调用 load_data 的回测引擎（提供行情和资产分配器）
+        :param method: 'grid' 或 'random'
+        :param n_trials: 随机搜索的试验次数
+        :param max_workers: 进程数（默认CPU核数，1 表示在当前进程执行）
+        :return: 每行一次试验的结果表（参数列 + SWEEP_METRICS）
+        """
+        if method == 'grid':
+            trials = self.grid()
+        elif method == 'random':
+            trials = self.sample(n_trials or len(self.grid()), seed=self.settings['seed'])
+        else:
+            raise ValueError(f"不支持的扫描方式: {method}")
+
+        table = ResultTable(self.param_space, len(trials))
+        logger.info(f" 参数扫描开始: {len(trials)} 组参数")
+        results = run_trials(
+            engine, self.strategy_cls, self.settings, self.rebalance_freq,
+            _run_trial, list(enumerate(trials)), max_workers, chunksize
+        )
+        for trial_id, metrics in results:
+            table.set(trial_id, trials[trial_id], metrics)
+
+        logger.info(f" 参数扫描完成: {len(trials)} 组参数")
+        return table.to_frame()
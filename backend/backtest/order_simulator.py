@@ -0,0 +1,277 @@
+import heapq
+import itertools
+import numpy as np
+from typing import Dict, List, Optional
+from ..models.order_model import Order, OrderBook, OrderSide, OrderStatus, OrderType
+
+# 挂单触发方向：价格上穿（high >= 触发价）或下穿（low <= 触发价）
+RISING, FALLING = 'rising', 'falling'
+
+
+class OrderSimulator:
+    """
+    事件驱动撮合模拟器（回测中替代交易所）
+    功能：
+    - 接收 Order 对象：MARKET / LIMIT / STOP / TAKE_PROFIT / IOC / FOK
+    - 按K线 OHLC 或逐笔成交撮合，跳空时按开盘价成交
+    - 挂单按触发价存入堆，每根K线只弹出被触发的订单，不扫描全部挂单
+    - 按币种索引未完成的订单，open_orders() 不扫描历史订单
+    - 可按K线成交量比例限制可成交数量（部分成交）
+    """
+
+    def __init__(
+        self,
+        maker_fee: float = 0.0002,
+        taker_fee: float = 0.0005,
+        max_volume_pct: Optional[float] = None
+    ):
+        """
+        :param maker_fee: 挂单成交手续费率（LIMIT / TAKE_PROFIT）
+        :param taker_fee: 吃单成交手续费率（MARKET / STOP / IOC / FOK）
+        :param max_volume_pct: 每根K线最多成交该K线成交量的比例（None 表示不限制）
+        """
+        self.maker_fee  = maker_fee
+        self.taker_fee  = taker_fee
+        self.max_volume_pct  = max_volume_pct
+        self.book  = OrderBook()
+        self._immediate  = {}  # 待下一根K线开盘撮合的订单 {symbol: [client_order_id]}
+        self._heaps  = {}      # {(symbol, RISING/FALLING): [(key, seq, client_order_id)]}
+        self._stale  = {}      # 各堆中已撤销、尚未弹出的条目数 {(symbol, RISING/FALLING): n}
+        self._active  = {}     # 未完成的订单（按提交顺序）{symbol: {client_order_id: Order}}
+        self._seq  = itertools.count()
+        self._ids  = itertools.count(1)
+
+    # ----------- 下单接口 -----------
+    def submit(self, order: Order) -> Order:
+        """提交订单：市价/IOC/FOK 在下一根K线开盘撮合，其余按触发价挂入堆"""
+        if order.client_order_id is None:
+            order.client_order_id = f"sim-{next(self._ids)}"
+        if not order.amount or order.amount <= 0:
+            raise ValueError(f"订单数量必须为正: {order.client_order_id}")
+        order_type = OrderType(order.type)
+        if order_type not in (OrderType.MARKET, OrderType.IOC, OrderType.FOK) and order.price is None:
+            raise ValueError(f"{order_type.name} 订单必须指定价格: {order.client_order_id}")
+
+        order.remaining = order.amount - order.filled
+        order.status = OrderStatus.PENDING
+        self.book.add(order)
+        self._active.setdefault(order.symbol, {})[order.client_order_id] = order
+
+        if order_type in (OrderType.MARKET, OrderType.IOC, OrderType.FOK):
+            self._immediate.setdefault(order.symbol, []).append(order.client_order_id)
+        else:
+            direction = self._trigger_direction(order_type, OrderSide(order.side))
+            # 上穿堆按价格升序、下穿堆按价格降序，堆顶即最先被触发的订单
+            key = order.price if direction == RISING else -order.price
+            heapq.heappush(
+                self._heaps.setdefault((order.symbol, direction), []),
+                (key, next(self._seq), order.client_order_id)
+            )
+        return order
+
+    def create_order(
+        self,
+        symbol: str,
+        side: str,
+        order_type: str = 'market',
+        amount: float = 0.0,
+        price: Optional[float] = None,
+        **params
+    ) -> Order:
+        """与 BinanceAPI/OKXAPI.create_order 相同的调用方式，便于复用实盘下单代码"""
+        return self.submit(Order(
+            symbol=symbol,
+            side=OrderSide[side.upper()],
+            type=OrderType[order_type.upper()],
+            price=price,
+            amount=amount,
+            params=params
+        ))
+
+    def cancel(self, client_order_id: str) -> bool:
+        """撤单（堆中条目惰性删除，弹出时跳过；已撤销条目超过堆的一半时重建该堆）"""
+        order = self.book.orders.get(client_order_id)
+        if order is None or OrderStatus(order.status) not in (OrderStatus.PENDING, OrderStatus.PARTIALLY_FILLED):
+            return False
+        self._close(order, OrderStatus.CANCELED)
+        order_type = OrderType(order.type)
+        if order_type not in (OrderType.MARKET, OrderType.IOC, OrderType.FOK):
+            key = (order.symbol, self._trigger_direction(order_type, OrderSide(order.side)))
+            self._stale[key] = self._stale.get(key, 0) + 1
+            heap = self._heaps[key]
+            if 2 * self._stale[key] > len(heap):
+                heap[:] = [entry for entry in heap if self._is_open(self.book.orders[entry[2]])]
+                heapq.heapify(heap)
+                self._stale[key] = 0
+        return True
+
+    def open_orders(self, symbol: str = None) -> List[Order]:
+        """当前仍在挂单中的订单（按提交顺序）"""
+        if symbol is not None:
+            return list(self._active.get(symbol, {}).values())
+        return [order for orders in self._active.values() for order in orders.values()]
+
+    @staticmethod
+    def _is_open(order: Order) -> bool:
+        return OrderStatus(order.status) in (OrderStatus.PENDING, OrderStatus.PARTIALLY_FILLED)
+
+    def _close(self, order: Order, status: OrderStatus, timestamp: Optional[int] = None):
+        """订单进入终态（成交/撤销/过期），移出未完成订单索引"""
+        order.status = status
+        if timestamp is not None:
+            order.updated_at = timestamp
+        self._active.get(order.symbol, {}).pop(order.client_order_id, None)
+
+    # ----------- 撮合 -----------
+    def process_bar(
+        self,
+        symbol: str,
+        timestamp: int,
+        open_: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = np.inf
+    ) -> List[Dict]:
+        """
+        用一根K线撮合该币种的订单
+        :param timestamp: 毫秒时间戳（写入成交记录和订单更新时间）
+        :return: 本K线产生的成交列表
+        """
+        fills = []
+        liquidity = [volume * self.max_volume_pct if self.max_volume_pct is not None else np.inf]
+
+        # 1. 市价/IOC/FOK：按开盘价撮合（市价单流动性不足时剩余部分顺延到下一根K线）
+        carry = []
+        for client_order_id in self._immediate.pop(symbol, []):
+            order = self.book.orders[client_order_id]
+            if OrderStatus(order.status) == OrderStatus.CANCELED:
+                continue
+            fill = self._match_immediate(order, timestamp, open_, liquidity)
+            if fill:
+                fills.append(fill)
+            if self._is_open(order):
+                carry.append(client_order_id)
+        if carry:
+            self._immediate[symbol] = carry
+
+        # 2. 挂单：只弹出触发价落在 [low, high] 内的订单
+        for direction in (FALLING, RISING):
+            heap = self._heaps.get((symbol, direction))
+            deferred = []
+            while heap:
+                key, seq, client_order_id = heap[0]
+                trigger = key if direction == RISING else -key
+                if (direction == RISING and trigger > high) or (direction == FALLING and trigger < low):
+                    break
+                heapq.heappop(heap)
+                order = self.book.orders[client_order_id]
+                if not self._is_open(order):
+                    if OrderStatus(order.status) == OrderStatus.CANCELED:
+                        self._stale[(symbol, direction)] -= 1
+                    continue  # 已撤销/已成交
+                fill = self._fill(order, timestamp, self._trigger_price(order, open_), liquidity)
+                if fill:
+                    fills.append(fill)
+                if order.remaining > 0:
+                    deferred.append((key, seq, client_order_id))  # 流动性不足，下一根K线继续
+                if liquidity[0] <= 0:
+                    break
+            for entry in deferred:
+                heapq.heappush(heap, entry)
+        return fills
+
+    def process_ticks(
+        self,
+        symbol: str,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        sizes: np.ndarray
+    ) -> List[Dict]:
+        """逐笔成交撮合：每笔成交视为 open=high=low=close 的单价K线"""
+        fills = []
+        for ts, price, size in zip(timestamps, prices, sizes):
+            fills.extend(self.process_bar(symbol, int(ts), price, price, price, price, size))
+        return fills
+
+    def _match_immediate(
+        self,
+        order: Order,
+        timestamp: int,
+        open_: float,
+        liquidity: List[float]
+    ) -> Optional[Dict]:
+        """市价单按开盘价全部成交；IOC/FOK 限价单按开盘价判断是否可成交，未成交部分立即取消"""
+        order_type = OrderType(order.type)
+        if order_type == OrderType.MARKET:
+            return self._fill(order, timestamp, open_, liquidity, taker=True)
+
+        marketable = order.price is None or (
+            open_ <= order.price if OrderSide(order.side) == OrderSide.BUY else open_ >= order.price
+        )
+        if order_type == OrderType.FOK and (not marketable or order.remaining > liquidity[0]):
+            self._close(order, OrderStatus.EXPIRED, timestamp)
+            return None
+        fill = self._fill(order, timestamp, open_, liquidity, taker=True) if marketable else None
+        if order.remaining > 0:
+            # IOC 未成交部分立即取消（已成交数量保留在 filled 中）
+            self._close(order, OrderStatus.CANCELED, timestamp)
+        return fill
+
+    def _fill(
+        self,
+        order: Order,
+        timestamp: int,
+        price: float,
+        liquidity: List[float],
+        taker: Optional[bool] = None
+    ) -> Optional[Dict]:
+        """按可用流动性成交并更新订单状态"""
+        amount = min(order.remaining, liquidity[0])
+        if amount <= 0:
+            return None
+        liquidity[0] -= amount
+        if taker is None:
+            taker = OrderType(order.type) == OrderType.STOP
+        fee = amount * price * (self.taker_fee if taker else self.maker_fee)
+
+        order.filled += amount
+        order.remaining -= amount
+        order.cost += amount * price
+        order.fee = {'currency': order.symbol.split('/')[1], 'cost': (order.fee or {}).get('cost', 0.0) + fee}
+        if order.remaining <= 1e-12:
+            self._close(order, OrderStatus.FILLED)
+        else:
+            order.status = OrderStatus.PARTIALLY_FILLED
+        order.updated_at = timestamp
+        return {
+            'time': timestamp,
+            'symbol': order.symbol,
+            'client_order_id': order.client_order_id,
+            'action': 'buy' if OrderSide(order.side) == OrderSide.BUY else 'sell',
+            'price': price,
+            'amount': amount,
+            'commission': fee
+        }
+
+    @staticmethod
+    def _trigger_direction(order_type: OrderType, side: OrderSide) -> str:
+        """
+        挂单触发方向：
+        - 买入限价/买入止盈、卖出止损：价格下穿触发
+        - 卖出限价/卖出止盈、买入止损：价格上穿触发
+        """
+        buy = side == OrderSide.BUY
+        if order_type == OrderType.STOP:
+            return RISING if buy else FALLING
+        return FALLING if buy else RISING
+
+    @staticmethod
+    def _trigger_price(order: Order, open_: float) -> float:
+        """
+        触发后的成交价：限价/止盈按限价或更优的开盘价成交，止损跳空时按开盘价（更差）成交
+        """
+        buy = OrderSide(order.side) == OrderSide.BUY
+        if OrderType(order.type) == OrderType.STOP:
+            return max(open_, order.price) if buy else min(open_, order.price)
+        return min(open_, order.price) if buy else max(open_, order.price)
@@ -0,0 +1,201 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 价格异常波动阈值（单根K线收盘价涨跌幅，与 validate_data_quality 一致）
+SPIKE_THRESHOLD = 0.1
+# 异常成交量阈值（超过均值的标准差倍数，与 validate_data_quality 一致）
+VOLUME_SIGMAS = 3
+
+
+def summarize_bars(df: pd.DataFrame, delta_ms: int) -> Dict:
+    """
+    一段连续存储的K线（一个月份分区）的质量摘要
+    :param delta_ms: K线周期（毫秒）
+    :return: {
+        'rows', 'first', 'last': 行数和首尾K线时间（毫秒），
+        'first_close', 'last_close': 首尾收盘价（用于跨分区判断缺口和价格异常），
+        'gaps': 分区内缺失的K线区间 [[start_ms, end_ms), ...]，
+        'nan_cells', 'nan_bars': 缺失值个数和含缺失值的K线时间，
+        'spikes': 涨跌幅超过 SPIKE_THRESHOLD 的K线时间，
+        'volume': [非空个数, 均值, 离差平方和, 最大值]
+    }
+    """
+    stamps = df.index.asi8 // 10 ** 6
+    if not len(stamps):
+        return {'rows': 0}
+    diffs = np.diff(stamps)
+    holes = np.flatnonzero(diffs > delta_ms)
+    null = df.isnull()
+    close = df['close'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.abs(close[1:] / close[:-1] - 1)
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    volume = volume[~np.isnan(volume)]
+    mean = float(volume.mean()) if len(volume) else 0.0
+    return {
+        'rows': len(stamps),
+        'first': int(stamps[0]),
+        'last': int(stamps[-1]),
+        'first_close': float(close[0]),
+        'last_close': float(close[-1]),
+        'gaps': [[int(stamps[k] + delta_ms), int(stamps[k + 1])] for k in holes],
+        'nan_cells': int(null.values.sum()),
+        'nan_bars': stamps[null.any(axis=1).to_numpy()].tolist(),
+        'spikes': stamps[1:][returns > SPIKE_THRESHOLD].tolist(),
+        'volume': [len(volume), mean, float(((volume - mean) ** 2).sum()), float(volume.max()) if len(volume) else 0.0]
+    }
+
+
+def combine_moments(parts: List[List[float]]) -> Tuple[int, float, float]:
+    """合并各分区的 (个数, 均值, 离差平方和)（并行方差公式），返回整体的 (个数, 均值, 样本标准差)"""
+    n, mean, m2 = 0, 0.0, 0.0
+    for count, part_mean, part_m2 in parts:
+        if not count:
+            continue
+        total = n + count
+        delta = part_mean - mean
+        mean += delta * count / total
+        m2 += part_m2 + delta ** 2 * n * count / total
+        n = total
+    std = float(np.sqrt(m2 / (n - 1))) if n > 1 else float('nan')
+    return n, mean, std
+
+
+class QualityIndex:
+    """
+    K线序列的数据质量索引（每个序列一个 JSON 文件）
+    功能：
+    - 每个月份分区一条摘要（缺口、缺失值、价格异常、成交量统计），写入分区时同步更新
+    - 质量报告由各分区摘要合并得到，只有最大成交量超过整体阈值的分区需要读取成交量列
+    - 缺口区间可直接用于局部补齐（fill_missing_data(gaps=...)）
+    """
+
+    def __init__(self, path: str, delta_ms: int):
+        """
+        :param path: 索引文件路径
+        :param delta_ms: K线周期（毫秒）
+        """
+        self.path  = path
+        self.delta_ms  = delta_ms
+        self.months  = {}  # {'YYYY-MM': 摘要}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.months = json.load(f)
+
+    def update(self, month: str, df: pd.DataFrame):
+        """月份分区重写后更新其摘要"""
+        self.months[month] = summarize_bars(df, self.delta_ms)
+
+    def remove(self, month: str):
+        """月份分区删除后移除其摘要"""
+        self.months.pop(month, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.tmp", 'w') as f:
+            json.dump(self.months, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def entries(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[Dict]:
+        """与 [start_ms, end_ms] 重叠的分区摘要（按时间升序，跳过空分区）"""
+        return [
+            entry for _, entry in sorted(self.months.items())
+            if entry['rows'] and (start_ms is None or entry['last'] >= start_ms) and (end_ms is None or entry['first'] <= end_ms)
+        ]
+
+    def gaps(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[List[int]]:
+        """[start_ms, end_ms] 内缺失的K线区间（含跨分区的缺口）"""
+        return _clip(_combine(self.entries(start_ms, end_ms), self.delta_ms)[0], start_ms, end_ms)
+
+    def report(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        read: Optional[Callable[..., pd.DataFrame]] = None
+    ) -> Dict:
+        """
+        [start_ms, end_ms] 内的质量报告（格式与 validate_data_quality 相同，另附明细）
+        :param read: read(first_ms, last_ms, columns) → 该时间段的K线，用于重新统计被截断的首尾分区和定位异常成交量
+        :return: {
+            'is_valid': bool,
+            'issues': {'missing_rows', 'abnormal_volume', 'price_spikes', 'missing_bars'}（只含非零项），
+            'gaps': [[start_ms, end_ms), ...],
+            'nan_bars' / 'spikes' / 'abnormal_volume': K线时间列表,
+            'stats': {'rows', 'first', 'last', 'volume_mean', 'volume_std'}
+        }
+        """
+        entries = self.entries(start_ms, end_ms)
+        if read is not None and entries:
+            # 范围截断的首尾分区按实际读取的数据重新统计
+            for k in {0, len(entries) - 1}:
+                entry = entries[k]
+                if (start_ms is not None and entry['first'] < start_ms) or (end_ms is not None and entry['last'] > end_ms):
+                    lo = max(entry['first'], start_ms) if start_ms is not None else entry['first']
+                    hi = min(entry['last'], end_ms) if end_ms is not None else entry['last']
+                    entries[k] = summarize_bars(read(lo, hi, None), self.delta_ms)
+            entries = [entry for entry in entries if entry['rows']]
+
+        gaps, spikes = _combine(entries, self.delta_ms)
+        gaps, spikes = _clip(gaps, start_ms, end_ms), [t for t in spikes if _inside(t, start_ms, end_ms)]
+        nan_bars = [t for entry in entries for t in entry['nan_bars'] if _inside(t, start_ms, end_ms)]
+        n, mean, std = combine_moments([entry['volume'][:3] for entry in entries])
+
+        abnormal = []
+        if read is not None and np.isfinite(std):
+            threshold = mean + VOLUME_SIGMAS * std
+            for entry in entries:
+                if entry['volume'][3] > threshold:  # 只读取可能含异常成交量的分区
+                    volume = read(entry['first'], entry['last'], ['volume'])['volume']
+                    abnormal.extend((volume.index[volume > threshold].asi8 // 10 ** 6).tolist())
+
+        issues = {
+            'missing_rows': sum(entry['nan_cells'] for entry in entries),
+            'abnormal_volume': len(abnormal),
+            'price_spikes': len(spikes),
+            'missing_bars': sum(-(-(b - a) // self.delta_ms) for a, b in gaps)
+        }
+        return {
+            'is_valid': issues['missing_rows'] == 0,
+            'issues': {name: count for name, count in issues.items() if count},
+            'gaps': gaps,
+            'nan_bars': nan_bars,
+            'spikes': spikes,
+            'abnormal_volume': abnormal,
+            'stats': {
+                'rows': sum(entry['rows'] for entry in entries),
+                'first': entries[0]['first'] if entries else None,
+                'last': entries[-1]['last'] if entries else None,
+                'volume_mean': mean if n else None,
+                'volume_std': std if n > 1 else None
+            }
+        }
+
+
+def _combine(entries: List[Dict], delta_ms: int) -> Tuple[List[List[int]], List[int]]:
+    """合并相邻分区摘要：补上跨分区的缺口和价格异常"""
+    gaps, spikes = [], []
+    prev = None
+    for entry in entries:
+        if prev is not None:
+            if entry['first'] - prev['last'] > delta_ms:
+                gaps.append([prev['last'] + delta_ms, entry['first']])
+            if abs(entry['first_close'] / prev['last_close'] - 1) > SPIKE_THRESHOLD:
+                spikes.append(entry['first'])
+        gaps.extend(entry['gaps'])
+        spikes.extend(entry['spikes'])
+        prev = entry
+    return gaps, spikes
+
+
+def _inside(t: int, start_ms: Optional[int], end_ms: Optional[int]) -> bool:
+    return (start_ms is None or t >= start_ms) and (end_ms is None or t <= end_ms)
+
+
+def _clip(gaps: List[List[int]], start_ms: Optional[int], end_ms: Optional[int]) -> List[List[int]]:
+    """缺口区间截取到 [start_ms, end_ms]"""
+    lo = -np.inf if start_ms is None else start_ms
+    hi = np.inf if end_ms is None else end_ms + 1
+    return [[int(max(a, lo)), int(min(b, hi))] for a, b in gaps if a < hi and b > lo]
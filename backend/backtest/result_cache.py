@@ -0,0 +1,137 @@
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..utils.logger  import logger
+
+
+def _to_json(value: Any) -> Any:
+    """json.dumps 的 default：numpy 标量/数组转为 Python 类型，其余类型视为不可序列化"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"不可序列化的类型: {type(value).__name__}")
+
+
+def describe_object(obj: Any, attrs: Optional[tuple] = None) -> Optional[Dict]:
+    """
+    对象的类名和参数（用于结果缓存键）
+    :param attrs: 参与描述的属性名（None 表示全部公有属性，跳过连接器等不可序列化的属性）
+    :return: {'class': 模块.类名, 'params': {属性: 值}}，obj 为 None 时返回 None
+    """
+    if obj is None:
+        return None
+    names = attrs if attrs is not None else [name for name in vars(obj) if not name.startswith('_')]
+    params = {}
+    for name in sorted(names):
+        if not hasattr(obj, name):
+            continue
+        value = getattr(obj, name)
+        try:
+            params[name] = json.loads(json.dumps(value, default=_to_json))
+        except (TypeError, ValueError):
+            continue
+    return {'class': f"{type(obj).__module__}.{type(obj).__qualname__}", 'params': params}
+
+
+class ResultCache:
+    """
+    回测结果缓存（内容寻址）
+    功能：
+    - 以回测全部输入（行情哈希、策略类和参数、手续费、滑点、随机种子、引擎版本等）的哈希为键
+    - 每个结果一个 pickle 文件，进程重启后仍可复用
+    - 总大小超过上限时按最近最少使用（LRU）顺序淘汰
+    """
+
+    def __init__(self, cache_dir: str = "data/backtest_cache", max_bytes: int = 512 * 1024 ** 2):
+        """
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存文件总大小上限（字节）
+        """
+        self.cache_dir  = cache_dir
+        self.max_bytes  = max_bytes
+        self.hits  = 0
+        self.misses  = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        # {key: 文件大小}，按访问时间从旧到新排列（启动时以文件修改时间恢复顺序）
+        entries = []
+        for file in os.listdir(cache_dir):
+            if file.endswith('.pkl'):
+                stat = os.stat(os.path.join(cache_dir, file))
+                entries.append((stat.st_mtime_ns, file[:-4], stat.st_size))
+        self._index  = OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    @staticmethod
+    def make_key(inputs: Dict) -> str:
+        """回测输入 → 缓存键（规范化 JSON 的 SHA-256）"""
+        payload = json.dumps(inputs, sort_keys=True, default=_to_json)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def total_bytes(self) -> int:
+        """当前缓存文件总大小"""
+        return sum(self._index.values())
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存结果（未命中或文件损坏返回 None），命中时标记为最近使用"""
+        if key not in self._index:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f" 回测结果缓存读取失败，已丢弃: {path} | {e}")
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._index.move_to_end(key)
+        os.utime(path)  # 持久化访问顺序
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """保存结果（先写临时文件再原子替换），随后按 LRU 淘汰超出上限的旧结果"""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._index[key] = os.path.getsize(path)
+        self._index.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的结果，直到总大小不超过上限（至少保留最新的一个）"""
+        total = self.total_bytes
+        while total > self.max_bytes and len(self._index) > 1:
+            key, size = next(iter(self._index.items()))
+            self._remove(key)
+            total -= size
+            logger.debug(f" 淘汰回测结果缓存: {key}")
+
+    def _remove(self, key: str):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """清空全部缓存结果"""
+        for key in list(self._index):
+            self._remove(key)
@@ -0,0 +1,94 @@
+import os
+import glob
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import Dict, Iterator, List
+
+
+def iter_parquet_frames(path: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+    """
+    按行组分批读取K线 parquet 文件（与 HistoricalDataManager 写入格式一致，索引为 timestamp）
+    :param path: 单个 parquet 文件，或按月分区的序列目录（按月份顺序依次读取各分区）
+    :param chunk_rows: 每批最多读取的行数
+    """
+    files = sorted(glob.glob(os.path.join(path, 'month=*', '*.parquet'))) if os.path.isdir(path) else [path]
+    for file in files:
+        parquet = pq.ParquetFile(file)
+        for batch in parquet.iter_batches(batch_size=chunk_rows):
+            df = batch.to_pandas()
+            if not isinstance(df.index, pd.DatetimeIndex):
+                df = df.set_index(pd.to_datetime(df.pop('timestamp')))
+            yield df
+
+
+class ParquetChunkFeed:
+    """
+    多币种 parquet 行情分块读取器
+    功能：
+    - 各币种文件按批流式读取，内存中每个币种最多保留两批数据
+    - 多路归并为按时间排序的分块：每块只包含所有币种都已读到的时间范围，保证块间时间严格递增
+    """
+
+    def __init__(self, sources: Dict[str, str], chunk_rows: int = 100000):
+        """
+        :param sources: {symbol: parquet文件路径或分区目录}
+        :param chunk_rows: 每个币种每次读取的行数（决定峰值内存）
+        """
+        self.sources  = dict(sources)
+        self.chunk_rows  = chunk_rows
+
+    @classmethod
+    def from_manager(
+        cls,
+        manager,
+        symbols: List[str],
+        exchange: str = "binance",
+        timeframe: str = "1h",
+        chunk_rows: int = 100000
+    ) -> 'ParquetChunkFeed':
+        """读取 HistoricalDataManager 已缓存到本地的分区数据"""
+        sources = {sym: manager.series_dir(sym, exchange, timeframe) for sym in symbols}
+        missing = [sym for sym, path in sources.items() if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"本地无缓存数据: {missing}")
+        return cls(sources, chunk_rows)
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.sources)
+
+    def __iter__(self) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        :return: 逐块产出 {symbol: DataFrame}，同一块内各币种时间范围一致（可能为空）
+        """
+        readers = {sym: iter_parquet_frames(path, self.chunk_rows) for sym, path in self.sources.items()}
+        buffers = {sym: None for sym in self.sources}
+
+        while True:
+            # 补齐已读完缓冲区的币种
+            for sym in list(readers):
+                while buffers[sym] is None or len(buffers[sym]) == 0:
+                    frame = next(readers[sym], None)
+                    if frame is None:
+                        del readers[sym]
+                        break
+                    buffers[sym] = frame if buffers[sym] is None else pd.concat([buffers[sym], frame])
+            pending = {sym: df for sym, df in buffers.items() if df is not None and len(df)}
+            if not pending:
+                return
+
+            # 水位线：仍有后续数据的币种中最早的缓冲区末尾时间，之前的K线已全部读到
+            active = [pending[sym].index[-1] for sym in readers if sym in pending]
+            watermark = min(active) if active else max(df.index[-1] for df in pending.values())
+
+            chunk = {}
+            for sym, df in buffers.items():
+                if df is None:
+                    chunk[sym] = pd.DataFrame(
+                        columns=['open', 'high', 'low', 'close', 'volume'],
+                        index=pd.DatetimeIndex([], name='timestamp')
+                    )
+                    continue
+                cut = df.index.searchsorted(watermark, side='right')
+                chunk[sym], buffers[sym] = df.iloc[:cut], df.iloc[cut:]
+            yield chunk
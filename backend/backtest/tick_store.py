@@ -0,0 +1,276 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, Iterator, List, Optional, Sequence
+from ..utils.logger  import logger
+
+DAY_MS = 86400 * 1000
+
+# 读取结果的列类型（side: 1=主动买入, -1=主动卖出）
+TICK_SCHEMA = {
+    'time': np.int64,
+    'id': np.int64,
+    'price': np.float64,
+    'size': np.float32,
+    'side': np.int8
+}
+
+# 磁盘列类型：time/id/price 按行组差分编码（行组首行为相对当日零点/0 的绝对值），price 为定点整数，side 为位压缩布尔值
+FILE_SCHEMA = pa.schema([
+    ('time', pa.int64()),
+    ('id', pa.int64()),
+    ('price', pa.int64()),
+    ('size', pa.float32()),
+    ('buy', pa.bool_())
+])
+METADATA_KEY = b'tick_store'
+
+
+def delta_encode(values: np.ndarray, starts: np.ndarray, base: int = 0) -> np.ndarray:
+    """差分编码：每个行组的首行保存 values - base，其余保存与前一行的差"""
+    encoded = np.diff(values, prepend=base)
+    encoded[starts] = values[starts] - base
+    return encoded
+
+
+def delta_decode(encoded: np.ndarray, base: int = 0) -> np.ndarray:
+    """还原单个行组的差分编码"""
+    return np.cumsum(encoded, dtype=np.int64) + base
+
+
+def trades_to_arrays(trades: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    ccxt 统一格式成交列表 → 列数组
+    :param trades: fetch_trades 返回的 [{'timestamp', 'id', 'price', 'amount', 'side'}, ...]
+    :return: {'time', 'id', 'price', 'size', 'side'}
+    """
+    return {
+        'time': np.fromiter((t['timestamp'] for t in trades), np.int64, len(trades)),
+        'id': np.fromiter((int(t['id']) if t.get('id') is not None else -1 for t in trades), np.int64, len(trades)),
+        'price': np.fromiter((t['price'] for t in trades), np.float64, len(trades)),
+        'size': np.fromiter((t['amount'] for t in trades), np.float32, len(trades)),
+        'side': np.fromiter((1 if t['side'] == 'buy' else -1 for t in trades), np.int8, len(trades))
+    }
+
+
+class TickStore:
+    """
+    逐笔成交（aggTrades）列式存储
+    功能：
+    - 每个币种每天一个 zstd 压缩的 parquet 文件（{root}/{exchange}/{SYMBOL}/{YYYY-MM-DD}.parquet）
+    - 毫秒时间戳和成交编号差分编码，价格为定点整数（差分编码），数量为 float32，方向为 1 位布尔值
+    - 文件元数据记录每个行组的时间范围，按时间读取时只解码重叠的行组
+    - 重复写入同一天的数据按成交编号去重合并
+    """
+
+    def __init__(self, root: str = "data/historical/ticks", price_decimals: int = 8, row_group_size: int = 1 << 20):
+        """
+        :param root: 存储根目录
+        :param price_decimals: 价格定点小数位数（价格 × 10^price_decimals 存为 int64）
+        :param row_group_size: 每个行组的成交笔数（按时间读取的最小解码单位）
+        """
+        self.root  = root
+        self.price_decimals  = price_decimals
+        self.row_group_size  = row_group_size
+
+    def symbol_dir(self, symbol: str, exchange: str = "binance") -> str:
+        """币种目录（交易对中的 / 去掉，如 BTC/USDT → BTCUSDT）"""
+        return os.path.join(self.root, exchange, symbol.replace('/', ''))
+
+    def day_path(self, symbol: str, exchange: str, day: pd.Timestamp) -> str:
+        return os.path.join(self.symbol_dir(symbol, exchange), f"{day.strftime('%Y-%m-%d')}.parquet")
+
+    def days(self, symbol: str, exchange: str = "binance") -> List[pd.Timestamp]:
+        """已存储的日期（升序）"""
+        root = self.symbol_dir(symbol, exchange)
+        if not os.path.isdir(root):
+            return []
+        return sorted(pd.Timestamp(file[:-len('.parquet')]) for file in os.listdir(root) if file.endswith('.parquet'))
+
+    # ----------- 写入 -----------
+    def write(
+        self,
+        symbol: str,
+        time: np.ndarray,
+        price: np.ndarray,
+        size: np.ndarray,
+        side: np.ndarray,
+        id: Optional[np.ndarray] = None,
+        exchange: str = "binance"
+    ) -> int:
+        """
+        写入逐笔成交（按 UTC 日期拆分，与已有数据合并）
+        :param time: 毫秒时间戳
+        :param side: 1=主动买入, -1=主动卖出
+        :param id: 成交编号（用于合并去重，缺省时按 时间/价格/数量/方向 完全相同去重）
+        :return: 写入的成交笔数
+        """
+        time = np.asarray(time, dtype=np.int64)
+        columns = {
+            'time': time,
+            'id': np.full(len(time), -1, dtype=np.int64) if id is None else np.asarray(id, dtype=np.int64),
+            'price': np.asarray(price, dtype=np.float64),
+            'size': np.asarray(size, dtype=np.float32),
+            'side': np.asarray(side, dtype=np.int8)
+        }
+        if not len(time):
+            return 0
+        day_ids = time // DAY_MS
+        order = np.argsort(day_ids, kind='stable')
+        bounds = np.flatnonzero(np.diff(day_ids[order])) + 1
+        for idx in np.split(order, bounds):
+            day = pd.Timestamp(int(day_ids[idx[0]]) * DAY_MS, unit='ms')
+            part = {name: values[idx] for name, values in columns.items()}
+            path = self.day_path(symbol, exchange, day)
+            if os.path.exists(path):
+                existing = self._read_file(path)
+                part = {name: np.concatenate([existing[name], part[name]]) for name in TICK_SCHEMA}
+            self._write_day(path, day, self._dedupe(part))
+        logger.debug(f" 写入逐笔成交: {exchange} {symbol} {len(time)} 笔")
+        return len(time)
+
+    def write_trades(self, symbol: str, trades: List[Dict], exchange: str = "binance") -> int:
+        """写入 ccxt fetch_trades 的返回结果"""
+        return self.write(symbol, exchange=exchange, **trades_to_arrays(trades))
+
+    @staticmethod
+    def _dedupe(part: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """按时间排序并去重（保留后写入的成交）"""
+        frame = pd.DataFrame(part)
+        keys = ['id'] if (frame['id'] >= 0).all() else list(TICK_SCHEMA)
+        frame = frame.drop_duplicates(keys, keep='last').sort_values(['time', 'id'], kind='stable')
+        return {name: frame[name].to_numpy(dtype=dtype) for name, dtype in TICK_SCHEMA.items()}
+
+    def _write_day(self, path: str, day: pd.Timestamp, part: Dict[str, np.ndarray]):
+        """编码并写入单日文件（先写临时文件再原子替换）"""
+        n = len(part['time'])
+        starts = np.arange(0, n, self.row_group_size)
+        day_ms = int(day.value // 10 ** 6)
+        scale = 10 ** self.price_decimals
+        ticks = np.rint(part['price'] * scale).astype(np.int64)
+        table = pa.table({
+            'time': delta_encode(part['time'], starts, day_ms),
+            'id': delta_encode(part['id'], starts),
+            'price': delta_encode(ticks, starts),
+            'size': part['size'],
+            'buy': part['side'] > 0
+        }, schema=FILE_SCHEMA)
+        meta = {
+            'day_ms': day_ms,
+            'price_decimals': self.price_decimals,
+            'row_groups': [[int(part['time'][s]), int(part['time'][min(s + self.row_group_size, n) - 1])] for s in starts]
+        }
+        table = table.replace_schema_metadata({METADATA_KEY: json.dumps(meta).encode()})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(
+            table, f"{path}.tmp", row_group_size=self.row_group_size, compression='zstd',
+            use_dictionary=False, write_statistics=False
+        )
+        os.replace(f"{path}.tmp", path)
+
+    # ----------- 读取 -----------
+    def read(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        读取 [start, end] 内的逐笔成交
+        :param columns: 只读取的列（time 总是返回）
+        :return: {列名: numpy 数组}，列类型见 TICK_SCHEMA
+        """
+        names = self._columns(columns)
+        chunks = list(self.iter_days(symbol, exchange, start, end, names))
+        if not chunks:
+            return {name: np.empty(0, dtype=TICK_SCHEMA[name]) for name in names}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in names}
+
+    def read_frame(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """读取为以 timestamp 为索引的 DataFrame"""
+        data = self.read(symbol, exchange, start, end, columns)
+        index = pd.DatetimeIndex(pd.to_datetime(data.pop('time'), unit='ms'), name='timestamp')
+        return pd.DataFrame(data, index=index)
+
+    def iter_days(
+        self,
+        symbol: str,
+        exchange: str = "binance",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """逐日读取 [start, end] 内的逐笔成交（内存占用不超过单日数据量）"""
+        names = self._columns(columns)
+        lo = None if start is None else int(pd.Timestamp(start).value // 10 ** 6)
+        hi = None if end is None else int(pd.Timestamp(end).value // 10 ** 6)
+        for day in self.days(symbol, exchange):
+            day_ms = int(day.value // 10 ** 6)
+            if (lo is not None and day_ms + DAY_MS <= lo) or (hi is not None and day_ms > hi):
+                continue
+            chunk = self._read_file(self.day_path(symbol, exchange, day), lo, hi, names)
+            if len(chunk['time']):
+                yield chunk
+
+    @staticmethod
+    def _columns(columns: Optional[Sequence[str]]) -> List[str]:
+        if columns is None:
+            return list(TICK_SCHEMA)
+        unknown = set(columns) - set(TICK_SCHEMA)
+        if unknown:
+            raise ValueError(f"未知的列: {sorted(unknown)}")
+        return ['time'] + [name for name in columns if name != 'time']
+
+    def _read_file(
+        self,
+        path: str,
+        lo: Optional[int] = None,
+        hi: Optional[int] = None,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """解码单日文件中与 [lo, hi] 重叠的行组"""
+        columns = columns or list(TICK_SCHEMA)
+        file = pq.ParquetFile(path)
+        meta = json.loads(file.schema_arrow.metadata[METADATA_KEY])
+        groups = [
+            k for k, (first, last) in enumerate(meta['row_groups'])
+            if (lo is None or last >= lo) and (hi is None or first <= hi)
+        ]
+        stored = ['buy' if name == 'side' else name for name in columns]
+        out = {name: [] for name in columns}
+        for k in groups:
+            table = file.read_row_group(k, columns=stored)
+            for name, field in zip(columns, stored):
+                values = table.column(field).to_numpy()
+                if name == 'time':
+                    values = delta_decode(values, meta['day_ms'])
+                elif name == 'id':
+                    values = delta_decode(values)
+                elif name == 'price':
+                    values = delta_decode(values) / 10 ** meta['price_decimals']
+                elif name == 'side':
+                    values = np.where(values, 1, -1).astype(np.int8)
+                out[name].append(values)
+
+        data = {
+            name: np.concatenate(parts).astype(TICK_SCHEMA[name], copy=False) if parts else np.empty(0, TICK_SCHEMA[name])
+            for name, parts in out.items()
+        }
+        times = data['time']
+        a = 0 if lo is None else np.searchsorted(times, lo, side='left')
+        b = len(times) if hi is None else np.searchsorted(times, hi, side='right')
+        if a > 0 or b < len(times):
+            data = {name: values[a:b] for name, values in data.items()}
+        return data
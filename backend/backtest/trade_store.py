@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional
+
+# 成交记录列类型（side: 1=买入, -1=卖出；pnl: 本笔成交结算的上一段持仓盈亏）
+TRADE_SCHEMA = {
+    'time': np.int64,
+    'symbol': np.int32,
+    'side': np.int8,
+    'price': np.float64,
+    'amount': np.float64,
+    'fee': np.float64,
+    'pnl': np.float64
+}
+
+# 资金曲线列类型
+EQUITY_SCHEMA = {
+    'time': np.int64,
+    'equity': np.float64
+}
+
+
+class ColumnBuffer:
+    """
+    列式结果缓冲区
+    每列一个预分配的定长类型数组，写满时容量翻倍（均摊 O(1) 追加），读取时返回已写入部分的视图
+    """
+
+    def __init__(self, schema: Dict[str, type], capacity: int = 1024):
+        """
+        :param schema: {列名: numpy 类型}
+        :param capacity: 初始容量（行数）
+        """
+        self.schema  = dict(schema)
+        self.size  = 0
+        self._data  = {name: np.empty(max(capacity, 1), dtype=dtype) for name, dtype in self.schema.items()}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(self, n: int):
+        """保证至少还能写入 n 行"""
+        capacity = len(next(iter(self._data.values())))
+        if self.size + n <= capacity:
+            return
+        while capacity < self.size + n:
+            capacity *= 2
+        for name, values in self._data.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self._data[name] = grown
+
+    def append(self, **row):
+        """追加一行"""
+        self._reserve(1)
+        for name, values in self._data.items():
+            values[self.size] = row[name]
+        self.size += 1
+
+    def extend(self, **columns):
+        """批量追加多行（各列数组长度相同）"""
+        n = len(next(iter(columns.values())))
+        self._reserve(n)
+        for name, values in self._data.items():
+            values[self.size:self.size + n] = columns[name]
+        self.size += n
+
+    def column(self, name: str) -> np.ndarray:
+        """已写入部分的视图（不复制，后续追加导致扩容后视图不再随缓冲区更新）"""
+        return self._data[name][:self.size]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: self.column(name) for name in self.schema}
+
+    def to_arrow(self) -> pa.Table:
+        """导出为 Arrow 表（数值列直接引用缓冲区内存，不复制）"""
+        return pa.table({name: pa.array(values) for name, values in self.columns().items()})
+
+    def to_parquet(self, path: str, **kwargs):
+        """导出为 parquet 文件"""
+        pq.write_table(self.to_arrow(), path, **kwargs)
+
+    def __getstate__(self) -> Dict:
+        # 序列化时只保存已写入部分
+        state = dict(self.__dict__)
+        state['_data'] = {name: values[:max(self.size, 1)].copy() for name, values in self._data.items()}
+        return state
+
+
+class TradeStore(ColumnBuffer):
+    """
+    列式成交记录（替代 {symbol: [trade_dict, ...]}）
+    功能：
+    - int64 毫秒时间、int32 币种编号、int8 方向、float64 价格/数量/手续费/盈亏
+    - 导出 Arrow / parquet / DataFrame 供前端报告和离线分析
+    - 兼容按币种读取交易字典列表：store[symbol]、store.items()
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, capacity: int = 1024):
+        super().__init__(TRADE_SCHEMA, capacity)
+        self.symbols  = []
+        self.symbol_index  = {}
+        for symbol in symbols or []:
+            self.symbol_id(symbol)
+
+    def symbol_id(self, symbol: str) -> int:
+        """币种编号（首次出现时登记）"""
+        sid = self.symbol_index.get(symbol)
+        if sid is None:
+            sid = self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return sid
+
+    def record(self, symbol: str, time: int, side: int, price: float, amount: float, fee: float, pnl: float = 0.0):
+        """
+        记录一笔成交
+        :param time: 毫秒时间戳
+        :param side: 1=买入, -1=卖出
+        """
+        self.append(
+            time=time, symbol=self.symbol_id(symbol), side=side,
+            price=price, amount=amount, fee=fee, pnl=pnl
+        )
+
+    def to_arrow(self) -> pa.Table:
+        """导出为 Arrow 表：时间列为毫秒时间戳，币种列为字典编码"""
+        cols = self.columns()
+        return pa.table({
+            'time': pa.array(cols['time']).view(pa.timestamp('ms')),
+            'symbol': pa.DictionaryArray.from_arrays(pa.array(cols['symbol']), pa.array(self.symbols, pa.string())),
+            **{name: pa.array(cols[name]) for name in ('side', 'price', 'amount', 'fee', 'pnl')}
+        })
+
+    def to_frame(self) -> pd.DataFrame:
+        """导出为 DataFrame（时间列为 Timestamp，币种列为分类类型）"""
+        return self.to_arrow().to_pandas()
+
+    # ----------- 按币种读取（兼容交易字典列表格式） -----------
+    def __getitem__(self, symbol: str) -> List[Dict]:
+        """
+        :return: [{'time', 'symbol', 'action', 'price', 'amount', 'commission', 'pnl'}, ...]
+        """
+        sid = self.symbol_index.get(symbol)
+        if sid is None:
+            return []
+        cols = self.columns()
+        idx = np.flatnonzero(cols['symbol'] == sid)
+        times = pd.to_datetime(cols['time'][idx], unit='ms')
+        return [
+            {
+                'time': times[k],
+                'symbol': symbol,
+                'action': 'buy' if cols['side'][j] > 0 else 'sell',
+                'price': float(cols['price'][j]),
+                'amount': float(cols['amount'][j]),
+                'commission': float(cols['fee'][j]),
+                'pnl': float(cols['pnl'][j])
+            }
+            for k, j in enumerate(idx)
+        ]
+
+    def keys(self) -> List[str]:
+        return list(self.symbols)
+
+    def values(self) -> List[List[Dict]]:
+        return [self[symbol] for symbol in self.symbols]
+
+    def items(self) -> List:
+        return [(symbol, self[symbol]) for symbol in self.symbols]
@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict, Optional
+
+
+def next_valid_index(valid: np.ndarray) -> np.ndarray:
+    """
+    计算每根K线之后（不含当前）下一根有效K线的位置
+    :param valid: (symbols, bars) 有效K线掩码
+    :return: (symbols, bars) int64 数组，不存在时为 bars
+    """
+    n_bars = valid.shape[1]
+    idx = np.where(valid, np.arange(n_bars), n_bars)
+    # 右移一位后反向累计最小值 → 严格位于当前K线之后的第一根有效K线
+    shifted = np.full_like(idx, n_bars)
+    shifted[:, :-1] = idx[:, 1:]
+    return np.minimum.accumulate(shifted[:, ::-1], axis=1)[:, ::-1]
+
+
+def forward_fill(values: np.ndarray, valid: np.ndarray, fill_value: float = 0.0) -> np.ndarray:
+    """沿时间轴用最近一根有效值向前填充（首根有效值之前为 fill_value）"""
+    n_bars = valid.shape[1]
+    idx = np.where(valid, np.arange(n_bars), -1)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = np.take_along_axis(values, np.maximum(idx, 0), axis=1)
+    return np.where(idx >= 0, filled, fill_value)
+
+
+def run_vectorized(
+    opens: np.ndarray,
+    closes: np.ndarray,
+    valid: np.ndarray,
+    signals: np.ndarray,
+    weights: np.ndarray,
+    initial_balance: float,
+    commission: float = 0.0005,
+    slippage: float = 0.0001,
+    noise: Optional[np.ndarray] = None,
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, np.ndarray]:
+    """
+    向量化执行内核：一次性计算成交、持仓、手续费和资金曲线
+    成交规则与逐K线引擎一致：
+    - 第 i 根K线收盘产生的信号，在该币种下一根有效K线开盘价成交（无前视偏差）
+    - 成交金额 = 当前USDT余额 × 该币种权重，手续费从USDT中扣除
+    - 同一时间点内按币种顺序依次成交
+    :param opens: (symbols, bars) 开盘价
+    :param closes: (symbols, bars) 收盘价
+    :param valid: (symbols, bars) 有效K线掩码
+    :param signals: (symbols, bars) int8 信号（1=买入, -1=卖出, 0=无）
+    :param weights: (symbols, bars) 每根K线生效的资产权重
+    :param noise: 可选的滑点扰动（按成交顺序），默认由 rng 按成交顺序抽样
+    :param rng: 随机数生成器（与逐K线引擎使用同一种子时结果一致）
+    :return: {
+        'equity': 资金曲线, 'cash': USDT余额, 'positions': 各币种持仓,
+        'trade_symbol'/'trade_bar'/'trade_side'/'trade_price'/'trade_amount'/'trade_fee': 成交明细
+    }
+    """
+    n_symbols, n_bars = valid.shape
+
+    # 1. 信号 → 成交位置（下一根有效K线）
+    fill_at = next_valid_index(valid)
+    sig_sym, sig_bar = np.nonzero(signals)
+    fill_bar = fill_at[sig_sym, sig_bar]
+    keep = fill_bar < n_bars
+    sig_sym, sig_bar, fill_bar = sig_sym[keep], sig_bar[keep], fill_bar[keep]
+
+    # 按 (时间, 币种) 排序，与逐K线引擎的执行顺序一致
+    order = np.argsort(fill_bar * n_symbols + sig_sym, kind='stable')
+    t_sym, t_bar = sig_sym[order], fill_bar[order]
+    t_side = signals[sig_sym, sig_bar][order].astype(np.int8)
+    n_trades = len(t_bar)
+
+    # 2. 成交价（含滑点）
+    if noise is None:
+        noise = (rng or np.random.default_rng()).normal(0, slippage, n_trades)
+    t_price = opens[t_sym, t_bar] * (1 + noise)
+    t_weight = weights[t_sym, t_bar]
+
+    # 3. USDT余额按成交顺序乘性演化：买入 ×(1-w-wc)，卖出 ×(1+w-wc)
+    factor = 1 - t_side * t_weight - t_weight * commission
+    cash_after = initial_balance * np.cumprod(factor)
+    cash_before = np.empty(n_trades)
+    if n_trades:
+        cash_before[0] = initial_balance
+        cash_before[1:] = cash_after[:-1]
+    notional = cash_before * t_weight
+    t_amount = notional / t_price
+    t_fee = notional * commission
+
+    # 4. 持仓矩阵与逐K线USDT余额
+    deltas = np.zeros((n_symbols, n_bars))
+    np.add.at(deltas, (t_sym, t_bar), t_side * t_amount)
+    positions = np.cumsum(deltas, axis=1)
+    last_trade = np.searchsorted(t_bar, np.arange(n_bars), side='right') - 1
+    cash = np.where(
+        last_trade >= 0,
+        cash_after[np.maximum(last_trade, 0)] if n_trades else initial_balance,
+        initial_balance
+    )
+
+    # 5. 按最近有效收盘价计算资金曲线
+    marks = forward_fill(closes, valid)
+    equity = cash + (positions * marks).sum(axis=0)
+
+    return {
+        'equity': equity,
+        'cash': cash,
+        'positions': positions,
+        'trade_symbol': t_sym,
+        'trade_bar': t_bar,
+        'trade_side': t_side,
+        'trade_price': t_price,
+        'trade_amount': t_amount,
+        'trade_fee': t_fee
+    }
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from ..utils.logger  import logger
+from .backtest_engine import MultiBacktestEngine
+from .optimizer import ParameterSweep, SWEEP_METRICS, run_trials, _trial_signals, _simulate, _WORKER
+
+# 越小越好的指标（其余指标越大越好）
+MINIMIZE_METRICS = {'max_drawdown'}
+
+
+def _run_windows(task: Tuple[int, Dict]) -> Tuple[int, np.ndarray]:
+    """
+    对一组参数评估所有窗口的样本内/样本外绩效
+    信号（及其依赖的指标）在整段历史上只计算一次，各窗口直接切片复用；
+    指标只依赖当前及之前的K线，因此切片结果与窗口内重新计算一致，且自带窗口前的预热数据
+    :return: (trial_id, (windows, 2, metrics) 数组)，第二维 0=训练集 1=测试集
+    """
+    trial_id, params = task
+    signals = _trial_signals(params)
+    windows = _WORKER['settings']['windows']
+    scores = np.empty((len(windows), 2, len(SWEEP_METRICS)))
+    for w, (train_start, train_end, test_start, test_end) in enumerate(windows):
+        scores[w, 0] = _simulate(signals, train_start, train_end)
+        scores[w, 1] = _simulate(signals, test_start, test_end)
+    return trial_id, scores
+
+
+class WalkForwardOptimizer:
+    """
+    滚动前向优化
+    功能：
+    - 将历史切分为滚动的 训练/测试 窗口
+    - 每个训练窗口上选出最优参数，在随后的测试窗口做样本外评估
+    - 每组参数的信号只在整段历史上计算一次，供所有重叠窗口复用
+    - 参数组在多进程间并行，每个任务批量评估全部窗口
+    """
+
+    def __init__(
+        self,
+        sweep: ParameterSweep,
+        train_period: str = '90D',
+        test_period: str = '30D',
+        step: Optional[str] = None,
+        metric: str = 'sharpe'
+    ):
+        """
+        :param sweep: 参数扫描器（提供策略类、参数空间和回测设置）
+        :param train_period: 训练窗口长度（pandas 时间间隔字符串）
+        :param test_period: 测试窗口长度
+        :param step: 窗口滚动步长（默认等于测试窗口长度，测试窗口首尾相接）
+        :param metric: 选参指标（SWEEP_METRICS 之一）
+        """
+        if metric not in SWEEP_METRICS:
+            raise ValueError(f"不支持的选参指标: {metric}")
+        self.sweep  = sweep
+        self.train_period  = pd.Timedelta(train_period)
+        self.test_period  = pd.Timedelta(test_period)
+        self.step  = pd.Timedelta(step) if step else self.test_period
+        self.metric  = metric
+        self.scores  = None  # 最近一次运行的 (trials, windows, 2, metrics) 绩效数组
+
+    def split(self, timestamps: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        按时间切分滚动窗口
+        :param timestamps: int64 毫秒时间轴
+        :return: [(train_start, train_end, test_start, test_end), ...] 时间轴下标（左闭右开）
+        """
+        to_ms = pd.Timedelta(milliseconds=1)
+        train_ms, test_ms, step_ms = (
+            int(self.train_period / to_ms), int(self.test_period / to_ms), int(self.step / to_ms)
+        )
+        windows = []
+        if len(timestamps) == 0:
+            return windows
+        start, last = int(timestamps[0]), int(timestamps[-1])
+        while start + train_ms + test_ms <= last + 1:
+            train_start, train_end, test_end = np.searchsorted(
+                timestamps, [start, start + train_ms, start + train_ms + test_ms]
+            )
+            if train_end > train_start and test_end > train_end:
+                windows.append((int(train_start), int(train_end), int(train_end), int(test_end)))
+            start += step_ms
+        return windows
+
+    def run(
+        self,
+        engine: MultiBacktestEngine,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        执行滚动前向优化
+        :param engine: 已调用 load_data 的回测引擎
+        :return: 每行一个窗口：窗口时间、最优参数、训练集指标、测试集各项指标、样本外累计收益
+        """
+        market = engine.market
+        windows = self.split(market.timestamps)
+        if not windows:
+            raise ValueError("历史数据不足以切分出一个训练/测试窗口")
+        trials = self.sweep.grid()
+        settings = dict(self.sweep.settings, windows=windows)
+        logger.info(f" 滚动前向优化开始: {len(windows)} 个窗口 × {len(trials)} 组参数")
+
+        self.scores = np.full((len(trials), len(windows), 2, len(SWEEP_METRICS)), np.nan)
+        results = run_trials(
+            engine, self.sweep.strategy_cls, settings, self.sweep.rebalance_freq,
+            _run_windows, list(enumerate(trials)), max_workers, chunksize
+        )
+        for trial_id, scores in results:
+            self.scores[trial_id] = scores
+
+        # 每个窗口按训练集指标选参，读取同一组参数的测试集指标
+        m = SWEEP_METRICS.index(self.metric)
+        train_scores = self.scores[:, :, 0, m]
+        if self.metric in MINIMIZE_METRICS:
+            train_scores = -train_scores
+        best = np.nanargmax(np.nan_to_num(train_scores, nan=-np.inf), axis=0)
+
+        dates = market.datetimes
+        rows = []
+        for w, (train_start, train_end, test_start, test_end) in enumerate(windows):
+            row = {
+                'train_start': dates[train_start],
+                'train_end': dates[train_end - 1],
+                'test_start': dates[test_start],
+                'test_end': dates[test_end - 1],
+                **trials[best[w]],
+                f'train_{self.metric}': self.scores[best[w], w, 0, m]
+            }
+            row.update({f'test_{name}': self.scores[best[w], w, 1, k] for k, name in enumerate(SWEEP_METRICS)})
+            rows.append(row)
+
+        report = pd.DataFrame(rows)
+        report['oos_cum_return'] = (1 + report['test_total_return']).cumprod() - 1
+        logger.info(f" 滚动前向优化完成 | 样本外累计收益: {report['oos_cum_return'].iloc[-1]:.2%}")
+        return report
@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod 
 from typing import Dict, List, Optional
+import numpy as np
 from ..api.api_connector  import APIConnector
 from ..utils.logger  import logger
 import yaml
 import os 
+
+# 信号动作 → 方向（1=买入/开多, -1=卖出/开空）
+SIGNAL_SIDES = {'buy': 1, 'open_long': 1, 'sell': -1, 'open_short': -1}
  
 class BaseStrategy(ABC):
     """
@@ -23,6 +27,7 @@ class BaseStrategy(ABC):
         self.connector  = connector
         self.indicators  = {}  # 存储指标参数（如 {'RSI': {'period': 14}}）
         self.exchanges  = []   # 策略适用的交易所（如 ['binance', 'okx']）
+        self.rules  = []       # 配置文件中的交易规则（如 [{'condition': 'RSI < 30', 'action': 'open_long'}]）
         self.load_config() 
  
     def load_config(self):
@@ -36,6 +41,7 @@ class BaseStrategy(ABC):
                 config = yaml.safe_load(f) 
                 self.indicators  = config.get('indicators',  {})
                 self.exchanges  = config.get('exchanges',  [])
+                self.rules  = config.get('rules',  [])
                 logger.info(f" 策略配置加载成功: {self.strategy_name}") 
         except FileNotFoundError:
             logger.warning(f" 未找到策略配置文件: {config_path}, 使用默认参数")
@@ -61,6 +67,50 @@ class BaseStrategy(ABC):
         """
         pass
  
+    def calculate_signals_batch(self, symbol: str, klines: Dict[str, np.ndarray], cache=None) -> Dict[str, np.ndarray]:
+        """
+        整段历史批量计算信号（回测使用；实盘仍逐K线调用 calculate_signals）
+        第 k 个信号只依赖第 k 根K线及之前的数据，与逐K线调用 calculate_signals 的结果一致
+        默认实现逐K线调用 calculate_signals（O(n²)），子类应覆盖为向量化实现
+        :param klines: {'open': (n,), 'high': (n,), 'low': (n,), 'close': (n,), 'volume': (n,)}
+        :param cache: 共享指标缓存（IndicatorCache，多策略回测时复用指标序列）
+        :return: 与K线对齐的信号数组 {
+            'action': int8（1=买入, -1=卖出, 0=无信号）,
+            'size': 下单数量（NaN 表示默认）,
+            'leverage': 杠杆（NaN 表示默认）,
+            'stop': 止损价（NaN 表示无）
+        }
+        """
+        n = len(klines['close'])
+        signals = [
+            self.calculate_signals(symbol, {name: values[:k + 1] for name, values in klines.items()})
+            for k in range(n)
+        ]
+        return self.pack_signals(signals)
+
+    @staticmethod
+    def empty_signals(n: int) -> Dict[str, np.ndarray]:
+        """长度为 n 的空信号数组"""
+        return {
+            'action': np.zeros(n, dtype=np.int8),
+            'size': np.full(n, np.nan),
+            'leverage': np.full(n, np.nan),
+            'stop': np.full(n, np.nan)
+        }
+
+    @classmethod
+    def pack_signals(cls, signals: List[Optional[Dict]]) -> Dict[str, np.ndarray]:
+        """将逐K线信号字典列表转换为批量信号数组"""
+        batch = cls.empty_signals(len(signals))
+        for k, signal in enumerate(signals):
+            if not signal or signal.get('action') not in SIGNAL_SIDES:
+                continue
+            batch['action'][k] = SIGNAL_SIDES[signal['action']]
+            batch['size'][k] = signal.get('amount', np.nan)
+            batch['leverage'][k] = signal.get('leverage', np.nan)
+            batch['stop'][k] = signal.get('stop_loss', np.nan)
+        return batch
+
     def execute_trade(self, signal: Dict, exchange: str = 'binance'):
         """
         通用交易执行逻辑（子类可覆盖）
@@ -88,17 +138,22 @@ class BaseStrategy(ABC):
             logger.error(f" 交易执行失败: {e}")
             raise 
  
-    def run_backtest(self, symbol: str, klines: List[Dict]):
+    def run_backtest(self, symbol: str, klines: List[Dict]) -> Dict[str, np.ndarray]:
         """
-        通用回测逻辑（子类可扩展）
+        通用回测逻辑（子类可扩展）：整段历史一次性批量计算信号
         :param symbol: 交易对
         :param klines: 历史K线数据
+        :return: calculate_signals_batch() 的信号数组
         """
-        for kline in klines:
-            signal = self.calculate_signals(symbol,  kline)
-            if signal:
-                logger.debug(f" 回测信号: {signal}") 
-                # 这里可添加回测统计逻辑（如累计收益计算）
+        arrays = {
+            name: np.array([kline[name] for kline in klines], dtype=np.float64)
+            for name in ('open', 'high', 'low', 'close', 'volume')
+            if klines and name in klines[0]
+        }
+        signals = self.calculate_signals_batch(symbol, arrays)
+        logger.debug(f" 回测信号: {symbol} 共 {int(np.count_nonzero(signals['action']))} 个") 
+        # 这里可添加回测统计逻辑（如累计收益计算）
+        return signals
  
     def get_indicator_params(self) -> Dict:
         """获取当前指标参数（供前端显示）"""
@@ -1,6 +1,8 @@
 import numpy as np 
-from typing import Dict, Optional
-from .base_strategy import BaseStrategy 
+import pandas as pd
+from typing import Dict, List, Optional
+from .base_strategy import BaseStrategy, SIGNAL_SIDES
+from ..backtest.indicator_cache import IndicatorCache, rolling_mean
 from ..utils.logger  import logger 
  
 class CustomStrategy(BaseStrategy):
@@ -15,6 +17,33 @@ class CustomStrategy(BaseStrategy):
     def __init__(self, connector, strategy_config: str = "custom_strategy"):
         super().__init__(strategy_name=strategy_config, connector=connector)
         self.ma_type  = self.indicators['MA'].get('type',  'SMA')  # 默认SMA
+        self.rule_engine  = self._compile_rules(self.rules)
+
+    @staticmethod
+    def _compile_rules(rules: List[Dict]) -> List[Dict]:
+        """
+        编译配置中的规则条件（按配置顺序匹配，先匹配的规则优先）
+        :return: [{'condition': str, 'action': str, 'func': callable}, ...]
+        """
+        engine = []
+        for rule in rules:
+            if rule.get('action') not in SIGNAL_SIDES:
+                raise ValueError(f"不支持的规则动作: {rule.get('action')}")
+            code = compile(rule['condition'], '<rule>', 'eval')
+            engine.append({
+                'condition': rule['condition'],
+                'action': rule['action'],
+                'func': lambda _code=code, **values: bool(eval(_code, {'__builtins__': {}}, values))
+            })
+        return engine
+
+    def min_bars(self) -> int:
+        """计算全部指标所需的最少K线数"""
+        return max(
+            self.indicators['MA']['period'],
+            self.indicators['MACD']['slow_period'],
+            self.indicators['RSI']['period']
+        )
  
     def calculate_indicators(self, klines: Dict) -> Dict:
         """计算所有配置文件中定义的指标"""
@@ -49,6 +78,10 @@ class CustomStrategy(BaseStrategy):
         - "RSI > 70 and MACD < 0"
         """
         try:
+            if len(klines['close']) < self.min_bars():
+                logger.warning(" 数据不足，跳过信号计算")
+                return None
+
             indicator_values = self.calculate_indicators(klines) 
             
             # 动态执行所有规则
@@ -69,6 +102,49 @@ class CustomStrategy(BaseStrategy):
             logger.error(f" 信号生成失败: {e}")
             raise 
  
+    def calculate_signals_batch(self, symbol: str, klines: Dict[str, np.ndarray], cache: IndicatorCache = None) -> Dict[str, np.ndarray]:
+        """
+        向量化执行全部规则（与逐K线 calculate_signals 结果一致）
+        规则条件用 pandas.eval 对整段指标序列逐元素求值
+        :param cache: 共享指标缓存（未传入时新建）
+        """
+        cache = cache or IndicatorCache({symbol: klines})
+        closes = np.asarray(klines['close'], dtype=np.float64)
+        n = len(closes)
+        ma_period = self.indicators['MA']['period']
+        values = {
+            'RSI': cache.rsi(symbol, self.indicators['RSI']['period'], method='simple'),
+            'MACD': cache.macd(symbol, self.indicators['MACD']['fast_period'], self.indicators['MACD']['slow_period']),
+            'MA': cache.get(symbol, self.ma_type, (ma_period,), lambda: self._calculate_ma_series(closes, ma_period)),
+            'close': closes
+        }
+
+        signals = self.empty_signals(n)
+        free = np.arange(n) >= self.min_bars() - 1  # 数据不足或已被先前规则匹配的K线不再参与
+        for rule in self.rule_engine:
+            with np.errstate(invalid='ignore'):
+                hit = free & np.broadcast_to(
+                    np.asarray(pd.eval(rule['condition'], local_dict=values, engine='python'), dtype=bool), n
+                )
+            signals['action'][hit] = SIGNAL_SIDES[rule['action']]
+            signals['leverage'][hit] = self.indicators.get('leverage',  3)
+            signals['stop'][hit] = self._get_stop_price(closes[hit], side=rule['action'].split('_')[-1])
+            free &= ~hit
+        return signals
+
+    def _calculate_ma_series(self, closes: np.ndarray, period: int) -> np.ndarray:
+        """整段移动平均序列（第 k 个值与 _calculate_ma(closes[:k+1]) 一致，前 period-1 个为 NaN）"""
+        ma = np.full(len(closes), np.nan)
+        if len(closes) < period:
+            return ma
+        if self.ma_type  == "SMA":
+            ma[period - 1:] = rolling_mean(closes, period)[period - 1:]
+        elif self.ma_type  == "EMA":
+            ma[period - 1:] = np.convolve(closes, np.exp(np.linspace(-1,  0, period)), mode='valid')
+        else:
+            raise ValueError(f"不支持的MA类型: {self.ma_type}") 
+        return ma
+
     def _get_stop_price(self, entry_price: float, side: str) -> float:
         """根据风险参数计算初始止损价"""
         risk_config = self.indicators.get('risk_params',  {}).get('trailing_stop', {})
@@ -83,9 +159,9 @@ class CustomStrategy(BaseStrategy):
     def calculate_rsi(self, closes: list, period: int = None) -> float:
         """同RSIMACDStrategy"""
         period = period or self.indicators['RSI']['period'] 
-        deltas = np.diff(closes) 
-        up = deltas[deltas >= 0].mean()
-        down = -deltas[deltas < 0].mean()
+        deltas = np.diff(closes)[-period:]
+        up = deltas[deltas >= 0].sum() / period
+        down = -deltas[deltas < 0].sum() / period
         return 100 - (100 / (1 + (up / down)))
  
     def calculate_macd(self, closes: list) -> float:
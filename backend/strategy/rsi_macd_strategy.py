@@ -1,6 +1,7 @@
 import numpy as np
 from typing import Dict, Optional 
 from .base_strategy import BaseStrategy
+from ..backtest.indicator_cache import IndicatorCache
 from ..utils.logger  import logger
  
 class RSIMACDStrategy(BaseStrategy):
@@ -20,7 +21,7 @@ class RSIMACDStrategy(BaseStrategy):
         """计算RSI值"""
         period = period or self.indicators['RSI']['period'] 
         deltas = np.diff(closes) 
-        seed = deltas[:period + 1]
+        seed = deltas[-period:]  # 最近 period 个价格变动
         up = seed[seed >= 0].sum() / period
         down = -seed[seed < 0].sum() / period
         rs = up / down 
@@ -71,6 +72,28 @@ class RSIMACDStrategy(BaseStrategy):
             logger.error(f" 信号计算失败: {e}")
             raise 
  
+    def calculate_signals_batch(self, symbol: str, klines: Dict[str, np.ndarray], cache: IndicatorCache = None) -> Dict[str, np.ndarray]:
+        """
+        向量化计算整段历史信号（与逐K线 calculate_signals 结果一致）
+        :param cache: 共享指标缓存（未传入时新建）
+        """
+        cache = cache or IndicatorCache({symbol: klines})
+        closes = klines['close']
+        rsi_period = self.indicators['RSI']['period']
+        slow_period = self.indicators['MACD']['slow_period']
+        rsi = cache.rsi(symbol, rsi_period, method='simple')
+        macd = cache.macd(symbol, self.indicators['MACD']['fast_period'], slow_period)
+
+        signals = self.empty_signals(len(closes))
+        ready = np.arange(len(closes)) >= max(slow_period, rsi_period) - 1  # 数据不足时无信号
+        with np.errstate(invalid='ignore'):
+            buy = ready & (rsi < self.indicators['RSI']['oversold']) & (macd > 0)
+            sell = ready & (rsi > self.indicators['RSI']['overbought']) & (macd < 0)
+        signals['action'][buy] = 1
+        signals['action'][sell] = -1
+        signals['leverage'][buy] = self.indicators.get('leverage',  3)
+        return signals
+ 
     def execute_trade(self, signal: Dict, exchange: str = 'binance'):
         """
         扩展执行逻辑（支持双线持仓）
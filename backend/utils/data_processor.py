@@ -28,7 +28,14 @@ def resample_klines(df: pd.DataFrame, target_tf: str) -> pd.DataFrame:
             freq = f"{int(target_tf[:-1])}D"
         else:
             raise ValueError(f"Unsupported timeframe: {target_tf}")
-        
+
+        # 已是目标周期（如预先聚合好的数据）：K线对齐周期边界且无缺失值时无需重采样
+        step = pd.Timedelta(freq).value
+        stamps = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else None
+        if (stamps is not None and len(stamps) and not (stamps % step).any() and (np.diff(stamps) >= step).all()
+                and not df[list(ohlc_dict)].isna().values.any()):
+            return df[list(ohlc_dict)]
+
         resampled = df.resample(freq).agg(ohlc_dict).dropna() 
         logger.debug(f"Resampled  {len(df)} → {len(resampled)} bars ({target_tf})")
         return resampled 
@@ -37,10 +44,17 @@ def resample_klines(df: pd.DataFrame, target_tf: str) -> pd.DataFrame:
         logger.error(f"Resampling  failed: {e}")
         raise
  
-def fill_missing_data(df: pd.DataFrame, timeframe: str, method: str = 'linear') -> pd.DataFrame:
+def fill_missing_data(
+    df: pd.DataFrame,
+    timeframe: str,
+    method: str = 'linear',
+    gaps: Optional[List[List[int]]] = None
+) -> pd.DataFrame:
     """
     填充缺失的K线数据 
     :param method: 填充方式（linear/ffill/bfill）
+    :param gaps: 已知的缺失区间 [[start_ms, end_ms), ...]（如数据质量索引记录的缺口）。
+                 给定时只在缺口处插入K线并按两侧K线插值，不重建完整时间索引，也不处理已有K线中的缺失值
     """
     if timeframe.endswith('m'): 
         freq = f"{int(timeframe[:-1])}T"
@@ -48,6 +62,9 @@ def fill_missing_data(df: pd.DataFrame, timeframe: str, method: str = 'linear')
         freq = f"{int(timeframe[:-1])}H"
     else:
         freq = "1D"
+
+    if gaps is not None:
+        return _fill_gaps(df, pd.Timedelta(freq).value, method, gaps)
     
     full_range = pd.date_range(start=df.index.min(),  end=df.index.max(),  freq=freq)
     return df.reindex(full_range).interpolate(method=method) 
@@ -128,6 +145,30 @@ def validate_data_quality(df: pd.DataFrame) -> Dict[str, Union[bool, dict]]:
     return report
  
 # ------------------- 私有计算函数 -------------------
+def _fill_gaps(df: pd.DataFrame, step: int, method: str, gaps: List[List[int]]) -> pd.DataFrame:
+    """在已知缺口处插入K线（step 为K线周期纳秒数），新K线的值由缺口两侧的K线得到"""
+    stamps = df.index.asi8
+    if len(stamps) < 2 or not gaps:
+        return df
+    new = np.concatenate([np.arange(a * 10 ** 6, b * 10 ** 6, step, dtype=np.int64) for a, b in gaps])
+    new = new[(new > stamps[0]) & (new < stamps[-1])]
+    new = new[stamps[np.searchsorted(stamps, new)] != new]  # 跳过已存在的K线
+    if not len(new):
+        return df
+
+    pos = np.searchsorted(stamps, new)
+    values = df.to_numpy(dtype=np.float64)
+    left, right = values[pos - 1], values[pos]
+    if method == 'ffill':
+        filled = left
+    elif method == 'bfill':
+        filled = right
+    else:
+        frac = (new - stamps[pos - 1]) / (stamps[pos] - stamps[pos - 1])
+        filled = left + (right - left) * frac[:, None]
+    index = pd.DatetimeIndex(np.insert(stamps, pos, new), name=df.index.name)
+    return pd.DataFrame(np.insert(values, pos, filled, axis=0), index=index, columns=df.columns)
+
 def _calculate_rsi(prices: np.ndarray,  period: int = 14) -> np.ndarray: 
     """计算RSI指标"""
     deltas = np.diff(prices) 
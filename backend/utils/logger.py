@@ -70,19 +70,20 @@ class StructuredFormatter(logging.Formatter):
 class JSONFormatter(StructuredFormatter):
     """JSON格式日志格式化器"""
     def __init__(self):
-        super().__init__({
-            level: json.dumps({ 
-                "timestamp": datetime.utcnow().isoformat(), 
-                "level": level.name, 
-                "message": record.getMessage(), 
-                "module": record.module, 
-                "function": record.funcName, 
-                "line": record.lineno, 
-                "thread": record.threadName, 
-                **getattr(record, 'extra', {})
-            }, cls=EnhancedJSONEncoder)
-            for level in LogLevel
-        })
+        super().__init__({})
+
+    def format(self, record: logging.LogRecord) -> str:
+        """将日志记录序列化为单行JSON"""
+        return json.dumps({ 
+            "timestamp": datetime.utcnow().isoformat(), 
+            "level": record.levelname, 
+            "message": record.getMessage(), 
+            "module": record.module, 
+            "function": record.funcName, 
+            "line": record.lineno, 
+            "thread": record.threadName, 
+            **getattr(record, 'extra', {})
+        }, cls=EnhancedJSONEncoder)
  
 class ConsoleFormatter(StructuredFormatter):
     """控制台日志格式化器"""
@@ -164,6 +165,7 @@ class Logger:
             
         self._initialized = True
         self.async_log  = async_log
+        self.async_handlers  = []  # 异步模式下的队列监听器
         self.logger  = logging.getLogger(name) 
         self.logger.setLevel(log_level.value) 
         
@@ -172,9 +174,8 @@ class Logger:
         
         # 如果是异步模式，启动监听线程
         if async_log:
-            for handler in self.logger.handlers: 
-                if isinstance(handler, AsyncLogHandler):
-                    handler.start() 
+            for handler in self.async_handlers: 
+                handler.start() 
  
     def _setup_handlers(self, log_file: Optional[str], log_level: LogLevel):
         """配置日志处理器"""
@@ -186,6 +187,8 @@ class Logger:
         
         if self.async_log: 
             console_handler = AsyncLogHandler(console_handler)
+            self.async_handlers.append(console_handler) 
+            console_handler = console_handler.handler 
         
         self.logger.addHandler(console_handler) 
         
@@ -203,6 +206,8 @@ class Logger:
             
             if self.async_log: 
                 file_handler = AsyncLogHandler(file_handler)
+                self.async_handlers.append(file_handler) 
+                file_handler = file_handler.handler 
             
             self.logger.addHandler(file_handler) 
  
@@ -246,10 +251,10 @@ class Logger:
         extra.update(kwargs) 
         self.logger.exception(message,  extra=extra)
  
-# 全局默认日志记录器 
+# 全局默认日志记录器（日志文件路径可由环境变量 TRADING_LOG_FILE 指定，设为空字符串时只输出到控制台，如运行测试时）
 logger = Logger(
     name="trading_system",
-    log_file="logs/trading.log", 
+    log_file=os.environ.get("TRADING_LOG_FILE", "logs/trading.log") or None, 
     async_log=True,
     log_level=LogLevel.INFO 
 )
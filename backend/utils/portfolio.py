@@ -0,0 +1,245 @@
+"""
+backend/utils/portfolio.py
+资产组合权重分配工具
+
+功能：
+1. 等权 / 波动率倒数 / 全协方差风险平价 三种分配方式
+2. EWMA 协方差矩阵逐K线增量更新（无需每次再平衡重新估计）
+3. 回测与实盘共用，200 个币种的权重计算在毫秒级完成
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+
+class EWMACovariance:
+    """
+    指数加权协方差矩阵（RiskMetrics 零均值形式）
+    cov ← λ·cov + (1-λ)·r·rᵀ，缺失收益率不参与更新；
+    同时按相同权重累计成对有效观测的权重和，读取时做偏差修正，上市时间不同的币种也能直接比较
+    """
+
+    def __init__(self, n_assets: int, halflife: float = 30.0):
+        """
+        :param n_assets: 资产数量
+        :param halflife: 半衰期（K线数）
+        """
+        self.n_assets  = n_assets
+        self.decay  = 0.5 ** (1.0 / halflife)
+        self.n_obs  = np.zeros(n_assets, dtype=np.int64)  # 各资产有效观测数
+        self._cov  = np.zeros((n_assets, n_assets))
+        self._norm  = np.zeros((n_assets, n_assets))      # 成对有效观测的权重和
+
+    def update(self, returns: np.ndarray):
+        """
+        增量更新一根K线
+        :param returns: (n_assets,) 收益率，NaN 表示该资产本K线无数据
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        mask = np.isfinite(returns)
+        r = np.where(mask, returns, 0.0)
+        m = mask.astype(np.float64)
+        self._cov *= self.decay
+        self._cov += (1 - self.decay) * np.outer(r, r)
+        self._norm *= self.decay
+        self._norm += (1 - self.decay) * np.outer(m, m)
+        self.n_obs += mask
+
+    def update_batch(self, returns: np.ndarray):
+        """
+        批量更新多根K线（结果与逐根 update 一致，一次矩阵乘法完成）
+        :param returns: (n_bars, n_assets) 收益率，按时间升序
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        n = len(returns)
+        if n == 0:
+            return
+        mask = np.isfinite(returns)
+        r = np.where(mask, returns, 0.0)
+        m = mask.astype(np.float64)
+        # 第 t 根K线在批末的权重为 (1-λ)·λ^(n-1-t)
+        w = (1 - self.decay) * self.decay ** np.arange(n - 1, -1, -1)
+        carry = self.decay ** n
+        self._cov = carry * self._cov + (r * w[:, None]).T @ r
+        self._norm = carry * self._norm + (m * w[:, None]).T @ m
+        self.n_obs += mask.sum(axis=0)
+
+    def covariance(self) -> np.ndarray:
+        """偏差修正后的协方差矩阵（无成对观测的元素为 0）"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self._norm > 0, self._cov / self._norm, 0.0)
+
+
+class PortfolioAllocator:
+    """
+    资产组合权重分配器
+    功能：
+    - equal：等权
+    - inverse_vol：按波动率倒数分配
+    - risk_parity：各资产风险贡献相等（使用 EWMA 全协方差；协方差数据不足时退化为波动率倒数）
+    """
+
+    METHODS = ('equal', 'inverse_vol', 'risk_parity')
+
+    def __init__(
+        self,
+        method: str = "risk_parity",
+        halflife: float = 30.0,
+        min_periods: int = 20,
+        max_weight: Optional[float] = None,
+        gross: float = 1.0
+    ):
+        """
+        :param method: 分配方式（equal / inverse_vol / risk_parity）
+        :param halflife: EWMA 协方差半衰期（K线数）
+        :param min_periods: 资产至少有多少根有效收益率才参与协方差分配
+        :param max_weight: 单资产权重上限（None 表示不限制）
+        :param gross: 权重总和
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"不支持的分配方式: {method}")
+        self.method  = method
+        self.halflife  = halflife
+        self.min_periods  = min_periods
+        self.max_weight  = max_weight
+        self.gross  = gross
+        self.reset()
+
+    def reset(self):
+        """清空协方差状态（每次回测开始时调用）"""
+        self.symbols  = []
+        self.covariance  = None
+        self.last_timestamp  = None  # 已纳入协方差的最后一根K线时间（毫秒）
+        self.weights  = {}           # 最近一次计算的权重 {symbol: weight}
+
+    # ----------- 协方差更新 -----------
+    def _ensure_symbols(self, symbols: Sequence[str]):
+        """币种列表变化时重建协方差"""
+        if list(symbols) != self.symbols:
+            self.symbols  = list(symbols)
+            self.covariance  = EWMACovariance(len(self.symbols), self.halflife)
+            self.last_timestamp  = None
+
+    def update(self, returns: Dict[str, float]):
+        """
+        实盘逐K线更新：{symbol: 本K线收益率}，缺失币种视为无数据
+        """
+        self._ensure_symbols(self.symbols or list(returns))
+        self.covariance.update(np.array([returns.get(sym, np.nan) for sym in self.symbols]))
+
+    def observe(self, symbols: Sequence[str], timestamps: np.ndarray, returns: np.ndarray):
+        """
+        回测中按时间轴批量纳入收益率，只处理上次之后的新K线（重复传入的历史部分自动跳过）
+        :param timestamps: (bars,) int64 毫秒时间戳
+        :param returns: (symbols, bars) 收益率面板，NaN 表示无数据
+        """
+        self._ensure_symbols(symbols)
+        start = 0 if self.last_timestamp is None else int(np.searchsorted(timestamps, self.last_timestamp, side='right'))
+        if start < len(timestamps):
+            self.covariance.update_batch(returns[:, start:].T)
+            self.last_timestamp  = int(timestamps[-1])
+
+    # ----------- 权重计算 -----------
+    def calculate_weights(
+        self,
+        symbols: List[str],
+        volatilities: Optional[Dict[str, float]] = None
+    ) -> Dict[str, float]:
+        """
+        计算目标权重
+        :param volatilities: {symbol: 波动率}（无协方差数据时使用）
+        :return: {symbol: weight}，同时保存到 self.weights
+        """
+        symbols = list(symbols)
+        n = len(symbols)
+        if n == 0:
+            self.weights  = {}
+            return self.weights
+
+        cov = self._covariance_for(symbols)
+        if self.method == 'equal':
+            raw = np.ones(n)
+        elif self.method == 'risk_parity' and cov is not None:
+            raw = risk_parity_weights(cov)
+        else:
+            if cov is not None:
+                vol = np.sqrt(np.diag(cov))
+            else:
+                vol = np.array([(volatilities or {}).get(sym, np.nan) for sym in symbols], dtype=np.float64)
+            with np.errstate(divide='ignore'):
+                raw = np.where(np.isfinite(vol) & (vol > 0), 1.0 / vol, 0.0)
+            if not raw.any():
+                raw = np.ones(n)
+
+        weights = self._normalize(raw)
+        self.weights  = dict(zip(symbols, weights.tolist()))
+        return self.weights
+
+    def _covariance_for(self, symbols: List[str]) -> Optional[np.ndarray]:
+        """
+        取出 symbols 对应的协方差子矩阵；观测不足的资产方差置 0（权重为 0）
+        协方差尚未建立或全部资产观测不足时返回 None
+        """
+        if self.covariance is None or self.method == 'equal':
+            return None
+        index = {sym: k for k, sym in enumerate(self.symbols)}
+        if any(sym not in index for sym in symbols):
+            return None
+        idx = np.array([index[sym] for sym in symbols])
+        ready = self.covariance.n_obs[idx] >= self.min_periods
+        if not ready.any():
+            return None
+        cov = self.covariance.covariance()[np.ix_(idx, idx)]
+        cov[~ready, :] = 0.0
+        cov[:, ~ready] = 0.0
+        return cov
+
+    def _normalize(self, raw: np.ndarray) -> np.ndarray:
+        """归一化到 gross，并按 max_weight 截断后把多余权重分给未触顶资产"""
+        weights = raw / raw.sum() if raw.sum() > 0 else raw
+        if self.max_weight is not None and weights.any():
+            for _ in range(len(weights)):
+                capped = weights >= self.max_weight
+                excess = (weights[capped] - self.max_weight).sum()
+                weights[capped] = self.max_weight
+                free = ~capped & (weights > 0)
+                if excess <= 1e-12 or not free.any():
+                    break
+                weights[free] += excess * weights[free] / weights[free].sum()
+        return weights * self.gross
+
+
+def risk_parity_weights(cov: np.ndarray, budget: Optional[np.ndarray] = None, tol: float = 1e-10, max_iter: int = 50) -> np.ndarray:
+    """
+    风险平价权重（各资产风险贡献 w_i·(Σw)_i 与预算成比例）
+    求解凸问题 min ½yᵀΣy - Σ b_i·ln(y_i)（Spinu 2013）的牛顿法，w = y / Σy
+    方差为 0 的资产（无数据）权重为 0
+    :param cov: (n, n) 协方差矩阵
+    :param budget: (n,) 风险预算（默认等权）
+    """
+    n = len(cov)
+    weights = np.zeros(n)
+    active = np.diag(cov) > 0
+    if not active.any():
+        return weights
+    sigma = cov[np.ix_(active, active)]
+    b = np.full(active.sum(), 1.0) if budget is None else np.asarray(budget, dtype=np.float64)[active]
+    b = b / b.sum()
+
+    # 以波动率倒数为初值
+    y = 1.0 / np.sqrt(np.diag(sigma))
+    y *= np.sqrt(1.0 / (y @ sigma @ y))
+    for _ in range(max_iter):
+        sy = sigma @ y
+        grad = sy - b / y
+        if np.max(np.abs(grad * y)) < tol:
+            break
+        hessian = sigma + np.diag(b / y ** 2)
+        step = np.linalg.solve(hessian, grad)
+        # 阻尼：保证 y 保持为正
+        t = 1.0
+        while np.any(y - t * step <= 0):
+            t *= 0.5
+        y = y - t * step
+    weights[active] = y / y.sum()
+    return weights
@@ -0,0 +1,4 @@
+import os
+
+# 测试不写运行日志文件（需在导入 backend 模块之前设置）
+os.environ.setdefault("TRADING_LOG_FILE", "")
@@ -0,0 +1,943 @@
+"""
+CryptoTrader 回测引擎测试
+=======================
+
+验证向量化执行模式与逐K线引擎在参考数据集上的结果一致，以及紧凑列类型模式。
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import pytest
+
+engine_module = pytest.importorskip("backend.backtest.backtest_engine")
+MultiBacktestEngine = engine_module.MultiBacktestEngine
+
+
+def make_klines(seed: int, n_bars: int = 400, start: str = "2023-01-01", drop_every: int = 0):
+    """生成随机游走K线（可按间隔剔除部分K线以模拟缺失）"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    opens = np.concatenate([[closes[0]], closes[:-1]]) * (1 + rng.normal(0, 0.001, n_bars))
+    times = pd.date_range(start, periods=n_bars, freq="1H")
+    klines = []
+    for k in range(n_bars):
+        if drop_every and k % drop_every == drop_every - 1:
+            continue
+        klines.append({
+            "time": int(times[k].timestamp() * 1000),
+            "open": opens[k],
+            "high": max(opens[k], closes[k]) * 1.002,
+            "low": min(opens[k], closes[k]) * 0.998,
+            "close": closes[k],
+            "volume": rng.uniform(1, 10),
+        })
+    return klines
+
+
+class MomentumStrategy:
+    """测试用动量策略：收盘价高于5根均线买入，否则卖出"""
+
+    def calculate_signals(self, symbol, klines):
+        closes = klines["close"]
+        if len(closes) < 5:
+            return None
+        return {"action": "buy" if closes[-1] > np.mean(closes[-5:]) else "sell", "symbol": symbol}
+
+
+class ParamMomentumStrategy:
+    """测试用可调参动量策略（构造方式与 BaseStrategy 子类一致）"""
+
+    def __init__(self, connector=None):
+        self.indicators = {"MOM": {"period": 5}}
+
+    def calculate_signals(self, symbol, klines):
+        period = self.indicators["MOM"]["period"]
+        closes = klines["close"]
+        if len(closes) < period:
+            return None
+        return {"action": "buy" if closes[-1] > np.mean(closes[-period:]) else "sell", "symbol": symbol}
+
+
+class CrossoverStrategy:
+    """测试用均线交叉策略（实现 calculate_signals_batch，指标从共享缓存读取）"""
+
+    def __init__(self, fast, slow):
+        self.fast, self.slow = fast, slow
+
+    def calculate_signals(self, symbol, klines):
+        closes = klines["close"]
+        if len(closes) < self.slow:
+            return None
+        return {"action": "buy" if np.mean(closes[-self.fast:]) > np.mean(closes[-self.slow:]) else "sell"}
+
+    def calculate_signals_batch(self, symbol, klines, cache=None):
+        from backend.backtest.indicator_cache import IndicatorCache
+        cache = cache or IndicatorCache({symbol: klines})
+        diff = cache.sma(symbol, self.fast) - cache.sma(symbol, self.slow)
+        action = np.where(diff > 0, 1, -1)
+        action[:self.slow - 1] = 0
+        return {"action": action}
+
+
+class EqualWeightAllocator:
+    """测试用等权分配器"""
+
+    def __init__(self):
+        self.weights = {}
+
+    def calculate_weights(self, symbols, volatilities=None):
+        self.weights = {sym: 0.1 for sym in symbols}
+        return self.weights
+
+
+class BacktestEngineFactory:
+    @staticmethod
+    def build(strategy=None, seed=42) -> MultiBacktestEngine:
+        engine = MultiBacktestEngine(initial_balance=10000, strategy=strategy or MomentumStrategy(), seed=seed)
+        engine.allocator = EqualWeightAllocator()
+        engine.load_data(
+            symbols=["BTC/USDT", "ETH/USDT", "SOL/USDT"],
+            klines_map={
+                "BTC/USDT": make_klines(1),
+                "ETH/USDT": make_klines(2, drop_every=7),
+                "SOL/USDT": make_klines(3, n_bars=300, start="2023-01-03"),
+            },
+            timeframe="1h",
+        )
+        return engine
+
+
+class VectorizedModeTests(unittest.TestCase):
+    """向量化模式与逐K线模式一致性测试"""
+
+    def run_both(self, **kwargs):
+        loop = BacktestEngineFactory.build()
+        loop_report = loop.run(mode="loop", **kwargs)
+        vec = BacktestEngineFactory.build()
+        vec_report = vec.run(mode="vectorized", **kwargs)
+        return loop, loop_report, vec, vec_report
+
+    def test_equity_curve_matches_loop(self):
+        _, loop_report, _, vec_report = self.run_both(commission=0.001, slippage=0.0005)
+        np.testing.assert_allclose(
+            vec_report["portfolio"]["equity_curve"].values,
+            loop_report["portfolio"]["equity_curve"].values,
+            rtol=1e-9,
+        )
+        self.assertAlmostEqual(
+            vec_report["portfolio"]["final_value"], loop_report["portfolio"]["final_value"], places=6
+        )
+
+    def test_trades_match_loop(self):
+        loop, _, vec, _ = self.run_both(commission=0.0005, slippage=0.0)
+        self.assertGreater(sum(len(t) for t in loop.history.values()), 0)
+        for symbol, trades in loop.history.items():
+            expected = pd.DataFrame(trades)
+            actual = pd.DataFrame(vec.history[symbol])
+            self.assertEqual(len(expected), len(actual))
+            self.assertTrue((expected["time"].values == actual["time"].values).all())
+            self.assertTrue((expected["action"].values == actual["action"].values).all())
+            np.testing.assert_allclose(actual["price"], expected["price"], rtol=1e-12)
+            np.testing.assert_allclose(actual["amount"], expected["amount"], rtol=1e-9)
+            np.testing.assert_allclose(actual["commission"], expected["commission"], rtol=1e-9)
+
+    def test_invalid_run_arguments(self):
+        with self.assertRaises(ValueError):
+            MultiBacktestEngine(initial_balance=10000).run()
+        engine = BacktestEngineFactory.build()
+        engine.run(mode="vectorized")
+        trades = len(engine.history)
+        with self.assertRaises(ValueError):
+            engine.run(mode="fast")
+        self.assertEqual(len(engine.history), trades)  # 参数无效时不清空上一次的结果
+
+    def test_fills_use_next_bar_open(self):
+        _, _, vec, _ = self.run_both(commission=0.0, slippage=0.0)
+        df = vec.symbol_data["BTC/USDT"]
+        for trade in vec.history["BTC/USDT"]:
+            self.assertEqual(trade["price"], df.loc[trade["time"], "open"])
+            self.assertGreater(trade["time"], df.index[0])
+
+
+    def test_risk_parity_allocator_matches_loop(self):
+        from backend.utils.portfolio import PortfolioAllocator
+        reports = []
+        for mode in ("loop", "vectorized"):
+            engine = BacktestEngineFactory.build()
+            engine.allocator = PortfolioAllocator(method="risk_parity", min_periods=24, gross=0.3)
+            reports.append(engine.run(mode=mode, commission=0.001, slippage=0.0005))
+            weights = engine.allocator.weights
+            self.assertAlmostEqual(sum(weights.values()), 0.3)
+            self.assertEqual(len(set(round(w, 6) for w in weights.values())), 3)
+        np.testing.assert_allclose(
+            reports[1]["portfolio"]["equity_curve"].values, reports[0]["portfolio"]["equity_curve"].values, rtol=1e-9
+        )
+
+
+class AlignedMarketDataTests(unittest.TestCase):
+    """对齐行情存储测试"""
+
+    def setUp(self):
+        self.engine = BacktestEngineFactory.build()
+        self.market = self.engine.market
+
+    def test_matrix_shape_and_mask(self):
+        market = self.market
+        self.assertEqual(market.fields["close"].shape, (3, market.n_bars))
+        for s, symbol in enumerate(market.symbols):
+            self.assertEqual(market.valid[s].sum(), len(self.engine.symbol_data[symbol]))
+        self.assertTrue(np.isnan(market.fields["close"][~market.valid]).all())
+
+    def test_integer_lookup(self):
+        market = self.market
+        eth = market.symbol_index["ETH/USDT"]
+        missing = int(np.flatnonzero(~market.valid[eth])[0])
+        self.assertIsNone(market.kline_at(eth, missing))
+
+        ts = self.engine.symbol_data["ETH/USDT"].index[10]
+        i = market.index_of(ts)
+        self.assertEqual(market.kline_at(eth, i)["close"], self.engine.symbol_data["ETH/USDT"]["close"].iloc[10])
+        self.assertEqual(len(market.history(eth, i)["close"]), 11)
+        self.assertIsNone(market.index_of("1999-01-01"))
+
+    def test_rolling_volatility_matches_pandas(self):
+        market = self.market
+        window = pd.Timedelta(days=3)
+        panel = market.rolling_volatility(window)
+        for s, symbol in enumerate(market.symbols):
+            df = self.engine.symbol_data[symbol]
+            for i in range(0, market.n_bars, 37):
+                ts = market.datetimes[i]
+                sub = df[(df.index <= ts) & (df.index >= ts - window)]
+                expected = sub["close"].pct_change().std()
+                if np.isnan(expected):
+                    self.assertTrue(np.isnan(panel[s, i]))
+                else:
+                    self.assertAlmostEqual(panel[s, i], expected, places=10)
+
+
+class ParameterSweepTests(unittest.TestCase):
+    """参数扫描测试"""
+
+    def setUp(self):
+        from backend.backtest.optimizer import ParameterSweep
+        self.sweep = ParameterSweep(
+            ParamMomentumStrategy, {"MOM.period": [3, 5, 8, 13]}, commission=0.001, slippage=0.0
+        )
+        self.engine = BacktestEngineFactory.build()
+
+    def test_grid_matches_single_backtest(self):
+        table = self.sweep.run(self.engine, max_workers=1)
+        self.assertEqual(len(table), 4)
+        strategy = ParamMomentumStrategy()
+        strategy.indicators["MOM"]["period"] = 8
+        report = BacktestEngineFactory.build(strategy).run(mode="vectorized", commission=0.001, slippage=0.0)
+        row = table[table["MOM.period"] == 8].iloc[0]
+        self.assertAlmostEqual(row["final_value"], report["portfolio"]["equity_curve"].iloc[-1], places=6)
+
+    def test_process_pool_matches_in_process(self):
+        serial = self.sweep.run(self.engine, max_workers=1)
+        parallel = self.sweep.run(self.engine, max_workers=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_random_sampling_is_subset(self):
+        table = self.sweep.run(self.engine, method="random", n_trials=2, max_workers=1)
+        self.assertEqual(len(table), 2)
+        self.assertTrue(set(table["MOM.period"]).issubset({3, 5, 8, 13}))
+
+    def test_non_numeric_params_keep_values(self):
+        from backend.backtest.optimizer import ParameterSweep
+        sweep = ParameterSweep(
+            ParamMomentumStrategy,
+            {"MOM.period": [3, 5], "MOM.type": ["SMA", "EMA"], "MOM.adjust": [True, False]},
+            slippage=0.0,
+        )
+        table = sweep.run(self.engine, max_workers=1)
+        self.assertEqual(len(table), 8)
+        self.assertEqual(table["MOM.period"].dtype, np.float64)
+        self.assertEqual(set(table["MOM.type"]), {"SMA", "EMA"})
+        self.assertEqual(set(table["MOM.adjust"]), {True, False})
+        self.assertTrue(all(isinstance(v, bool) for v in table["MOM.adjust"]))
+
+
+class WalkForwardTests(unittest.TestCase):
+    """滚动前向优化测试"""
+
+    def setUp(self):
+        from backend.backtest.optimizer import ParameterSweep
+        from backend.backtest.walk_forward import WalkForwardOptimizer
+        sweep = ParameterSweep(ParamMomentumStrategy, {"MOM.period": [3, 5, 8, 13]}, slippage=0.0)
+        self.optimizer = WalkForwardOptimizer(sweep, train_period="5D", test_period="2D", metric="total_return")
+        self.engine = BacktestEngineFactory.build()
+
+    def test_windows_are_contiguous(self):
+        windows = self.optimizer.split(self.engine.market.timestamps)
+        self.assertGreater(len(windows), 2)
+        for (a, b, c, d), (a2, _, c2, _) in zip(windows, windows[1:]):
+            self.assertEqual(b, c)
+            self.assertEqual(c2, d)
+            self.assertLess(a, a2)
+
+    def test_best_params_selected_on_train_window(self):
+        report = self.optimizer.run(self.engine, max_workers=1)
+        self.assertEqual(len(report), len(self.optimizer.split(self.engine.market.timestamps)))
+        train = self.optimizer.scores[:, :, 0, 1]
+        np.testing.assert_allclose(report["train_total_return"], train.max(axis=0))
+        expected = np.prod(1 + report["test_total_return"]) - 1
+        self.assertAlmostEqual(report["oos_cum_return"].iloc[-1], expected)
+
+    def test_parallel_matches_serial(self):
+        serial = self.optimizer.run(self.engine, max_workers=1)
+        parallel = self.optimizer.run(self.engine, max_workers=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+class MonteCarloTests(unittest.TestCase):
+    """蒙特卡洛稳健性分析测试"""
+
+    def setUp(self):
+        from backend.backtest.monte_carlo import MonteCarloSimulator, trade_returns
+        self.simulator_cls = MonteCarloSimulator
+        self.engine = BacktestEngineFactory.build()
+        self.report = self.engine.run(mode="vectorized", commission=0.001)
+        self.trades = trade_returns(self.engine, self.report)
+
+    def test_seeded_runs_are_reproducible(self):
+        first = self.simulator_cls(n_scenarios=200, seed=7).run(self.engine, self.report)
+        second = self.simulator_cls(n_scenarios=200, seed=7).run(self.engine, self.report)
+        pd.testing.assert_frame_equal(first["equity_bands"], second["equity_bands"])
+        self.assertGreater(len(first["equity_bands"]), 0)
+
+    def test_deterministic_scenario_replays_trade_returns(self):
+        simulator = self.simulator_cls(n_scenarios=5, slippage=0.0, fee_range=(1.0, 1.0), resample=False)
+        result = simulator.simulate(self.trades, 10000)
+        returns = (self.trades["pnl"] - self.trades["fee"]) / self.trades["equity"]
+        expected = 10000 * np.cumprod(1 + returns)
+        np.testing.assert_allclose(result["equity_bands"]["p50"], expected)
+        np.testing.assert_allclose(result["equity_bands"]["p5"], result["equity_bands"]["p95"])
+
+    def test_slippage_only_reduces_returns(self):
+        # 无盈亏、无手续费的买卖交替成交：滑点只能使资金减少
+        n = 50
+        trades = {
+            "pnl": np.zeros(n), "fee": np.zeros(n), "notional": np.full(n, 1000.0),
+            "side": np.where(np.arange(n) % 2 == 0, 1.0, -1.0), "equity": np.full(n, 10000.0)
+        }
+        result = self.simulator_cls(n_scenarios=200, slippage=0.01, resample=False).simulate(trades, 10000)
+        self.assertTrue((np.diff(result["equity_bands"]["p95"]) < 0).all())
+        self.assertLess(result["summary"].loc["final_value", "p95"], 10000)
+
+    def test_requires_recorded_equity_curve(self):
+        report = self.engine.run(mode="loop", commission=0.001, record=False)
+        with self.assertRaises(ValueError):
+            self.simulator_cls(n_scenarios=10).run(self.engine, report)
+
+    def test_bands_are_ordered(self):
+        result = self.simulator_cls(n_scenarios=300, chunk_size=64).run(self.engine, self.report)
+        bands = result["equity_bands"].values
+        self.assertTrue((np.diff(bands, axis=1) >= -1e-9).all())
+        self.assertTrue(0.0 <= result["prob_loss"] <= 1.0)
+        self.assertTrue((result["summary"].loc["max_drawdown"] >= 0).all())
+
+
+class OrderSimulatorTests(unittest.TestCase):
+    """事件驱动撮合模拟器测试"""
+
+    def setUp(self):
+        from backend.backtest.order_simulator import OrderSimulator
+        from backend.models.order_model import OrderStatus
+        self.status = OrderStatus
+        self.sim = OrderSimulator(maker_fee=0.0, taker_fee=0.0)
+
+    def test_limit_order_fills_at_limit_or_better_open(self):
+        order = self.sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=95)
+        self.assertEqual(self.sim.process_bar("BTC/USDT", 0, 100, 101, 96, 100), [])
+        fills = self.sim.process_bar("BTC/USDT", 1, 100, 100, 90, 92)
+        self.assertEqual(fills[0]["price"], 95)
+        self.assertEqual(order.status, self.status.FILLED)
+        gap = self.sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=95)
+        self.assertEqual(self.sim.process_bar("BTC/USDT", 2, 90, 91, 89, 90)[0]["price"], 90)
+        self.assertEqual(gap.filled, 1)
+
+    def test_stop_and_take_profit(self):
+        stop = self.sim.create_order("BTC/USDT", "sell", "stop", amount=1, price=95)
+        tp = self.sim.create_order("BTC/USDT", "sell", "take_profit", amount=1, price=110)
+        fills = self.sim.process_bar("BTC/USDT", 0, 90, 92, 88, 91)  # 跳空低开，止损按开盘价成交
+        self.assertEqual([f["client_order_id"] for f in fills], [stop.client_order_id])
+        self.assertEqual(fills[0]["price"], 90)
+        fills = self.sim.process_bar("BTC/USDT", 1, 105, 112, 104, 111)
+        self.assertEqual(fills[0]["client_order_id"], tp.client_order_id)
+        self.assertEqual(fills[0]["price"], 110)
+
+    def test_cancel_and_immediate_orders(self):
+        resting = self.sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=99)
+        self.assertTrue(self.sim.cancel(resting.client_order_id))
+        sim = self.sim.__class__(maker_fee=0.0, taker_fee=0.0, max_volume_pct=0.5)
+        ioc = sim.create_order("BTC/USDT", "buy", "ioc", amount=10, price=101)
+        fok = sim.create_order("BTC/USDT", "buy", "fok", amount=10, price=101)
+        fills = sim.process_bar("BTC/USDT", 0, 100, 101, 99, 100, volume=8)
+        self.assertEqual(self.sim.process_bar("BTC/USDT", 0, 100, 100, 90, 95), [])
+        self.assertEqual(len(fills), 1)
+        self.assertEqual(ioc.filled, 4)
+        self.assertEqual(ioc.status, self.status.CANCELED)
+        self.assertEqual(fok.status, self.status.EXPIRED)
+
+    def test_many_resting_orders_only_triggered_are_popped(self):
+        for k in range(20000):
+            self.sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=50 + k * 0.001)
+        fills = self.sim.process_bar("BTC/USDT", 0, 100, 101, 68.9995, 80)
+        self.assertEqual(len(fills), 1000)
+        self.assertEqual(len(self.sim.open_orders("BTC/USDT")), 19000)
+
+    def test_open_orders_index_tracks_order_lifecycle(self):
+        sim = self.sim.__class__(maker_fee=0.0, taker_fee=0.0, max_volume_pct=0.5)
+        filled = sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=95)
+        partial = sim.create_order("BTC/USDT", "buy", "limit", amount=10, price=94)
+        canceled = sim.create_order("BTC/USDT", "sell", "limit", amount=1, price=120)
+        fok = sim.create_order("BTC/USDT", "buy", "fok", amount=10, price=101)
+        other = sim.create_order("ETH/USDT", "buy", "limit", amount=1, price=10)
+        self.assertEqual(len(sim.open_orders()), 5)
+
+        sim.cancel(canceled.client_order_id)
+        sim.process_bar("BTC/USDT", 0, 100, 100, 90, 95, volume=10)  # 可成交 5：先成交 95，再部分成交 94
+        self.assertEqual(fok.status, self.status.EXPIRED)
+        self.assertEqual(filled.status, self.status.FILLED)
+        self.assertEqual(partial.status, self.status.PARTIALLY_FILLED)
+        self.assertEqual(sim.open_orders("BTC/USDT"), [partial])
+        self.assertEqual(sim.open_orders(), [partial, other])
+
+    def test_canceled_orders_are_pruned_from_heap(self):
+        orders = [self.sim.create_order("BTC/USDT", "buy", "limit", amount=1, price=50 + k) for k in range(100)]
+        for order in orders[:60]:
+            self.sim.cancel(order.client_order_id)
+        self.assertLess(len(self.sim._heaps[("BTC/USDT", "falling")]), 60)
+        self.assertEqual(len(self.sim.open_orders("BTC/USDT")), 40)
+        fills = self.sim.process_bar("BTC/USDT", 0, 200, 200, 0, 100)
+        self.assertEqual([f["client_order_id"] for f in fills], [o.client_order_id for o in reversed(orders[60:])])
+
+    def test_engine_event_driven_run(self):
+        engine = BacktestEngineFactory.build()
+
+        def on_bar(symbol, kline, simulator):
+            if not simulator.open_orders(symbol):
+                simulator.create_order(symbol, "buy", "limit", amount=0.1, price=kline["close"] * 0.995)
+
+        report = engine.run_event_driven(on_bar)
+        trades = [t for ts in engine.history.values() for t in ts]
+        self.assertGreater(len(trades), 0)
+        self.assertEqual(len(report["portfolio"]["equity_curve"]), engine.market.n_bars)
+        cash = 10000 - sum(t["price"] * t["amount"] + t["commission"] for t in trades)
+        held = sum(t["amount"] for t in engine.history["BTC/USDT"])
+        final = cash + held * engine.market.columns[0]["close"][-1]
+        self.assertAlmostEqual(report["portfolio"]["final_value"] - final, sum(
+            sum(t["amount"] for t in engine.history[sym]) * engine.market.columns[s]["close"][-1]
+            for s, sym in enumerate(engine.market.symbols) if sym != "BTC/USDT"
+        ), places=6)
+
+
+class StreamingMetricsTests(unittest.TestCase):
+    """流式绩效统计测试"""
+
+    def setUp(self):
+        from backend.backtest.metrics import StreamingMetrics
+        self.metrics_cls = StreamingMetrics
+        rng = np.random.default_rng(7)
+        self.equity = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+        self.timestamps = np.arange(500, dtype=np.int64) * 3600000
+
+    def test_online_matches_batch_summary(self):
+        from backend.backtest.optimizer import summarize_equity
+        metrics = self.metrics_cls(10000, bar_ms=3600000)
+        for value in self.equity:
+            metrics.update(value)
+        snap = metrics.snapshot()
+        final, total_return, max_drawdown, sharpe, _ = summarize_equity(self.equity, self.timestamps, 0, 10000)
+        self.assertAlmostEqual(snap["equity"], final)
+        self.assertAlmostEqual(snap["return"], total_return)
+        self.assertAlmostEqual(snap["max_drawdown"], max_drawdown)
+        self.assertAlmostEqual(snap["sharpe"], sharpe, places=9)
+        returns = np.diff(self.equity) / self.equity[:-1]
+        downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+        self.assertAlmostEqual(snap["sortino"], returns.mean() / downside * np.sqrt(365 * 24), places=9)
+
+    def test_chunked_batches_match_bar_by_bar(self):
+        online = self.metrics_cls(10000, bar_ms=3600000)
+        batched = self.metrics_cls(10000, bar_ms=3600000)
+        for value in self.equity:
+            online.update(value, 0.5)
+        for chunk in np.array_split(self.equity, 7):
+            batched.update_batch(chunk, np.full(len(chunk), 0.5))
+        for key, value in online.snapshot().items():
+            self.assertAlmostEqual(batched.snapshot()[key], value, places=9, msg=key)
+
+    def test_trade_segments(self):
+        metrics = self.metrics_cls(10000)
+        metrics.record_fill("BTC/USDT", 1, 100, 2, 1)    # 开仓
+        metrics.record_fill("BTC/USDT", 1, 110, 1, 1)    # 盈利段 2×10-1
+        metrics.record_fill("BTC/USDT", -1, 105, 3, 1)   # 亏损段 3×(-5)-1
+        snap = metrics.snapshot()
+        self.assertEqual(snap["n_trades"], 2)
+        self.assertEqual(snap["win_rate"], 0.5)
+        self.assertAlmostEqual(snap["profit_factor"], 19 / 16)
+        self.assertAlmostEqual(metrics.symbol_snapshot()["BTC/USDT"]["total_return"], (19 - 16 - 1) / 10000)
+
+    def test_engine_modes_agree_and_record_flag(self):
+        loop = BacktestEngineFactory.build()
+        loop_report = loop.run(mode="loop", commission=0.001, slippage=0.0005)
+        vec = BacktestEngineFactory.build()
+        vec_report = vec.run(mode="vectorized", commission=0.001, slippage=0.0005)
+        for key in ("max_drawdown", "sharpe", "sortino", "win_rate", "profit_factor", "exposure"):
+            self.assertAlmostEqual(vec_report["portfolio"][key], loop_report["portfolio"][key], places=6, msg=key)
+
+        calls = []
+        lean = BacktestEngineFactory.build()
+        lean_report = lean.run(
+            mode="loop", commission=0.001, slippage=0.0005, record=False,
+            progress=lambda i, snap: calls.append((i, snap["equity"])), progress_every=100
+        )
+        self.assertIsNone(lean_report["portfolio"]["equity_curve"])
+        self.assertEqual(sum(len(t) for t in lean.history.values()), 0)
+        self.assertEqual(lean_report["portfolio"]["sharpe"], loop_report["portfolio"]["sharpe"])
+        self.assertEqual(lean_report["symbols"], loop_report["symbols"])
+        self.assertEqual([i for i, _ in calls], [99, 199, 299, 399])
+        self.assertEqual(calls[1][1], loop_report["portfolio"]["equity_curve"].iloc[199])
+
+    def test_vectorized_record_flag(self):
+        full = BacktestEngineFactory.build()
+        full_report = full.run(mode="vectorized", commission=0.001, slippage=0.0005)
+        lean = BacktestEngineFactory.build()
+        lean_report = lean.run(mode="vectorized", commission=0.001, slippage=0.0005, record=False)
+        self.assertIsNone(lean_report["portfolio"]["equity_curve"])
+        self.assertEqual(len(lean.history), 0)
+        self.assertEqual(len(lean.equity), 0)
+        self.assertGreater(len(full.history), 0)
+        for key in ("final_value", "max_drawdown", "sharpe", "win_rate", "profit_factor"):
+            self.assertEqual(lean_report["portfolio"][key], full_report["portfolio"][key], msg=key)
+
+
+class CheckpointTests(unittest.TestCase):
+    """检查点与断点续跑测试"""
+
+    def test_vectorized_rejects_loop_only_options(self):
+        engine = BacktestEngineFactory.build()
+        for options in ({"checkpoint_path": "bt.ckpt"}, {"resume": True}, {"progress": lambda i, snap: None}):
+            with self.assertRaises(ValueError, msg=str(options)):
+                engine.run(mode="vectorized", **options)
+
+    def test_resume_matches_uninterrupted_run(self):
+        import os
+        import tempfile
+
+        kwargs = dict(mode="loop", commission=0.001, slippage=0.0005)
+        reference = BacktestEngineFactory.build()
+        expected = reference.run(**kwargs)
+
+        def crash(i, snapshot):
+            raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.ckpt")
+            engine = BacktestEngineFactory.build()
+            with self.assertRaises(KeyboardInterrupt):
+                engine.run(checkpoint_path=path, checkpoint_interval=0, progress=crash, progress_every=250, **kwargs)
+            self.assertTrue(os.path.exists(path))
+
+            with self.assertRaises(ValueError):
+                BacktestEngineFactory.build().run(
+                    mode="loop", commission=0.002, slippage=0.0005, checkpoint_path=path, resume=True
+                )
+            # 形状相同但内容不同的行情不能续跑
+            other = BacktestEngineFactory.build()
+            other.load_data(
+                symbols=["BTC/USDT", "ETH/USDT", "SOL/USDT"],
+                klines_map={
+                    "BTC/USDT": make_klines(4),
+                    "ETH/USDT": make_klines(5, drop_every=7),
+                    "SOL/USDT": make_klines(6, n_bars=300, start="2023-01-03"),
+                },
+            )
+            self.assertEqual(other.market.valid.shape, engine.market.valid.shape)
+            with self.assertRaises(ValueError):
+                other.run(checkpoint_path=path, resume=True, **kwargs)
+
+            resumed = BacktestEngineFactory.build()
+            report = resumed.run(checkpoint_path=path, resume=True, **kwargs)
+            self.assertFalse(os.path.exists(path))
+            self.assertFalse(os.path.exists(path + ".rows"))
+
+        np.testing.assert_allclose(
+            report["portfolio"]["equity_curve"].values, expected["portfolio"]["equity_curve"].values, rtol=1e-12
+        )
+        self.assertEqual(report["portfolio"]["sharpe"], expected["portfolio"]["sharpe"])
+        self.assertEqual(report["symbols"], expected["symbols"])
+        for symbol, trades in reference.history.items():
+            self.assertEqual(
+                [t["price"] for t in resumed.history[symbol]], [t["price"] for t in trades]
+            )
+
+
+    def test_checkpoint_size_does_not_grow_with_progress(self):
+        import os
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.ckpt")
+            sizes = []
+            BacktestEngineFactory.build().run(
+                mode="loop", checkpoint_path=path, checkpoint_interval=0,
+                progress=lambda i, snapshot: sizes.append(os.path.getsize(path)), progress_every=100
+            )
+        self.assertEqual(len(sizes), 4)
+        self.assertLess(max(sizes) - min(sizes), 1024)
+
+
+class StreamingBacktestTests(unittest.TestCase):
+    """分块流式回测测试"""
+
+    def setUp(self):
+        import tempfile
+        from backend.backtest.streaming import ParquetChunkFeed
+        self.reference = BacktestEngineFactory.build()
+        self.tmp = tempfile.TemporaryDirectory()
+        sources = {}
+        for k, (symbol, df) in enumerate(self.reference.symbol_data.items()):
+            sources[symbol] = f"{self.tmp.name}/{k}.parquet"
+            df.to_parquet(sources[symbol])
+        self.feed = ParquetChunkFeed(sources, chunk_rows=37)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_are_time_ordered_and_complete(self):
+        last, counts = None, {sym: 0 for sym in self.feed.symbols}
+        for chunk in self.feed:
+            times = np.concatenate([df.index.values for df in chunk.values()])
+            if last is not None and len(times):
+                self.assertGreater(times.min(), last)
+            last = times.max() if len(times) else last
+            for sym, df in chunk.items():
+                counts[sym] += len(df)
+        self.assertEqual(counts, {sym: len(df) for sym, df in self.reference.symbol_data.items()})
+
+    def test_streaming_matches_in_memory_run(self):
+        kwargs = dict(commission=0.001, slippage=0.0005)
+        expected = self.reference.run(mode="loop", **kwargs)
+        engine = MultiBacktestEngine(initial_balance=10000, strategy=MomentumStrategy(), seed=42)
+        engine.allocator = EqualWeightAllocator()
+        report = engine.run_streaming(self.feed, lookback=10, record=True, **kwargs)
+        pd.testing.assert_series_equal(
+            report["portfolio"]["equity_curve"], expected["portfolio"]["equity_curve"], check_freq=False
+        )
+        self.assertAlmostEqual(report["portfolio"]["final_value"], expected["portfolio"]["final_value"], places=9)
+        self.assertEqual(report["symbols"], expected["symbols"])
+
+
+class TradeStoreTests(unittest.TestCase):
+    """列式成交记录测试"""
+
+    def test_growth_and_arrow_export(self):
+        import pyarrow as pa
+        from backend.backtest.trade_store import TradeStore
+        store = TradeStore(capacity=2)
+        for k in range(1000):
+            store.record("BTC/USDT" if k % 3 else "ETH/USDT", 1672531200000 + k * 60000, 1 if k % 2 else -1, 100 + k, 0.5, 0.01)
+        self.assertEqual(len(store), 1000)
+        self.assertEqual(store.symbols, ["ETH/USDT", "BTC/USDT"])
+        table = store.to_arrow()
+        self.assertEqual(table.num_rows, 1000)
+        self.assertEqual(table.schema.field("time").type, pa.timestamp("ms"))
+        # 数值列直接引用缓冲区内存
+        price = table.column("price").chunk(0)
+        self.assertEqual(price.buffers()[1].address, store.column("price").ctypes.data)
+        self.assertEqual(table.column("symbol").to_pylist()[:3], ["ETH/USDT", "BTC/USDT", "BTC/USDT"])
+
+    def test_engine_history_is_columnar(self):
+        import os
+        import tempfile
+        import pyarrow.parquet as pq
+        engine = BacktestEngineFactory.build()
+        engine.run(mode="vectorized", commission=0.001, slippage=0.0)
+        trades = engine.history.to_frame()
+        self.assertGreater(len(trades), 0)
+        self.assertEqual(str(engine.history.column("side").dtype), "int8")
+        btc = engine.history["BTC/USDT"]
+        self.assertEqual(len(btc), (trades["symbol"] == "BTC/USDT").sum())
+        self.assertAlmostEqual(sum(t["pnl"] for t in btc), trades.loc[trades["symbol"] == "BTC/USDT", "pnl"].sum())
+        with tempfile.TemporaryDirectory() as tmp:
+            engine.equity.to_parquet(os.path.join(tmp, "equity.parquet"))
+            self.assertEqual(pq.read_table(os.path.join(tmp, "equity.parquet")).num_rows, engine.market.n_bars)
+
+    def test_repeated_runs_do_not_accumulate(self):
+        engine = BacktestEngineFactory.build()
+        counts, reports = [], []
+        for mode in ("loop", "loop", "vectorized"):
+            reports.append(engine.run(mode=mode, commission=0.001, slippage=0.0))
+            counts.append(len(engine.history))
+        self.assertGreater(counts[0], 0)
+        self.assertEqual(counts, [counts[0]] * 3)
+        self.assertEqual(reports[1]["symbols"], reports[0]["symbols"])
+        self.assertEqual(len(engine.equity), engine.market.n_bars)
+
+
+class TickStoreTests(unittest.TestCase):
+    """逐笔成交存储测试"""
+
+    def make_ticks(self, n=20000, days=2):
+        rng = np.random.default_rng(0)
+        origin = int(pd.Timestamp("2023-01-01").value // 10**6)
+        return {
+            "time": np.sort(origin + rng.integers(0, days * 86400000, n)),
+            "price": np.round(20000 + np.cumsum(rng.normal(0, 0.5, n)), 2),
+            "size": rng.exponential(0.05, n).astype(np.float32),
+            "side": np.where(rng.random(n) < 0.5, 1, -1).astype(np.int8),
+            "id": np.arange(n) + 10**9,
+        }
+
+    def test_round_trip_and_range_read(self):
+        import os
+        import tempfile
+        from backend.backtest.tick_store import TickStore
+        ticks = self.make_ticks()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TickStore(tmp, row_group_size=1000)
+            store.write("BTC/USDT", **ticks)
+            self.assertEqual([d.day for d in store.days("BTC/USDT")], [1, 2])
+            data = store.read("BTC/USDT")
+            np.testing.assert_array_equal(data["time"], ticks["time"])
+            np.testing.assert_array_equal(data["id"], ticks["id"])
+            np.testing.assert_array_equal(data["side"], ticks["side"])
+            np.testing.assert_allclose(data["price"], ticks["price"], rtol=0, atol=1e-9)
+            self.assertEqual(data["size"].dtype, np.float32)
+            size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(tmp) for f in files)
+            self.assertLess(size, len(ticks["time"]) * 12)  # 远小于未压缩的 29 字节/笔
+
+            start, end = pd.Timestamp("2023-01-01 23:00"), pd.Timestamp("2023-01-02 01:00")
+            mask = (ticks["time"] >= start.value // 10**6) & (ticks["time"] <= end.value // 10**6)
+            frame = store.read_frame("BTC/USDT", start=start, end=end, columns=["price"])
+            self.assertEqual(list(frame.columns), ["price"])
+            np.testing.assert_allclose(frame["price"].to_numpy(), ticks["price"][mask], atol=1e-9)
+
+            # 重叠写入按成交编号去重
+            self.assertEqual(store.write("BTC/USDT", **{k: v[:500] for k, v in ticks.items()}), 500)
+            self.assertEqual(len(store.read("BTC/USDT", columns=["time"])["time"]), len(ticks["time"]))
+
+    def test_range_read_skips_other_row_groups(self):
+        import tempfile
+        from unittest import mock
+        import pyarrow.parquet as pq
+        from backend.backtest.tick_store import TickStore
+        ticks = self.make_ticks(days=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TickStore(tmp, row_group_size=1000)
+            store.write("BTC/USDT", **ticks)
+            with mock.patch.object(pq.ParquetFile, "read_row_group", autospec=True,
+                                   side_effect=pq.ParquetFile.read_row_group) as read_row_group:
+                data = store.read("BTC/USDT", start=pd.Timestamp("2023-01-01 12:00"), end=pd.Timestamp("2023-01-01 12:30"))
+            self.assertGreater(len(data["time"]), 0)
+            self.assertLessEqual(read_row_group.call_count, 2)
+
+
+class EnsembleTests(unittest.TestCase):
+    """多策略集成回测测试"""
+
+    def setUp(self):
+        from backend.backtest.ensemble import EnsembleBacktester
+        self.strategies = {
+            "5/10": CrossoverStrategy(5, 10),
+            "5/20": CrossoverStrategy(5, 20),
+            "10/20": CrossoverStrategy(10, 20),
+        }
+        self.ensemble = EnsembleBacktester(self.strategies)
+
+    def test_matches_individual_runs_and_shares_indicators(self):
+        engine = BacktestEngineFactory.build()
+        summary = self.ensemble.run(engine, commission=0.001, slippage=0.0005)
+        self.assertEqual(list(summary.index), list(self.strategies))
+        # 3 个币种 × 3 个不同周期的 SMA 只计算一次，其余读取均命中缓存
+        self.assertEqual(self.ensemble.cache.misses, 9)
+        self.assertEqual(self.ensemble.cache.hits, 9)
+
+        for name, strategy in self.strategies.items():
+            single = BacktestEngineFactory.build(strategy=strategy)
+            report = single.run(mode="loop", commission=0.001, slippage=0.0005)
+            np.testing.assert_allclose(
+                self.ensemble.reports[name]["portfolio"]["equity_curve"].values,
+                report["portfolio"]["equity_curve"].values,
+                rtol=1e-9,
+            )
+            self.assertAlmostEqual(summary.loc[name, "sharpe"], report["portfolio"]["sharpe"], places=6)
+            self.assertEqual(len(self.ensemble.trades[name]), len(single.history))
+
+    def test_engine_state_is_restored(self):
+        engine = BacktestEngineFactory.build()
+        strategy = engine.strategy
+        self.ensemble.run(engine)
+        self.assertIs(engine.strategy, strategy)
+        self.assertEqual(len(engine.history), 0)
+
+
+class ResultCacheTests(unittest.TestCase):
+    """回测结果缓存测试"""
+
+    def test_identical_run_is_served_from_cache(self):
+        import tempfile
+        from backend.backtest.result_cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp)
+            first = BacktestEngineFactory.build(strategy=CrossoverStrategy(5, 20))
+            first.result_cache = cache
+            expected = first.run(mode="loop", commission=0.001, slippage=0.0005)
+            self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 1, 1))
+
+            second = BacktestEngineFactory.build(strategy=CrossoverStrategy(5, 20))
+            second.result_cache = ResultCache(tmp)  # 新进程：从磁盘恢复索引
+            report = second.run(mode="loop", commission=0.001, slippage=0.0005)
+            self.assertEqual(second.result_cache.hits, 1)
+            pd.testing.assert_series_equal(report["portfolio"]["equity_curve"], expected["portfolio"]["equity_curve"])
+            self.assertEqual(report["symbols"], expected["symbols"])
+            self.assertEqual(len(second.history), len(first.history))
+
+            # 策略参数、手续费或种子变化时重新回测
+            for engine, kwargs in (
+                (BacktestEngineFactory.build(strategy=CrossoverStrategy(5, 10)), {"commission": 0.001}),
+                (BacktestEngineFactory.build(strategy=CrossoverStrategy(5, 20)), {"commission": 0.002}),
+                (BacktestEngineFactory.build(strategy=CrossoverStrategy(5, 20), seed=7), {"commission": 0.001}),
+            ):
+                engine.result_cache = cache
+                engine.run(mode="loop", slippage=0.0005, **kwargs)
+            self.assertEqual((cache.hits, len(cache)), (0, 4))
+
+    def test_repeated_runs_cache_only_their_own_trades(self):
+        import tempfile
+        from backend.backtest.result_cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = BacktestEngineFactory.build()
+            engine.result_cache = ResultCache(tmp)
+            engine.run(mode="loop", commission=0.002, slippage=0.0005)  # 不同输入的先前回测
+            report = engine.run(mode="loop", commission=0.001, slippage=0.0005)
+            n_trades = len(engine.history)
+            fresh = BacktestEngineFactory.build()
+            fresh.run(mode="loop", commission=0.001, slippage=0.0005)
+            self.assertEqual(n_trades, len(fresh.history))
+
+            cached = engine.run(mode="loop", commission=0.001, slippage=0.0005)
+            self.assertEqual(engine.result_cache.hits, 1)
+            self.assertEqual(len(engine.history), n_trades)
+            self.assertEqual(cached["symbols"], report["symbols"])
+
+    def test_lru_eviction_by_size(self):
+        import tempfile
+        from backend.backtest.result_cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = np.zeros(1000)  # 每个结果约 8KB
+            cache = ResultCache(tmp, max_bytes=30000)
+            for key in ("a", "b", "c"):
+                cache.put(key, payload)
+            cache.get("a")          # a 变为最近使用
+            cache.put("d", payload)  # 超出上限，淘汰最久未使用的 b
+            self.assertEqual(sorted(ResultCache(tmp, max_bytes=30000)._index), ["a", "c", "d"])
+            self.assertIsNone(cache.get("b"))
+            self.assertLessEqual(cache.total_bytes, 30000)
+
+
+class FrameCacheTests(unittest.TestCase):
+    """内存上限 LRU 缓存测试"""
+
+    @staticmethod
+    def frame(n):
+        return pd.DataFrame({"close": np.arange(n, dtype=np.float64)}, index=pd.date_range("2023-01-01", periods=n, freq="1H"))
+
+    def test_lru_eviction_by_bytes(self):
+        from backend.backtest.frame_cache import FrameCache, frame_nbytes
+
+        size = frame_nbytes(self.frame(100))
+        cache = FrameCache(max_bytes=size * 2)
+        cache.put("a", self.frame(100))
+        cache.put("b", self.frame(100))
+        cache.get("a")
+        cache.put("c", self.frame(100))  # 淘汰最久未使用的 b
+        self.assertEqual(list(cache), ["a", "c"])
+        self.assertIsNone(cache.get("b"))
+        cache.put("huge", self.frame(1000))  # 超过上限，不缓存
+        self.assertNotIn("huge", cache)
+        self.assertEqual(cache.stats(), {
+            "entries": 2, "bytes": size * 2, "max_bytes": size * 2, "hits": 1, "misses": 1, "evictions": 1
+        })
+
+    def test_hits_are_read_only_views(self):
+        from backend.backtest.frame_cache import FrameCache
+
+        cache = FrameCache()
+        cache.put("a", self.frame(10))
+        first, second = cache.get("a"), cache.get("a")
+        self.assertTrue(np.shares_memory(first["close"].to_numpy(), second["close"].to_numpy()))
+        with self.assertRaises(ValueError):
+            first.iloc[0, 0] = 1.0
+        first["extra"] = 1.0  # 视图上新增列不影响缓存
+        self.assertEqual(list(cache.get("a").columns), ["close"])
+
+
+class CompactFrameTests(unittest.TestCase):
+    """紧凑列类型测试"""
+
+    @staticmethod
+    def decimal_klines(seed):
+        """价格保留 2 位小数、成交量保留 3 位小数的K线"""
+        return [{k: v if k == "time" else round(v, 2 if k != "volume" else 3) for k, v in row.items()} for row in make_klines(seed)]
+
+    def test_float32_only_where_precision_allows(self):
+        from backend.backtest.compact import compact_frame, expand_frame, memory_report, stack_frames
+
+        index = pd.date_range("2023-01-01", periods=1000, freq="1H", name="timestamp")
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "close": np.round(20000 + np.cumsum(rng.normal(0, 5, 1000)), 1),
+            "raw": rng.normal(size=1000),            # 非定点小数，保持 float64
+            "wide": np.round(rng.uniform(1e6, 1e7, 1000), 4),  # 有效位数超过 float32
+            "exchange": "binance",
+        }, index=index)
+        compact = compact_frame(df)
+        self.assertEqual(compact.index.tolist(), (index.asi8 // 10**6).tolist())
+        self.assertEqual(
+            {name: str(dtype) for name, dtype in compact.dtypes.items()},
+            {"close": "float32", "raw": "float64", "wide": "float64", "exchange": "category"}
+        )
+        pd.testing.assert_frame_equal(expand_frame(compact), df, check_exact=True, check_freq=False)
+        self.assertLess(memory_report(compact)["bytes"], memory_report(df)["bytes"] / 2)
+
+        stacked = stack_frames({"BTC/USDT": df[["close"]].iloc[:3], "ETH/USDT": df[["close"]].iloc[:2]})
+        self.assertEqual(stacked["symbol"].cat.codes.tolist(), [0, 0, 0, 1, 1])
+        self.assertEqual(stacked["close"].dtype, np.float32)
+
+    def test_engine_compact_mode(self):
+        def build(compact):
+            engine = MultiBacktestEngine(initial_balance=10000, strategy=MomentumStrategy(), seed=42)
+            engine.allocator = EqualWeightAllocator()
+            engine.compact = compact
+            engine.load_data(["BTC/USDT", "ETH/USDT"], {"BTC/USDT": self.decimal_klines(1), "ETH/USDT": self.decimal_klines(2)})
+            return engine
+
+        default, compact = build(False), build(True)
+        self.assertEqual(compact.market.fields["close"].dtype, np.float32)
+        np.testing.assert_array_equal(compact.market.timestamps, default.market.timestamps)
+        default_usage, compact_usage = default.memory_usage(), compact.memory_usage()
+        self.assertLess(compact_usage["market"]["fields"], default_usage["market"]["fields"] * 0.6)
+        self.assertLess(compact_usage["bytes"], default_usage["bytes"] * 0.7)
+        self.assertEqual(compact_usage["symbols"]["BTC/USDT"]["index"]["dtype"], "int64")
+
+        # float32 价格只引入舍入误差（个别恰好等于均线的信号可能翻转），结果应基本一致
+        expected = default.run(mode="vectorized")["portfolio"]
+        actual = compact.run(mode="vectorized")["portfolio"]
+        np.testing.assert_allclose(actual["equity_curve"].values, expected["equity_curve"].values, rtol=1e-3)
+        self.assertEqual(
+            {sym: len(trades) for sym, trades in compact.history.items()},
+            {sym: len(trades) for sym, trades in default.history.items()}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,479 @@
+"""
+CryptoTrader 历史数据管理测试
+=======================
+
+验证按区间增量下载（只请求缺失的头部、尾部和中间缺口，合并后去重）、按月分区存储、热数据内存映射、多币种并发下载、由 1m 数据增量聚合多周期K线、数据质量索引和紧凑列类型模式。
+"""
+
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pytest
+
+historical_module = pytest.importorskip("backend.backtest.historical_data")
+HistoricalDataManager = historical_module.HistoricalDataManager
+merge_intervals = historical_module.merge_intervals
+missing_intervals = historical_module.missing_intervals
+resample_klines = historical_module.resample_klines
+fill_missing_data = historical_module.fill_missing_data
+from backend.utils.data_processor import validate_data_quality
+
+HOUR_MS = 3600 * 1000
+ORIGIN_MS = int(pd.Timestamp("2023-01-01").value // 10**6)
+
+
+class FakeExchange:
+    """模拟交易所：从 2023-01-01 起每小时一根K线，每页最多 limit 根，记录每次请求的 since"""
+
+    def __init__(self, n_bars: int = 24 * 60, fail_after: int = None):
+        self.n_bars = n_bars
+        self.fail_after = fail_after
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        if self.fail_after is not None and len(self.calls) >= self.fail_after:
+            raise ConnectionError("network down")
+        self.calls.append(since)
+        first = max(0, -(-(since - ORIGIN_MS) // HOUR_MS))
+        rows = []
+        for k in range(first, min(first + limit, self.n_bars)):
+            price = 100 + np.sin(k / 10)
+            rows.append([ORIGIN_MS + k * HOUR_MS, price, price + 0.1, price - 0.1, price, 1.0])
+        return rows
+
+
+class FakeConnector:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def get_exchange(self, name):
+        return self.exchange
+
+
+class IntervalTests(unittest.TestCase):
+    """区间运算测试"""
+
+    def test_merge_and_missing(self):
+        covered = merge_intervals([[5, 8], [0, 2], [2, 4], [7, 10]])
+        self.assertEqual(covered, [[0, 4], [5, 10]])
+        self.assertEqual(missing_intervals(-3, 12, covered), [[-3, 0], [4, 5], [10, 12]])
+        self.assertEqual(missing_intervals(1, 3, covered), [])
+
+
+class GapFillingTests(unittest.TestCase):
+    """增量下载测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.exchange = FakeExchange()
+        self.manager = HistoricalDataManager(FakeConnector(self.exchange), data_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fetch(self, start, end, manager=None):
+        return (manager or self.manager).fetch_historical_data("BTC/USDT", start_date=start, end_date=end)
+
+    def test_only_missing_ranges_are_downloaded(self):
+        df = self.fetch("2023-01-10", "2023-01-20")
+        self.assertEqual(len(df), 10 * 24 + 1)
+        self.assertEqual(len(self.exchange.calls), 1)
+
+        # 内存和磁盘缓存命中：不再请求
+        self.fetch("2023-01-12", "2023-01-18")
+        self.fetch("2023-01-12", "2023-01-18", HistoricalDataManager(FakeConnector(self.exchange), self.tmp.name))
+        self.assertEqual(len(self.exchange.calls), 1)
+
+        # 向两端扩展：只下载头部和尾部
+        self.exchange.calls.clear()
+        df = self.fetch("2023-01-05", "2023-01-25")
+        self.assertEqual(
+            self.exchange.calls,
+            [ORIGIN_MS + 4 * 24 * HOUR_MS, ORIGIN_MS + (19 * 24 + 1) * HOUR_MS],
+        )
+        self.assertEqual(len(df), 20 * 24 + 1)
+        self.assertTrue(df.index.is_monotonic_increasing and df.index.is_unique)
+        self.assertEqual(self.manager.coverage["binance_BTC/USDT_1h"], [[ORIGIN_MS + 4 * 24 * HOUR_MS, ORIGIN_MS + (24 * 24 + 1) * HOUR_MS]])
+
+    def test_internal_gap_and_partial_failure(self):
+        self.fetch("2023-01-01", "2023-01-05")
+        self.fetch("2023-01-20", "2023-01-25")
+        self.exchange.calls.clear()
+        self.exchange.fail_after = 0  # 下载失败：不记录为已覆盖
+        self.fetch("2023-01-01", "2023-01-25")
+        self.assertEqual(len(self.manager.coverage["binance_BTC/USDT_1h"]), 2)
+
+        self.exchange.fail_after = None
+        df = self.fetch("2023-01-01", "2023-01-25")
+        self.assertEqual(self.exchange.calls, [ORIGIN_MS + (4 * 24 + 1) * HOUR_MS])
+        self.assertEqual(len(df), 24 * 24 + 1)
+        self.assertEqual(len(self.manager.coverage["binance_BTC/USDT_1h"]), 1)
+
+    def test_short_piece_is_not_filtered(self):
+        # 样本太少无法估计标准差：3 根K线全部保留
+        index = pd.date_range("2023-01-01", periods=3, freq="1H", name="timestamp")
+        piece = pd.DataFrame({"open": 100.0, "high": 102.0, "low": 99.0, "close": [100, 100.5, 101.1], "volume": 1.0}, index=index)
+        interval = [[ORIGIN_MS, ORIGIN_MS + 3 * HOUR_MS]]
+        self.assertEqual(self.manager._store_klines("BTC/USDT", "binance", "1h", piece, interval), (3, interval))
+
+    def test_outlier_uses_stored_context_and_stays_missing(self):
+        self.fetch("2023-01-01", "2023-01-10")
+        spike_ms = ORIGIN_MS + (24 * 9 + 5) * HOUR_MS
+        fetch = self.exchange.fetch_ohlcv
+
+        def with_spike(**kwargs):
+            rows = fetch(**kwargs)
+            return [row[:4] + [row[4] * 1.5, row[5]] if row[0] == spike_ms else row for row in rows]
+
+        self.exchange.fetch_ohlcv = with_spike
+        # 增量下载的数据段只有十几根K线，结合已存储的相邻K线识别异常值
+        df = self.fetch("2023-01-10", "2023-01-10 12:00")
+        self.assertNotIn(pd.to_datetime(spike_ms, unit="ms"), df.index)
+        # 剔除的K线（异常值及其后一根）不登记为已覆盖，下次请求时重新下载
+        missing = self.manager.missing_ranges("BTC/USDT", "binance", "1h", pd.Timestamp("2023-01-01"), pd.Timestamp("2023-01-10 12:00"))
+        self.assertEqual(missing, [[spike_ms, spike_ms + 2 * HOUR_MS]])
+
+
+class PartitionedStoreTests(unittest.TestCase):
+    """按月分区存储测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.exchange = FakeExchange()
+        self.manager = HistoricalDataManager(FakeConnector(self.exchange), data_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_week_slice_reads_single_partition(self):
+        import os
+        self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-02-27")
+        root = self.manager.series_dir("BTC/USDT")
+        self.assertEqual(sorted(os.listdir(root)), ["month=2023-01", "month=2023-02"])
+
+        # 损坏其他月份的分区：按时间过滤时不应打开该分区
+        with open(os.path.join(root, "month=2023-02", "data.parquet"), "wb") as f:
+            f.write(b"not a parquet file")
+        df = self.manager.read_range("BTC/USDT", start="2023-01-09", end="2023-01-15 23:00", columns=["close"])
+        self.assertEqual(list(df.columns), ["close"])
+        self.assertEqual(len(df), 7 * 24)
+        self.assertEqual(df.index[0], pd.Timestamp("2023-01-09"))
+
+    def test_legacy_file_is_migrated(self):
+        import os
+        times = pd.date_range("2023-01-30", periods=72, freq="1H", name="timestamp")
+        legacy = pd.DataFrame({name: np.arange(72.0) for name in ("open", "high", "low", "close", "volume")}, index=times)
+        legacy.to_parquet(self.manager.file_path("BTC/USDT"))
+
+        df = self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-30", end_date="2023-02-01 23:00")
+        self.assertEqual(self.exchange.calls, [])
+        self.assertFalse(os.path.exists(self.manager.file_path("BTC/USDT")))
+        self.assertEqual(sorted(os.listdir(self.manager.series_dir("BTC/USDT"))), ["month=2023-01", "month=2023-02"])
+        pd.testing.assert_frame_equal(df, legacy, check_freq=False)
+
+
+class HotStoreTests(unittest.TestCase):
+    """Arrow IPC 热数据测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.exchange = FakeExchange()
+        self.manager = HistoricalDataManager(FakeConnector(self.exchange), data_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_mapped_reads_are_zero_copy(self):
+        import pyarrow as pa
+        expected = self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-02-10")
+        self.manager.promote_hot("BTC/USDT")
+
+        allocated = pa.total_allocated_bytes()
+        week = self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-09", end_date="2023-01-16")
+        again = self.manager.read_hot("BTC/USDT", start="2023-01-01")
+        self.assertEqual(pa.total_allocated_bytes(), allocated)
+        self.assertTrue(np.shares_memory(week["close"].to_numpy(), again["close"].to_numpy()))
+        self.assertFalse(week["close"].to_numpy().flags.writeable)
+        pd.testing.assert_frame_equal(week, expected.loc["2023-01-09":"2023-01-16 00:00"], check_freq=False)
+
+    def test_hot_file_refreshes_after_new_data(self):
+        self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-01-10")
+        self.manager.promote_hot("BTC/USDT")
+        df = self.manager.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-01-20")
+        self.assertEqual(len(df), 19 * 24 + 1)
+        self.assertEqual(len(self.manager.read_hot("BTC/USDT")), 19 * 24 + 1)
+
+        self.manager.demote_hot("BTC/USDT")
+        self.assertFalse(self.manager.is_hot("BTC/USDT"))
+
+
+class FlakyExchange(FakeExchange):
+    """每隔 flaky_every 次请求抛出一次临时网络错误，并记录同时进行中的请求数"""
+
+    def __init__(self, flaky_every: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        import threading
+        self.flaky_every = flaky_every
+        self.attempts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        import time
+        with self.lock:
+            self.attempts += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            flaky = self.attempts % self.flaky_every == 0
+        try:
+            time.sleep(0.005)
+            if flaky:
+                raise TimeoutError("read timeout")
+            return super().fetch_ohlcv(symbol, timeframe, since, limit)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class AsyncDownloaderTests(unittest.TestCase):
+    """多币种并发下载测试"""
+
+    symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "XRP/USDT", "DOGE/USDT"]
+
+    def setUp(self):
+        from backend.backtest.downloader import AsyncHistoryDownloader
+        self.tmp = tempfile.TemporaryDirectory()
+        self.downloader_cls = AsyncHistoryDownloader
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make(self, exchange, **kwargs):
+        manager = HistoricalDataManager(FakeConnector(exchange), data_dir=self.tmp.name)
+        kwargs = {"max_concurrency": 5, "backoff": 0.001, "page_limit": 100, "budgets": {"binance": (600000, 1)}, **kwargs}
+        return manager, self.downloader_cls(manager, **kwargs)
+
+    def test_concurrent_download_with_retries(self):
+        exchange = FlakyExchange(n_bars=24 * 20)
+        manager, downloader = self.make(exchange)
+        written = downloader.run(self.symbols, start_date="2023-01-01", end_date="2023-01-31")
+        self.assertEqual(downloader.errors, {})
+        self.assertEqual(written, {sym: 24 * 20 for sym in self.symbols})
+        self.assertGreater(exchange.max_in_flight, 1)
+
+        # 数据已全部落盘：再次读取不再请求交易所
+        exchange.calls.clear()
+        for sym in self.symbols:
+            df = manager.fetch_historical_data(sym, start_date="2023-01-01", end_date="2023-01-31")
+            self.assertEqual(len(df), 24 * 20)
+        self.assertEqual(exchange.calls, [])
+
+    def test_interrupted_download_resumes_from_last_page(self):
+        exchange = FakeExchange(fail_after=7)  # 第 8 次请求起持续失败（非临时错误）
+        _, downloader = self.make(exchange, max_concurrency=1)
+        downloader.run(["BTC/USDT"], start_date="2023-01-01", end_date="2023-01-31")
+        self.assertIn("BTC/USDT", downloader.errors)
+
+        exchange.fail_after = None
+        exchange.calls.clear()
+        _, downloader = self.make(exchange)
+        written = downloader.run(["BTC/USDT"], start_date="2023-01-01", end_date="2023-01-31")
+        # 已完成的 7 页不再下载
+        self.assertEqual(exchange.calls[0], ORIGIN_MS + 700 * HOUR_MS)
+        self.assertEqual(written["BTC/USDT"], 30 * 24 + 1 - 700)
+
+    def test_each_month_partition_written_once(self):
+        manager, downloader = self.make(FakeExchange(n_bars=24 * 45))
+        write = manager._write_partitions
+        months = []
+
+        def record(symbol, exchange, timeframe, df):
+            months.extend(sorted(set(df.index.strftime("%Y-%m"))))
+            write(symbol, exchange, timeframe, df)
+
+        manager._write_partitions = record
+        written = downloader.run(["BTC/USDT"], start_date="2023-01-01", end_date="2023-02-14")
+        self.assertEqual(written["BTC/USDT"], 44 * 24 + 1)
+        self.assertEqual(months, ["2023-01", "2023-02"])
+
+    def test_repeated_runs_share_budget(self):
+        # 令牌桶只有 30 个请求的容量：两次下载都需要排队等待，排队锁不能绑定在第一次的事件循环上
+        manager, downloader = self.make(FakeExchange(n_bars=24 * 4), page_limit=10, budgets={"binance": (300, 1)})
+        symbols = self.symbols[:3]
+        first = downloader.run(symbols, start_date="2023-01-01", end_date="2023-01-04")
+        second = downloader.run(symbols, start_date="2023-01-01", end_date="2023-01-05")
+        self.assertEqual(downloader.errors, {})
+        self.assertEqual(first, {sym: 3 * 24 + 1 for sym in symbols})
+        self.assertEqual(second, {sym: 24 * 4 - (3 * 24 + 1) for sym in symbols})
+
+    def test_request_budget_limits_rate(self):
+        import asyncio
+        import time
+        from backend.backtest.downloader import RequestBudget
+
+        async def acquire_all():
+            budget = RequestBudget(weight_per_minute=1200, burst=1)  # 每秒 20 个权重
+            for _ in range(5):
+                await budget.acquire()
+
+        started = time.monotonic()
+        asyncio.run(acquire_all())
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+
+class MinuteExchange:
+    """模拟交易所：从 2023-01-01 起每分钟一根K线，记录每次请求的 (timeframe, since)"""
+
+    def __init__(self, n_bars: int = 3 * 1440):
+        self.n_bars = n_bars
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls.append((timeframe, since))
+        first = max(0, -(-(since - ORIGIN_MS) // 60000))
+        rows = []
+        for k in range(first, min(first + limit, self.n_bars)):
+            price = 100 + np.sin(k / 50)
+            rows.append([ORIGIN_MS + k * 60000, price, price + 0.1, price - 0.1, price, 1.0])
+        return rows
+
+
+class RollupTests(unittest.TestCase):
+    """多周期聚合测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.exchange = MinuteExchange()
+        self.manager = HistoricalDataManager(FakeConnector(self.exchange), data_dir=self.tmp.name, rollups=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rollups_are_built_from_base_series(self):
+        df = self.manager.fetch_historical_data("BTC/USDT", timeframe="4h", start_date="2023-01-01", end_date="2023-01-02")
+        self.assertEqual({tf for tf, _ in self.exchange.calls}, {"1m"})
+        base = self.manager.read_range("BTC/USDT", timeframe="1m")
+        self.assertEqual(base.index[-1], pd.Timestamp("2023-01-02 03:59"))  # 覆盖最后一根4h K线
+        pd.testing.assert_frame_equal(df, resample_klines(base, "4h"), check_freq=False)
+        pd.testing.assert_frame_equal(resample_klines(df, "4h"), df)  # 已对齐的聚合数据直接返回
+
+    def test_rollups_update_incrementally(self):
+        self.manager.fetch_historical_data("BTC/USDT", timeframe="1d", start_date="2023-01-01", end_date="2023-01-01")
+        self.manager.fetch_historical_data("BTC/USDT", timeframe="4h", start_date="2023-01-01", end_date="2023-01-02")
+        daily = self.manager.read_range("BTC/USDT", timeframe="1d")
+        self.assertEqual(daily["volume"].tolist(), [1440.0, 240.0])  # 1月2日只有前4小时
+
+        n_calls = len(self.exchange.calls)
+        self.manager.fetch_historical_data("BTC/USDT", timeframe="1m", start_date="2023-01-01", end_date="2023-01-02 23:59")
+        self.assertGreater(len(self.exchange.calls), n_calls)
+        base = self.manager.read_range("BTC/USDT", timeframe="1m")
+        for timeframe in ("5m", "1h", "4h", "1d"):
+            rollup = self.manager.read_range("BTC/USDT", timeframe=timeframe)
+            pd.testing.assert_frame_equal(rollup, resample_klines(base, timeframe), check_freq=False)
+        df = self.manager.fetch_historical_data("BTC/USDT", timeframe="1d", start_date="2023-01-01", end_date="2023-01-02")
+        self.assertEqual(df["volume"].tolist(), [1440.0, 1440.0])
+
+
+class QualityIndexTests(unittest.TestCase):
+    """数据质量索引测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = HistoricalDataManager(FakeConnector(FakeExchange()), data_dir=self.tmp.name)
+        index = pd.date_range("2023-01-01", "2023-03-31 23:00", freq="1H")
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.005, len(index))))
+        df = pd.DataFrame({
+            "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+            "volume": rng.uniform(1, 2, len(index)),
+        }, index=index)
+        df.iloc[500, 4] = 50.0                            # 异常成交量
+        df.iloc[1000:, :4] *= 1.2                         # 价格异常波动
+        df.iloc[1200, 1] = np.nan                         # 缺失值
+        keep = np.ones(len(df), dtype=bool)
+        keep[300:310] = keep[743:746] = False             # 月内缺口和跨月缺口
+        self.df = df[keep]
+        self.manager._write_partitions("BTC/USDT", "binance", "1h", self.df.iloc[:1500])
+        self.manager._write_partitions("BTC/USDT", "binance", "1h", self.df.iloc[1500:])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_report_matches_full_scan(self):
+        for start, end in [(None, None), ("2023-01-10", "2023-02-20 05:00")]:
+            df = self.manager.read_range("BTC/USDT", start=start, end=end)
+            expected = validate_data_quality(df)
+            report = self.manager.quality_report("BTC/USDT", start=start, end=end)
+            self.assertEqual(report["is_valid"], expected["is_valid"])
+            self.assertEqual({k: v for k, v in report["issues"].items() if k != "missing_bars"}, expected["issues"])
+            full = pd.date_range(df.index[0], df.index[-1], freq="1H")
+            self.assertEqual(report["issues"].get("missing_bars", 0), len(full) - len(df))
+        self.assertEqual(len(report["gaps"]), 2)
+
+        # 重建索引（如索引文件丢失）结果一致
+        rebuilt = HistoricalDataManager(FakeConnector(FakeExchange()), data_dir=self.tmp.name)
+        import shutil
+        shutil.rmtree(self.manager.quality_dir)
+        self.assertEqual(rebuilt.quality_report("BTC/USDT"), self.manager.quality_report("BTC/USDT"))
+
+    def test_fill_gaps_matches_full_reindex(self):
+        df = self.manager.read_range("BTC/USDT", end="2023-02-15").dropna()
+        filled = self.manager.fill_gaps(df, "BTC/USDT")
+        expected = fill_missing_data(df, "1h")
+        pd.testing.assert_frame_equal(filled, expected, check_freq=False, check_names=False)
+
+
+class DecimalExchange(FakeExchange):
+    """模拟交易所：价格保留 2 位小数、成交量保留 3 位小数（与真实交易所一样是定点小数）"""
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        rows = super().fetch_ohlcv(symbol, timeframe, since, limit)
+        return [[t, round(o, 2), round(h, 2), round(l, 2), round(c, 2), 1 + t // HOUR_MS % 97 / 8] for t, o, h, l, c, _ in rows]
+
+
+class CompactModeTests(unittest.TestCase):
+    """紧凑列类型模式测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.default = HistoricalDataManager(FakeConnector(DecimalExchange()), data_dir=self.tmp.name)
+        self.compact = HistoricalDataManager(FakeConnector(DecimalExchange()), data_dir=self.tmp.name, compact=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compact_frames_shrink_cached_memory(self):
+        from backend.backtest.compact import expand_frame
+
+        expected = self.default.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-02-01")
+        df = self.compact.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-02-01")
+        self.assertEqual(df.index.dtype, np.int64)
+        self.assertEqual(df.index[0], ORIGIN_MS)
+        self.assertEqual(set(df.dtypes), {np.dtype(np.float32)})
+        pd.testing.assert_frame_equal(expand_frame(df), expected, check_exact=True, check_freq=False)
+
+        usage = self.compact.memory_usage()
+        self.assertEqual(len(usage["datasets"]), 1)
+        dataset = usage["datasets"][0]
+        self.assertEqual((dataset["series"], dataset["rows"]), ("binance_BTC/USDT_1h", len(expected)))
+        self.assertEqual(dataset["columns"]["close"], {"dtype": "float32", "bytes": 4 * len(expected)})
+        self.assertEqual(dataset["bytes"], usage["cache"]["bytes"])
+        self.assertLess(dataset["bytes"], 0.6 * self.default.memory_usage()["datasets"][0]["bytes"])
+
+    def test_compact_hot_file_is_zero_copy(self):
+        expected = self.default.fetch_historical_data("BTC/USDT", start_date="2023-01-01", end_date="2023-02-01")
+        self.compact.promote_hot("BTC/USDT")
+        week = self.compact.read_hot("BTC/USDT", start="2023-01-09", end="2023-01-16")
+        again = self.compact.read_hot("BTC/USDT")
+        self.assertTrue(np.shares_memory(week["close"].to_numpy(), again["close"].to_numpy()))
+        self.assertEqual((week.index[0], week["close"].dtype), (ORIGIN_MS + 8 * 24 * HOUR_MS, np.float32))
+        self.assertEqual(self.compact.memory_usage()["hot"][0]["rows"], len(expected))
+
+        # 默认模式读取紧凑热数据文件时还原为默认列类型
+        pd.testing.assert_frame_equal(self.default.read_hot("BTC/USDT"), expected, check_exact=True, check_freq=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+CryptoTrader 资产分配测试
+=======================
+
+验证 EWMA 协方差增量更新与风险平价权重。
+"""
+
+import unittest
+import numpy as np
+
+from backend.utils.portfolio import EWMACovariance, PortfolioAllocator, risk_parity_weights
+
+
+def make_returns(seed: int = 0, n_bars: int = 500, n_assets: int = 6) -> np.ndarray:
+    """生成带共同因子和不同波动率的收益率"""
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (n_bars, 1))
+    beta = rng.uniform(0.5, 1.5, n_assets)
+    return factor * beta + rng.normal(0, 0.01, (n_bars, n_assets)) * np.linspace(0.5, 3, n_assets)
+
+
+class EWMACovarianceTests(unittest.TestCase):
+    """EWMA 协方差测试"""
+
+    def test_batch_update_matches_incremental(self):
+        returns = make_returns()
+        returns[:100, 0] = np.nan  # 第一个资产晚上市
+        incremental = EWMACovariance(6, halflife=20)
+        for row in returns:
+            incremental.update(row)
+        batched = EWMACovariance(6, halflife=20)
+        for chunk in np.array_split(returns, 7):
+            batched.update_batch(chunk)
+        np.testing.assert_allclose(batched.covariance(), incremental.covariance(), rtol=1e-10, atol=1e-18)
+        self.assertEqual(batched.n_obs.tolist(), [400] + [500] * 5)
+
+    def test_matches_weighted_sample_covariance(self):
+        returns = make_returns(n_bars=200)
+        cov = EWMACovariance(6, halflife=10)
+        cov.update_batch(returns)
+        decay = 0.5 ** (1 / 10)
+        w = decay ** np.arange(199, -1, -1)
+        expected = (returns * w[:, None]).T @ returns / w.sum()
+        np.testing.assert_allclose(cov.covariance(), expected, rtol=1e-10)
+
+
+class RiskParityTests(unittest.TestCase):
+    """风险平价权重测试"""
+
+    def test_equal_risk_contributions(self):
+        returns = make_returns()
+        cov = np.cov(returns.T)
+        w = risk_parity_weights(cov)
+        contributions = w * (cov @ w)
+        self.assertAlmostEqual(w.sum(), 1.0)
+        np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-6)
+
+    def test_diagonal_covariance_is_inverse_vol(self):
+        vol = np.array([0.01, 0.02, 0.04])
+        w = risk_parity_weights(np.diag(vol ** 2))
+        np.testing.assert_allclose(w, (1 / vol) / (1 / vol).sum(), rtol=1e-8)
+
+    def test_allocator_falls_back_and_caps(self):
+        symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+        allocator = PortfolioAllocator(method="risk_parity", min_periods=20, max_weight=0.5)
+        # 协方差尚未建立：按波动率倒数分配，缺失波动率的币种权重为 0
+        weights = allocator.calculate_weights(symbols, {"BTC/USDT": 0.01, "ETH/USDT": 0.03, "SOL/USDT": np.nan})
+        self.assertEqual(weights["SOL/USDT"], 0.0)
+        self.assertAlmostEqual(weights["BTC/USDT"], 0.5)
+        self.assertAlmostEqual(sum(weights.values()), 1.0)
+
+        returns = make_returns(n_assets=3)
+        timestamps = np.arange(len(returns), dtype=np.int64) * 3600000
+        allocator.observe(symbols, timestamps[:300], returns[:300].T)
+        allocator.observe(symbols, timestamps, returns.T)  # 重复部分跳过
+        self.assertEqual(allocator.covariance.n_obs.tolist(), [500] * 3)
+        weights = allocator.calculate_weights(symbols)
+        self.assertLessEqual(max(weights.values()), 0.5 + 1e-12)
+        self.assertAlmostEqual(sum(weights.values()), 1.0)
+        self.assertIs(allocator.weights, weights)
+
+
+if __name__ == "__main__":
+    unittest.main()
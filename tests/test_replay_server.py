@@ -0,0 +1,174 @@
+"""
+CryptoTrader 离线交易所回放服务测试
+=======================
+
+验证回放服务的 Binance 合约 / OKX 永续接口：K线分页和回放时钟、模拟账户下单和持仓、延迟与错误注入、WebSocket K线推送。
+"""
+
+import asyncio
+import time
+import unittest
+import numpy as np
+import pandas as pd
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+replay_module = pytest.importorskip("backend.api.replay_server")
+ReplayServer = replay_module.ReplayServer
+redirect_urls = replay_module.redirect_urls
+from backend.utils.data_processor import resample_klines
+
+
+def make_frame(n_bars: int = 3000) -> pd.DataFrame:
+    """2023-01-01 起每分钟一根、收盘价每分钟上涨 0.01 的K线"""
+    index = pd.date_range("2023-01-01", periods=n_bars, freq="1min")
+    close = 100 + np.arange(n_bars) * 0.01
+    return pd.DataFrame({"open": close, "high": close + 0.05, "low": close - 0.05, "close": close, "volume": 1.0}, index=index)
+
+
+class ReplayServerTests(unittest.TestCase):
+    """回放服务接口测试"""
+
+    def serve(self, scenario, **kwargs):
+        """启动回放服务并执行 scenario(session, url, server)"""
+        async def run():
+            server = ReplayServer(frames={("BTC/USDT", "1m"): make_frame()}, **kwargs)
+            url = await server.start()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    return await scenario(session, url, server)
+            finally:
+                await server.stop()
+        return asyncio.run(run())
+
+    def test_klines_follow_replay_clock(self):
+        async def scenario(session, url, server):
+            klines = await (await session.get(url + "/fapi/v1/klines", params={"symbol": "BTCUSDT", "interval": "1m", "limit": 1500})).json()
+            # 10:00 时只有已收盘的K线可见
+            self.assertEqual(klines[-1][0], int(pd.Timestamp("2023-01-01 09:59").value // 10**6))
+            page = await (await session.get(url + "/fapi/v1/klines", params={
+                "symbol": "BTCUSDT", "interval": "1h", "startTime": 0, "limit": 3
+            })).json()
+            expected = resample_klines(make_frame(), "1h")
+            self.assertEqual([row[0] for row in page], [int(t.value // 10**6) for t in expected.index[:3]])
+            self.assertAlmostEqual(float(page[1][2]), expected["high"].iloc[1])
+
+            candles = await (await session.get(url + "/api/v5/market/candles", params={
+                "instId": "BTC-USDT-SWAP", "bar": "1H", "limit": 2
+            })).json()
+            self.assertEqual(candles["code"], "0")
+            times = [int(row[0]) for row in candles["data"]]
+            self.assertEqual(times, sorted(times, reverse=True))
+            self.assertEqual(times[0], int(pd.Timestamp("2023-01-01 09:00").value // 10**6))
+            error = await (await session.get(url + "/fapi/v1/klines", params={"symbol": "XYZUSDT", "interval": "1m"})).json()
+            self.assertEqual(error["code"], -1121)
+        self.serve(scenario, start="2023-01-01 10:00", speed=1.0)
+
+    def test_orders_positions_and_balance(self):
+        async def scenario(session, url, server):
+            await session.post(url + "/fapi/v1/leverage", data={"symbol": "BTCUSDT", "leverage": "5"})
+            order = await (await session.post(url + "/fapi/v1/order", data={
+                "symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": "2"
+            })).json()
+            self.assertEqual(order["status"], "FILLED")
+            mark = float(order["avgPrice"])
+            self.assertAlmostEqual(mark, make_frame()["close"].iloc[-1])
+            risk = await (await session.get(url + "/fapi/v2/positionRisk", params={"symbol": "BTCUSDT"})).json()
+            self.assertEqual((float(risk[0]["positionAmt"]), risk[0]["leverage"]), (2.0, "5"))
+            rejected = await session.post(url + "/fapi/v1/order", data={
+                "symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": "1", "reduceOnly": "true"
+            })
+            self.assertEqual((rejected.status, (await rejected.json())["code"]), (400, -2022))
+            await session.post(url + "/fapi/v1/order", data={
+                "symbol": "BTCUSDT", "side": "SELL", "type": "MARKET", "quantity": "5", "reduceOnly": "true"
+            })
+            account = await (await session.get(url + "/fapi/v2/account")).json()
+            self.assertAlmostEqual(float(account["totalWalletBalance"]), 10000 - 2 * 2 * mark * 0.0004)
+
+            # OKX 双向持仓：同时持有多空
+            await session.post(url + "/api/v5/account/set-position-mode", json={"posMode": "long_short_mode"})
+            for side, pos_side in (("buy", "long"), ("sell", "short")):
+                result = await (await session.post(url + "/api/v5/trade/order", json={
+                    "instId": "BTC-USDT-SWAP", "tdMode": "cross", "side": side, "posSide": pos_side, "ordType": "market", "sz": "1"
+                })).json()
+                self.assertEqual(result["data"][0]["sCode"], "0")
+            positions = (await (await session.get(url + "/api/v5/account/positions")).json())["data"]
+            self.assertEqual(sorted((p["posSide"], p["pos"]) for p in positions), [("long", "1.0"), ("short", "1.0")])
+            balance = (await (await session.get(url + "/api/v5/account/balance")).json())["data"][0]["details"][0]
+            self.assertAlmostEqual(float(balance["cashBal"]), 10000 - 2 * mark * 0.0004)
+        self.serve(scenario)
+
+    def test_limit_order_fills_on_later_bar(self):
+        async def scenario(session, url, server):
+            mark = server.mark_price("BTC/USDT")
+            order = await (await session.post(url + "/fapi/v1/order", data={
+                "symbol": "BTCUSDT", "side": "SELL", "type": "LIMIT", "quantity": "1", "price": str(mark + 0.5)
+            })).json()
+            self.assertEqual(order["status"], "NEW")
+            await asyncio.sleep(0.3)  # 回放 60 分钟，价格上涨 0.6
+            order = await (await session.get(url + "/fapi/v1/order", params={"symbol": "BTCUSDT", "orderId": order["orderId"]})).json()
+            self.assertEqual((order["status"], float(order["avgPrice"])), ("FILLED", mark + 0.5))
+        self.serve(scenario, start="2023-01-01 10:00", speed=12000)
+
+    def test_matching_scans_only_open_orders_once_per_bar(self):
+        server = ReplayServer(frames={("BTC/USDT", "1m"): make_frame()}, start="2023-01-01 10:00", speed=0)
+        account = server.accounts["binance"]
+        mark = server.mark_price("BTC/USDT")
+        for k in range(500):
+            account.submit("BTC/USDT", "buy" if k % 2 == 0 else "sell", "market", 1.0, None, mark, server.clock.now())
+        order = account.submit("BTC/USDT", "sell", "limit", 1.0, mark + 0.5, mark, server.clock.now(), client_id="rest")
+        self.assertEqual((len(account.orders), list(account.open_orders)), (501, [order["id"]]))
+        self.assertIs(server._binance_find_order({"origClientOrderId": "rest"}), order)
+
+        server._match_orders(account)
+        self.assertNotIn(order["id"], account.match_cursor)  # 挂单之后尚无收盘的K线
+        server.clock.start_ms += 30 * 60000  # 价格上涨 0.3，未触及限价
+        server._match_orders(account)
+        self.assertEqual((order["status"], account.match_cursor[order["id"]]), ("open", 630))
+        server.clock.start_ms += 30 * 60000
+        server._match_orders(account)
+        self.assertEqual((order["status"], order["average"]), ("closed", mark + 0.5))
+        self.assertEqual((account.open_orders, account.match_cursor), ({}, {}))
+
+    def test_latency_and_error_injection(self):
+        async def scenario(session, url, server):
+            response = await session.get(url + "/fapi/v1/time")
+            self.assertEqual((response.status, (await response.json())["code"]), (429, -1003))
+            response = await session.get(url + "/api/v5/public/time")
+            self.assertEqual((await response.json())["code"], "50011")
+            self.assertEqual(server.stats["GET /fapi/v1/time"], 1)
+
+            server.error_rate = 0.0
+            started = time.monotonic()
+            for _ in range(3):
+                self.assertEqual((await session.get(url + "/fapi/v1/ping")).status, 200)
+            self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        self.serve(scenario, latency=(0.05, 0.05), error_rate=1.0, error_status=429, seed=0)
+
+    def test_websocket_pushes_closed_bars(self):
+        async def scenario(session, url, server):
+            ws_url = url.replace("http", "ws")
+            async with session.ws_connect(ws_url + "/ws/btcusdt@kline_1m") as ws:
+                first = await ws.receive_json(timeout=5)
+                second = await ws.receive_json(timeout=5)
+                self.assertEqual(second["k"]["t"] - first["k"]["t"], 60000)
+                self.assertTrue(first["k"]["x"])
+            async with session.ws_connect(ws_url + "/ws/v5/business") as ws:
+                await ws.send_json({"op": "subscribe", "args": [{"channel": "candle1m", "instId": "BTC-USDT-SWAP"}]})
+                self.assertEqual((await ws.receive_json(timeout=5))["event"], "subscribe")
+                push = await ws.receive_json(timeout=5)
+                self.assertEqual(push["arg"]["channel"], "candle1m")
+                await ws.send_str("ping")
+                while (message := await ws.receive(timeout=5)).data != "pong":
+                    pass
+        self.serve(scenario, start="2023-01-01 10:00", speed=600)
+
+    def test_redirect_urls(self):
+        urls = {"fapiPublic": "https://fapi.binance.com/fapi/v1", "rest": "https://{hostname}", "other": 1}
+        self.assertEqual(redirect_urls(urls, "http://127.0.0.1:8765/"), {
+            "fapiPublic": "http://127.0.0.1:8765/fapi/v1", "rest": "http://127.0.0.1:8765", "other": 1
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
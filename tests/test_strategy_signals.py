@@ -0,0 +1,77 @@
+"""
+CryptoTrader 策略批量信号测试
+=======================
+
+验证向量化 calculate_signals_batch 与逐K线 calculate_signals 的信号一致。
+"""
+
+import unittest
+import numpy as np
+import pytest
+
+rsi_macd_module = pytest.importorskip("backend.strategy.rsi_macd_strategy")
+from backend.strategy.base_strategy import BaseStrategy
+from backend.strategy.custom_strategy import CustomStrategy
+from backend.backtest.indicator_cache import IndicatorCache
+
+RSIMACDStrategy = rsi_macd_module.RSIMACDStrategy
+
+
+def make_arrays(seed: int = 0, n_bars: int = 600) -> dict:
+    """生成随机游走K线数组"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    return {
+        "open": np.concatenate([[closes[0]], closes[:-1]]),
+        "high": closes * 1.002,
+        "low": closes * 0.998,
+        "close": closes,
+        "volume": rng.uniform(1, 10, n_bars),
+    }
+
+
+def assert_signals_equal(batch: dict, reference: dict):
+    np.testing.assert_array_equal(batch["action"], reference["action"])
+    for name in ("size", "leverage", "stop"):
+        np.testing.assert_allclose(batch[name], reference[name], rtol=1e-12, equal_nan=True)
+
+
+class BatchSignalTests(unittest.TestCase):
+    """批量信号与逐K线信号一致性测试"""
+
+    def test_rsi_macd_batch_matches_per_bar(self):
+        strategy = RSIMACDStrategy(connector=None)
+        strategy.update_indicator_params("RSI", {"oversold": 45, "overbought": 55})
+        arrays = make_arrays()
+        batch = strategy.calculate_signals_batch("BTC/USDT", arrays)
+        reference = BaseStrategy.calculate_signals_batch(strategy, "BTC/USDT", arrays)
+        assert_signals_equal(batch, reference)
+        self.assertTrue((batch["action"] == 1).any() and (batch["action"] == -1).any())
+
+    def test_custom_rules_batch_matches_per_bar(self):
+        for ma_type in ("SMA", "EMA"):
+            strategy = CustomStrategy(connector=None)
+            strategy.ma_type = ma_type
+            strategy.rule_engine = strategy._compile_rules([
+                {"condition": "RSI < 45 and MACD > 0 and close > MA", "action": "open_long"},
+                {"condition": "RSI > 55 or MACD < -1", "action": "open_short"},
+            ])
+            arrays = make_arrays(seed=1)
+            batch = strategy.calculate_signals_batch("ETH/USDT", arrays)
+            reference = BaseStrategy.calculate_signals_batch(strategy, "ETH/USDT", arrays)
+            assert_signals_equal(batch, reference)
+            self.assertTrue((batch["action"] != 0).any())
+            self.assertTrue(np.isnan(batch["stop"][batch["action"] == 0]).all())
+
+    def test_shared_cache_reuses_indicators(self):
+        arrays = make_arrays()
+        cache = IndicatorCache({"BTC/USDT": arrays})
+        RSIMACDStrategy(connector=None).calculate_signals_batch("BTC/USDT", arrays, cache=cache)
+        misses = cache.misses
+        CustomStrategy(connector=None).calculate_signals_batch("BTC/USDT", arrays, cache=cache)
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(cache.misses, misses + 1)  # 仅新增 MA
+
+
+if __name__ == "__main__":
+    unittest.main()